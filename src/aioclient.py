@@ -0,0 +1,283 @@
+"""
+    Asyncio client library for the date/time server.
+
+    Lets an asyncio application query servers without the interactive client:
+        response = await aioclient.get_date("localhost", 3333, "de")
+        print(response.text)
+
+    Every request of an event loop goes through one shared pool of long-lived
+    sockets. Requests carry sequence numbers, so any number of them can be in
+    flight on a socket at once, and are retransmitted as in the interactive
+    client. Nothing is printed: failures are raised as exceptions.
+"""
+# IMPORTS
+import time
+import socket
+import asyncio
+import weakref
+import collections
+import protocol
+import languages
+import rtt
+from client import build_dt_request_packet
+import constants.config as cfg
+import constants.responses as responses
+
+
+Response = collections.namedtuple(
+    "Response", "language_code year month day hour minute text")
+
+
+# Start of class ---------------------------------------------------------------
+class EndpointProtocol(asyncio.DatagramProtocol):
+    """
+        A datagram protocol for one socket of the pool, or of the load generator.
+        Requests carry sequence numbers, so many can be outstanding at once, and
+        each response completes the request with the matching number.
+    """
+
+    def __init__(self):
+        """
+            Initialise an endpoint with no outstanding requests.
+        """
+        self.transport = None
+        self.waiters = {}    # Sequence -> future of the response packet
+        self.next_sequence = 0
+
+    def connection_made(self, transport):
+        """
+            Keep hold of the transport so requests can be sent through it.
+        """
+        self.transport = transport
+
+    def sequence(self):
+        """
+            Returns the next sequence number for this socket.
+        """
+        sequence = self.next_sequence
+        self.next_sequence = (sequence + 1) & protocol.MAX_SEQUENCE
+        return sequence
+
+    def datagram_received(self, data, address):
+        """
+            Completes the outstanding request with the response's sequence number.
+            Invalid responses, and late ones to requests already given up on, are discarded.
+        """
+        if protocol.validate_response(data) != 0:
+            return
+
+        waiter = self.waiters.get(protocol.response_sequence(data))
+        if waiter is not None and not waiter.done():
+            waiter.set_result(data)
+
+    def error_received(self, exc):
+        """
+            Ignores errors such as an unreachable port. They do not say which
+            server they concern, and the socket is shared by requests to many,
+            so each request is left to its own timeout and retransmits.
+        """
+
+    def connection_lost(self, exc):
+        """
+            Fails every outstanding request once the pool is closed.
+        """
+        exc = exc or ConnectionAbortedError()
+        for waiter in self.waiters.values():
+            if not waiter.done():
+                waiter.set_exception(exc)
+
+
+class ClientPool:
+    """
+        A pool of UDP sockets shared by every request made through it. The
+        sockets are opened on first use, and requests are spread across them.
+        Server addresses are resolved once and remembered.
+    """
+
+    def __init__(self, size=cfg.CONFIG_POOL_SIZE):
+        """
+            Initialise a pool of 'size' sockets.
+        """
+        self.size = size
+        self.endpoints = []
+        self.opening = None
+        self.next_endpoint = 0
+        self.addresses = {}    # (host, port) -> resolved address
+
+    async def open(self):
+        """
+            Opens the pool's sockets. The event loop reads one datagram per socket
+            at a time, so their receive buffers are enlarged to hold the responses
+            to many concurrent requests.
+        """
+        loop = asyncio.get_running_loop()
+        endpoints = []
+        for _ in range(self.size):
+            sc = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sc.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, cfg.CONFIG_POOL_SO_RCVBUF)
+            transport, endpoint = await loop.create_datagram_endpoint(EndpointProtocol, sock=sc)
+            endpoints.append(endpoint)
+        self.endpoints = endpoints
+
+    async def endpoint(self):
+        """
+            Returns the next socket's protocol in turn, opening the sockets first
+            if they are not yet open.
+        """
+        if not self.endpoints:
+            if self.opening is None:
+                self.opening = asyncio.ensure_future(self.open())
+            await self.opening
+
+        endpoint = self.endpoints[self.next_endpoint]
+        self.next_endpoint = (self.next_endpoint + 1) % len(self.endpoints)
+        return endpoint
+
+    async def resolve(self, host, port):
+        """
+            Returns the socket address of the given server.
+        """
+        address = self.addresses.get((host, port))
+        if address is None:
+            loop = asyncio.get_running_loop()
+            info = await loop.getaddrinfo(host, port, family=socket.AF_INET, type=socket.SOCK_DGRAM)
+            address = self.addresses[(host, port)] = info[0][4]
+        return address
+
+    async def request(self, host, port, command, language=None,
+                      timeout=cfg.CONFIG_RESPONSE_WAITTIME, zone=None):
+        """
+            Sends a 'date' or 'time' request to the server at (host, port) and
+            returns its Response. The language is a code, tag or name, or None
+            for the port's language. The zone is a zone identifier, such as
+            "Europe/Berlin", or None for the server's local time. The request is retransmitted each time the
+            current timeout passes, for up to CONFIG_MAX_RETRANSMITS retransmits
+            within the retransmit budget. The timeout grows with the number of
+            requests to the server already in flight.
+            Raises TimeoutError if no response arrived within 'timeout' seconds,
+            or ValueError for an unknown language or an invalid zone identifier.
+            A zone the server does not know is never answered.
+        """
+        language_code = None
+        if language is not None:
+            entry = languages.find(language)
+            if entry is None:
+                raise ValueError(language)
+            language_code = entry["code"]
+
+        if zone is not None and not protocol.valid_zone(zone):
+            raise ValueError(zone)
+
+        address = await self.resolve(host, port)
+        endpoint = await self.endpoint()
+        estimator = rtt.estimator_for(address)
+        loop = asyncio.get_running_loop()
+
+        sequence = endpoint.sequence()
+        packet = build_dt_request_packet(command, language_code, sequence, zone)
+        estimator.requests += 1
+        estimator.in_flight += 1
+        first_sent = loop.time()
+        give_up_at = first_sent + timeout
+        attempt = 0
+        send = True
+        over_budget = False
+
+        # The waiter is never cancelled on a timeout, so a response arriving
+        # while the request is being retransmitted still completes it
+        waiter = endpoint.waiters[sequence] = loop.create_future()
+        try:
+            while True:
+                if send:
+                    endpoint.transport.sendto(packet, address)
+                    sent_at = loop.time()
+                    retransmit_at = sent_at + estimator.timeout(
+                        attempt, queued=estimator.in_flight - 1)
+
+                wake_at = give_up_at if over_budget else min(give_up_at, retransmit_at)
+                await asyncio.wait([waiter], timeout=wake_at - loop.time())
+                if waiter.done():
+                    data = waiter.result()
+                    break
+
+                now = loop.time()
+                if now >= give_up_at:
+                    raise TimeoutError(responses.ERROR_RESPONSE_TIMEOUT.format(host, port, timeout))
+
+                # Requests sent after this one, in the same burst, delay its response
+                # too, so the timeout is extended while more of them are in flight
+                retransmit_at = max(retransmit_at, sent_at + estimator.timeout(
+                    attempt, queued=estimator.in_flight - 1))
+
+                send = False
+                if now >= retransmit_at:
+                    if attempt >= cfg.CONFIG_MAX_RETRANSMITS:
+                        raise TimeoutError(responses.ERROR_RESPONSE_TIMEOUT.format(
+                            host, port, timeout))
+
+                    # Over the retransmit budget, the request waits out its timeout instead
+                    send = estimator.may_retransmit()
+                    over_budget = not send
+                    if send:
+                        attempt += 1
+                        estimator.retransmits += 1
+
+        finally:
+            del endpoint.waiters[sequence]
+            estimator.in_flight -= 1
+
+        estimator.sample_gap(time.perf_counter(), estimator.in_flight)
+
+        # Karn's rule: a response to a retransmitted request is not sampled
+        if attempt == 0:
+            estimator.sample(loop.time() - first_sent)
+
+        return Response(*protocol.unpack_response_header(data)[2:8], protocol.response_text(data))
+
+    def close(self):
+        """
+            Closes the pool's sockets, failing any requests still outstanding.
+        """
+        for endpoint in self.endpoints:
+            endpoint.transport.close()
+        self.endpoints = []
+        self.opening = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+
+# End of class =================================================================
+
+
+_pools = weakref.WeakKeyDictionary()
+
+
+def default_pool():
+    """
+        Returns the pool shared by every request made on the running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = _pools[loop] = ClientPool()
+    return pool
+
+
+async def get_date(host, port, language=None, timeout=cfg.CONFIG_RESPONSE_WAITTIME, zone=None):
+    """
+        Returns the server's date, or the date in the given zone, as a Response,
+        through the default pool.
+    """
+    return await default_pool().request(host, port, "date", language, timeout, zone)
+
+
+async def get_time(host, port, language=None, timeout=cfg.CONFIG_RESPONSE_WAITTIME, zone=None):
+    """
+        Returns the server's time, or the time in the given zone, as a Response,
+        through the default pool.
+    """
+    return await default_pool().request(host, port, "time", language, timeout, zone)
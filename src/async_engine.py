@@ -0,0 +1,335 @@
+# IMPORTS
+import time
+import asyncio
+import protocol
+import constants.config as cfg
+import constants.responses as responses
+import log
+
+
+# Start of class ---------------------------------------------------------------
+class LanguageProtocol(asyncio.DatagramProtocol):
+    """
+        An asyncio datagram protocol bound to a single language port.
+        Every datagram is handed to the owning Server for validation and
+        response creation, so behaviour matches the select engine exactly.
+    """
+
+    def __init__(self, server, port):
+        """
+            Initialise a protocol for the given server and language port.
+        """
+        self.server = server
+        self.port = port
+        self.transport = None
+        self.paused = False
+
+    def connection_made(self, transport):
+        """
+            Keep hold of the transport so responses can be sent back through it.
+            The transport queues responses the socket has no room for, up to
+            SERVER_SEND_QUEUE_BYTES, after which writing is paused.
+        """
+        self.transport = transport
+        transport.set_write_buffer_limits(high=cfg.SERVER_SEND_QUEUE_BYTES)
+
+    def datagram_received(self, data, bounce_back_address):
+        """
+            Validate the incoming datagram and send the response, if any.
+            Responses are dropped while the transport's queue is full.
+        """
+        try:
+            packet = self.server.handle_request(data, bounce_back_address, self.port)
+
+            if packet is not None:
+                port_metrics = self.server.metrics.port(self.port)
+
+                if self.paused:
+                    port_metrics.send_dropped += 1
+                    return
+
+                start = time.perf_counter_ns()
+                self.transport.sendto(packet, bounce_back_address)
+                self.server.metrics.send.record(time.perf_counter_ns() - start)
+
+                # The transport only buffers what the socket had no room for
+                if self.transport.get_write_buffer_size():
+                    port_metrics.queued += 1
+                else:
+                    port_metrics.sent += 1
+                log.debug(responses.SUCCESS_RESPONSE_PACKET_SENT,
+                    bounce_back_address[0], bounce_back_address[1])
+
+        except:
+            log.error(responses.ERROR_PROCESS_INCOMING)
+
+
+    def error_received(self, exc):
+        """
+            Count errors reported for earlier sends on this port.
+        """
+        self.server.metrics.port(self.port).send_errors += 1
+
+    def pause_writing(self):
+        """
+            Called once the transport's queue of unsent responses is full.
+        """
+        self.paused = True
+
+    def resume_writing(self):
+        """
+            Called once the transport has sent enough of its queued responses.
+        """
+        self.paused = False
+
+
+class LanguageStreamProtocol(asyncio.Protocol):
+    """
+        A stream protocol for a single connection to a language port.
+        Packets arrive and leave as length-prefixed frames, so a client may
+        pipeline many requests on one long-lived connection. Each request is
+        handed to the owning Server just as a datagram would be, and the
+        responses are written back in request order.
+    """
+
+    def __init__(self, server, port, connections):
+        """
+            Initialise a protocol for the given server and language port.
+            'connections' holds every open stream protocol of the server.
+        """
+        self.server = server
+        self.port = port
+        self.connections = connections
+        self.transport = None
+        self.peer = None
+        self.buffer = bytearray()
+        self.last_active = 0
+
+    def connection_made(self, transport):
+        """
+            Accepts the connection, unless the server already has as many as it allows.
+        """
+        self.transport = transport
+        self.peer = transport.get_extra_info("peername")
+        metrics = self.server.metrics
+
+        if len(self.connections) >= cfg.SERVER_STREAM_MAX_CONNECTIONS:
+            metrics.stream_refused += 1
+            log.debug(responses.ERROR_STREAM_REFUSED, self.peer[0], self.peer[1])
+            transport.abort()
+            return
+
+        self.connections.add(self)
+        self.last_active = asyncio.get_running_loop().time()
+        metrics.stream_connections = len(self.connections)
+
+    def connection_lost(self, exc):
+        """
+            Forgets the connection once it is closed by either end.
+        """
+        self.connections.discard(self)
+        self.server.metrics.stream_connections = len(self.connections)
+
+    def data_received(self, data):
+        """
+            Handles every complete frame received so far and writes all of their
+            responses back together.
+        """
+        self.last_active = asyncio.get_running_loop().time()
+        self.buffer += data
+
+        packets, consumed = protocol.unpack_frames(self.buffer)
+        del self.buffer[:consumed]
+
+        # A frame longer than any request means the stream is not speaking the protocol
+        length = protocol.frame_length(self.buffer)
+        if length is not None and length > protocol.MAX_REQUEST_SIZE:
+            self.server.metrics.port(self.port).dropped += 1
+            self.transport.abort()
+            return
+
+        replies = []
+        for packet in packets:
+            try:
+                # Pushes are sent as datagrams, so subscriptions need the datagram transport
+                if protocol.is_subscribe_request(packet):
+                    continue
+
+                reply = self.server.handle_request(packet, self.peer, self.port)
+                if reply is not None:
+                    replies.append(protocol.pack_frame(reply))
+
+            except:
+                log.error(responses.ERROR_PROCESS_INCOMING)
+
+        if replies:
+            start = time.perf_counter_ns()
+            self.transport.write(b"".join(replies))
+            self.server.metrics.send.record(time.perf_counter_ns() - start)
+            self.server.metrics.port(self.port).sent += len(replies)
+
+    def pause_writing(self):
+        """
+            Stops reading requests while the client is not reading its responses.
+        """
+        self.transport.pause_reading()
+
+    def resume_writing(self):
+        """
+            Resumes reading requests once the client has caught up.
+        """
+        self.transport.resume_reading()
+
+
+# End of class =================================================================
+
+
+def close_idle_streams(loop, connections):
+    """
+        Closes every stream connection that has been idle for longer than
+        SERVER_STREAM_IDLE_TIMEOUT, then schedules the next check.
+    """
+    idle_since = loop.time() - cfg.SERVER_STREAM_IDLE_TIMEOUT
+    for connection in list(connections):
+        if connection.last_active < idle_since:
+            connection.server.metrics.stream_idle_closed += 1
+            connection.transport.close()
+
+    loop.call_later(cfg.SERVER_STREAM_IDLE_TIMEOUT / 2, close_idle_streams, loop, connections)
+
+
+async def serve_streams(loop, server, connections):
+    """
+        Listens for stream connections on the port of every language, through
+        the listening sockets taken over from a predecessor where there are any.
+        Returns the listening servers. A port that cannot be listened on is
+        logged and left to the datagram transport.
+    """
+    listeners = []
+
+    for language in server.languages:
+        factory = lambda port=language.port: LanguageStreamProtocol(server, port, connections)
+        inherited = server.stream_sockets.get(language.port)
+
+        try:
+            if inherited:
+                for sc in inherited:
+                    listeners.append(await loop.create_server(factory, sock=sc))
+
+            else:
+                listener = await loop.create_server(
+                    factory, host="localhost", port=language.port,
+                    reuse_port=server.reuse_port or None)
+                listeners.append(listener)
+                server.stream_sockets[language.port] = list(listener.sockets)
+
+        except OSError:
+            log.error(responses.ERROR_STREAM_LISTEN, language.port)
+
+    if listeners:
+        log.info(responses.STATUS_STREAM_LISTENING, len(server.stream_sockets))
+        loop.call_later(cfg.SERVER_STREAM_IDLE_TIMEOUT / 2, close_idle_streams, loop, connections)
+
+    return listeners
+
+
+def schedule_tick(loop, server):
+    """
+        Runs the server's tick at the start of the next minute, or the next
+        multicast publish if that comes first, and again every time after that.
+    """
+    def tick():
+        server.tick()
+        schedule_tick(loop, server)
+
+    delay = server.seconds_to_next_tick()
+    if delay is not None:
+        loop.call_later(delay, tick)
+
+
+def watch_handoff(loop, server, stopped):
+    """
+        Hands the server's sockets to a successor once one connects to its
+        handoff socket, then completes the 'stopped' future.
+    """
+    if server.handoff_listener is None:
+        return
+
+    descriptor = server.handoff_listener.fileno()
+
+    def hand_off():
+        loop.remove_reader(descriptor)
+        if server.hand_off():
+            stopped.set_result(None)
+        else:
+            loop.add_reader(descriptor, hand_off)
+
+    loop.add_reader(descriptor, hand_off)
+
+
+async def drain(transports):
+    """
+        Waits until the transports have sent every queued response, for at
+        most SERVER_HANDOFF_TIMEOUT seconds.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + cfg.SERVER_HANDOFF_TIMEOUT
+
+    while any(transport.get_write_buffer_size() for transport in transports):
+        if loop.time() >= deadline:
+            return
+        await asyncio.sleep(0.01)
+
+
+async def serve(server):
+    """
+        Opens one datagram endpoint per language socket of the given server,
+        and a stream listener per language port when SERVER_STREAM_TRANSPORT is
+        set, and serves them until cancelled or until a successor has taken over.
+    """
+    loop = asyncio.get_running_loop()
+    transports = []
+    listeners = []
+    schedule_tick(loop, server)
+
+    # Transports read datagrams before handing them over, so reads cannot be timed
+    server.metrics.stages = tuple(stage for stage in server.metrics.STAGES if stage != "receive")
+
+    for sc, language in zip(server.sockets, server.languages):
+        transport, protocol = await loop.create_datagram_endpoint(
+            lambda port=language.port: LanguageProtocol(server, port), sock=sc)
+        transports.append(transport)
+
+    # The same ports also accept stream connections carrying framed packets
+    if cfg.SERVER_STREAM_TRANSPORT:
+        listeners = await serve_streams(loop, server, set())
+
+    log.info(responses.STATUS_STARTING_TO_LISTEN)
+    stopped = loop.create_future()
+    server.listen_for_handoff()
+    watch_handoff(loop, server, stopped)
+
+    try:
+        await stopped
+
+        # The successor accepts new connections, while the queued responses are sent
+        for listener in listeners:
+            listener.close()
+        await drain(transports)
+
+    finally:
+        for transport in transports:
+            transport.close()
+        for listener in listeners:
+            listener.close()
+
+
+def run(server):
+    """
+        Runs the asyncio engine for a server whose sockets are already bound.
+    """
+    try:
+        asyncio.run(serve(server))
+
+    except KeyboardInterrupt:
+        log.info(responses.STATUS_SERVER_SHUTDOWN)
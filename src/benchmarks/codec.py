@@ -0,0 +1,97 @@
+"""
+    Per-packet cost of the protocol codec.
+
+    Compares the hand-rolled byte shifting that the client and server used
+    before the shared protocol module with the precompiled struct layouts.
+
+    Run from the 'src' directory:
+        python3 -m benchmarks.codec [iterations]
+"""
+# IMPORTS
+import sys
+import timeit
+import datetime
+import protocol
+import constants.config as cfg
+
+
+# Hand-rolled implementations, as they were before the protocol module ---------
+
+def legacy_validate_request(data):
+    if len(data) != 6:
+        return 1
+    elif ((data[0] << 8) | data[1]) != 0x497E:
+        return 2
+    elif ((data[2] << 8) | data[3]) != 0x0001:
+        return 3
+    elif ((data[4] << 8) | data[5]) not in cfg.COMMAND_TYPES:
+        return 4
+    return 0
+
+
+def legacy_pack_request(request_type):
+    return bytearray([0x49, 0x7E, 0x00, 0x01, 0x00, request_type])
+
+
+def legacy_pack_response(language_code, now, text_in_bytes):
+    packet = bytearray([0x49, 0x7E, 0x00, 0x02, 0x00, language_code,
+                        (now.year >> 8) & 0xFF, now.year & 0xFF, now.month,
+                        now.day, now.hour, now.minute, len(text_in_bytes)])
+    for byte in text_in_bytes:
+        packet.append(byte)
+    return packet
+
+
+def legacy_validate_response(data):
+    if len(data) < 13:
+        return 1
+    elif ((data[0] << 8) | data[1]) != 0x497E:
+        return 2
+    elif ((data[2] << 8) | data[3]) != 0x0002:
+        return 3
+    elif ((data[4] << 8) | data[5]) not in cfg.CONFIG_LANGUAGE_CODES:
+        return 4
+    elif ((data[6] << 8) | data[7]) >= 2100:
+        return 5
+    elif not (1 <= data[8] <= 12):
+        return 6
+    elif not (1 <= data[9] <= 31):
+        return 7
+    elif not (0 <= data[10] <= 23):
+        return 8
+    elif not (0 <= data[11] <= 59):
+        return 9
+    elif len(data) != (data[12] + 13):
+        return 10
+    return 0
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+    now = datetime.datetime(2024, 2, 29, 13, 37)
+    text = "Ko te ra o tenei ra ko Hui-tanguru 29, 2024".encode()
+    request = memoryview(bytearray(protocol.pack_request(0x0001)))
+    response = memoryview(bytearray(protocol.pack_response(0x0002, now, text)))
+
+    cases = [
+        ("validate request", lambda: legacy_validate_request(request),
+         lambda: protocol.validate_request(request)),
+        ("pack request", lambda: legacy_pack_request(0x0001),
+         lambda: protocol.pack_request(0x0001)),
+        ("pack response", lambda: legacy_pack_response(0x0002, now, text),
+         lambda: protocol.pack_response(0x0002, now, text)),
+        ("validate response", lambda: legacy_validate_response(response),
+         lambda: protocol.validate_response(response))
+    ]
+
+    print("{:<20} {:>12} {:>12} {:>9}".format("operation", "before ns", "after ns", "speedup"))
+    for name, before, after in cases:
+        before_ns = min(timeit.repeat(before, number=iterations, repeat=3)) / iterations * 1e9
+        after_ns = min(timeit.repeat(after, number=iterations, repeat=3)) / iterations * 1e9
+        print("{:<20} {:>12.0f} {:>12.0f} {:>8.2f}x".format(
+            name, before_ns, after_ns, before_ns / after_ns))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+    Throughput comparison of the server engines.
+
+    Starts a server with each engine on local ports, then drives it with a
+    window of outstanding date requests for a fixed duration and reports the
+    number of responses per second.
+
+    Run from the 'src' directory:
+        python3 -m benchmarks.engines [duration] [window]
+"""
+# IMPORTS
+import os
+import sys
+import time
+import socket
+import multiprocessing
+import constants.config as cfg
+import server as server_module
+
+
+REQUEST = bytes([0x49, 0x7E, 0x00, 0x01, 0x00, 0x01])
+BASE_PORT = 47000
+
+
+def free_ports(count):
+    """
+        Finds the given number of free local UDP ports above BASE_PORT.
+    """
+    ports = []
+    port = BASE_PORT
+    while len(ports) < count:
+        probe = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            probe.bind(('localhost', port))
+            ports.append(port)
+        except OSError:
+            pass
+        finally:
+            probe.close()
+        port += 1
+    return ports
+
+
+def run_server(ports, engine, recv_batch_size):
+    """
+        Server process entry point. Output is discarded so that terminal I/O
+        does not dominate the measurement.
+    """
+    sys.stdout = open(os.devnull, 'w')
+    server_module.start_server(
+        [str(port) for port in ports], engine, recv_batch_size)
+
+
+def drive(port, duration, window):
+    """
+        Keeps 'window' requests outstanding on one socket for 'duration' seconds.
+        Returns the number of responses received per second.
+    """
+    sc = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sc.settimeout(0.2)
+    address = ('localhost', port)
+
+    for _ in range(window):
+        sc.sendto(REQUEST, address)
+
+    received = 0
+    start = time.perf_counter()
+    deadline = start + duration
+    while time.perf_counter() < deadline:
+        try:
+            sc.recvfrom(4096)
+            received += 1
+        except socket.timeout:
+            # Assume the outstanding requests were lost and refill the window
+            for _ in range(window):
+                sc.sendto(REQUEST, address)
+            continue
+        sc.sendto(REQUEST, address)
+
+    elapsed = time.perf_counter() - start
+    sc.close()
+    return received / elapsed
+
+
+def main():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+    window = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+
+    # (label, engine, receive batch size)
+    configurations = [
+        ("select", "select", 1),
+        ("select-batch", "select", cfg.SERVER_RECV_BATCH_SIZE),
+        ("asyncio", "asyncio", 1)
+    ]
+
+    results = {}
+    for label, engine, recv_batch_size in configurations:
+        ports = free_ports(3)
+        process = multiprocessing.Process(
+            target=run_server, args=(ports, engine, recv_batch_size), daemon=True)
+        process.start()
+        time.sleep(0.5)
+
+        results[label] = drive(ports[0], duration, window)
+        process.terminate()
+        process.join()
+
+    print("{:<14} {:>12}".format("engine", "req/s"))
+    for label, rate in results.items():
+        print("{:<14} {:>12.0f}".format(label, rate))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+    Per-request cost of producing a date/time response packet.
+
+    Compares building the packet from datetime.now() on every request, as
+    the server originally did, with reading it from the response cache
+    driven by the coarse clock. A fixed clock is also timed, which builds
+    identical packets on every run. Responses for another zone are timed both
+    from a zoneinfo lookup on every request and from the cache, which keys
+    them by zone and only reads the zone's precomputed offset once a minute.
+
+    Run from the 'src' directory:
+        python3 -m benchmarks.responses [iterations]
+"""
+# IMPORTS
+import sys
+import timeit
+import datetime
+import zoneinfo
+import protocol
+from clock import CoarseClock, FixedClock
+from languages import build_registry
+from response_cache import ResponseCache
+from zones import ZoneRegistry
+import constants.config as cfg
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+    registry = build_registry([])
+    languages_by_code = {language.code: language for language in registry}
+
+    def build(language_code, request_type, now):
+        text = languages_by_code[language_code].text(request_type, now)
+        return protocol.pack_response(language_code, now, text.encode())
+
+    def build_per_request():
+        return build(0x0002, 0x0001, datetime.datetime.now())
+
+    zone = zoneinfo.ZoneInfo("Europe/Berlin")
+    zone_table = ZoneRegistry().find("Europe/Berlin")
+
+    def build_per_zoned_request():
+        return build(0x0002, 0x0001, datetime.datetime.now(zone))
+
+    cache = ResponseCache(build, list(languages_by_code), cfg.COMMAND_TYPES, CoarseClock())
+    fixed_cache = ResponseCache(
+        build, list(languages_by_code), cfg.COMMAND_TYPES,
+        FixedClock(datetime.datetime(2024, 2, 29, 13, 37)))
+
+    cases = [
+        ("datetime.now() + build", build_per_request),
+        ("coarse clock + cache", lambda: cache.get(0x0002, 0x0001)),
+        ("fixed clock + cache", lambda: fixed_cache.get(0x0002, 0x0001)),
+        ("zoneinfo + build", build_per_zoned_request),
+        ("zone table + cache", lambda: cache.get(0x0002, 0x0001, zone_table))
+    ]
+
+    print("{:<24} {:>10}".format("response from", "ns"))
+    for name, case in cases:
+        nanoseconds = min(timeit.repeat(case, number=iterations, repeat=3)) / iterations * 1e9
+        print("{:<24} {:>10.0f}".format(name, nanoseconds))
+
+    print("\nFixed clock packet: {}".format(fixed_cache.get(0x0002, 0x0001)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+    Cold start times of the server and the client.
+
+    Measures, in fresh interpreters, how long importing the server and client
+    modules takes, how long a server takes from being launched to answering
+    its first request, and the wall time of a one-shot client request.
+    Each figure is the median of several runs.
+
+    Run from the 'src' directory:
+        python3 -m benchmarks.startup [runs]
+"""
+# IMPORTS
+import sys
+import time
+import socket
+import statistics
+import subprocess
+from benchmarks.engines import REQUEST, free_ports
+
+
+def import_time(module, runs):
+    """
+        Returns the median time, in seconds, a fresh interpreter takes to import the module.
+    """
+    code = "import time; t = time.perf_counter(); import {}; print(time.perf_counter() - t)"
+    return statistics.median(
+        float(subprocess.run([sys.executable, "-c", code.format(module)],
+                             capture_output=True, text=True, check=True).stdout)
+        for _ in range(runs))
+
+
+def server_ready_time(port, runs):
+    """
+        Returns the median time, in seconds, from launching a server on the
+        given port until it answers a request.
+    """
+    times = []
+    probe = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    probe.settimeout(0.005)
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        process = subprocess.Popen([sys.executable, "server.py", str(port)],
+                                   stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL)
+        try:
+            while True:
+                probe.sendto(REQUEST, ("localhost", port))
+                try:
+                    probe.recvfrom(4096)
+                    break
+                except OSError:
+                    continue
+            times.append(time.perf_counter() - start)
+
+        finally:
+            process.terminate()
+            process.wait()
+
+    probe.close()
+    return statistics.median(times)
+
+
+def one_shot_time(port, runs):
+    """
+        Returns the median wall time, in seconds, of a one-shot client request
+        to a server on the given port.
+    """
+    process = subprocess.Popen([sys.executable, "server.py", str(port)],
+                               stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL)
+    time.sleep(1)
+    times = []
+
+    try:
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "client.py", "date", "localhost", str(port)],
+                           stdout=subprocess.DEVNULL, check=True)
+            times.append(time.perf_counter() - start)
+
+    finally:
+        process.terminate()
+        process.wait()
+
+    return statistics.median(times)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    port = free_ports(1)[0]
+
+    print("{:<24} {:>8.1f} ms".format("import server", import_time("server", runs) * 1000))
+    print("{:<24} {:>8.1f} ms".format("import client", import_time("client", runs) * 1000))
+    print("{:<24} {:>8.1f} ms".format("server ready", server_ready_time(port, runs) * 1000))
+    print("{:<24} {:>8.1f} ms".format("one-shot client", one_shot_time(port, runs) * 1000))
+
+
+# RUNTIME
+if __name__ == '__main__':
+    main()
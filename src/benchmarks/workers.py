@@ -0,0 +1,66 @@
+"""
+    Throughput scaling of the SO_REUSEPORT worker pool.
+
+    Starts the server with an increasing number of workers and drives it from
+    several client processes, each on its own socket so the kernel spreads
+    them across the workers. Reports the total responses per second.
+
+    Run from the 'src' directory:
+        python3 -m benchmarks.workers [duration] [window] [max workers]
+"""
+# IMPORTS
+import os
+import sys
+import time
+import multiprocessing
+import constants.config as cfg
+import server as server_module
+from benchmarks.engines import free_ports, drive
+
+
+def run_server(ports, workers):
+    """
+        Server process entry point. Output is discarded so that terminal I/O
+        does not dominate the measurement.
+    """
+    sys.stdout = open(os.devnull, 'w')
+    server_module.start_server(
+        [str(port) for port in ports], cfg.SERVER_ENGINE,
+        cfg.SERVER_RECV_BATCH_SIZE, workers)
+
+
+def main():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+    window = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    max_workers = int(sys.argv[3]) if len(sys.argv) > 3 else os.cpu_count()
+
+    counts = [1]
+    while counts[-1] * 2 <= max_workers:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != max_workers:
+        counts.append(max_workers)
+
+    print("{:<8} {:>12} {:>10}".format("workers", "req/s", "speedup"))
+    baseline = None
+    for workers in counts:
+        ports = free_ports(3)
+        process = multiprocessing.Process(
+            target=run_server, args=(ports, workers))
+        process.start()
+        time.sleep(0.5 + 0.1 * workers)
+
+        # Two client sockets per worker so every worker receives traffic
+        with multiprocessing.Pool(workers * 2) as pool:
+            rates = pool.starmap(
+                drive, [(ports[0], duration, window)] * (workers * 2))
+        total = sum(rates)
+
+        process.terminate()
+        process.join()
+
+        baseline = baseline or total
+        print("{:<8} {:>12.0f} {:>9.2f}x".format(workers, total, total / baseline))
+
+
+if __name__ == '__main__':
+    main()
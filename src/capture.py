@@ -0,0 +1,152 @@
+# IMPORTS
+from utils import *
+import os
+import time
+import struct
+import functools
+import collections
+import constants.config as cfg
+
+
+# CAPTURE FORMAT
+# Magic, Version, written once at the start of every capture file
+FILE_HEADER = struct.Struct("!4sH")
+FILE_MAGIC = b"DTCP"
+FILE_VERSION = 1
+
+# Timestamp (ns since the epoch), Source address (IPv6, or IPv4-mapped), Source port,
+# Server port, Length (of the payload that follows)
+RECORD_HEADER = struct.Struct("!q16sHHH")
+
+IPV4_MAPPED_PREFIX = b"\x00" * 10 + b"\xff\xff"
+
+CaptureRecord = collections.namedtuple("CaptureRecord", "timestamp source port payload")
+
+
+# Start of class ---------------------------------------------------------------
+class CaptureWriter:
+    """
+        Records incoming datagrams to an append-only capture file.
+        The capture is a ring of two segments: once the file at 'path' would
+        grow past 'max_bytes' it becomes 'path.1', replacing the previous
+        one, and a new file is started. At most about twice 'max_bytes' of
+        the most recent traffic is therefore kept.
+        Writes are buffered and flushed at least once a second.
+    """
+
+    def __init__(self, path, max_bytes=cfg.SERVER_CAPTURE_MAX_BYTES):
+        """
+            Initialise a writer, starting a new capture file at 'path'.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.recorded = 0
+        self.rotations = 0
+        self.file = None
+        self.written = 0
+        self.flushed_at = 0
+        self.open()
+
+    def open(self):
+        """
+            Starts a new, empty capture file.
+        """
+        self.file = open(self.path, "wb", buffering=1 << 16)
+        self.file.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION))
+        self.written = FILE_HEADER.size
+
+    def record(self, data, source, port):
+        """
+            Appends a datagram received from the (host, port) source address on
+            the given server port.
+        """
+        timestamp = time.time_ns()
+        size = RECORD_HEADER.size + len(data)
+
+        if self.written + size > self.max_bytes:
+            self.rotate()
+
+        self.file.write(RECORD_HEADER.pack(
+            timestamp, pack_address(source[0]), source[1], port, len(data)))
+        self.file.write(data)
+        self.written += size
+        self.recorded += 1
+
+        if timestamp - self.flushed_at >= 1000000000:
+            self.flushed_at = timestamp
+            self.file.flush()
+
+    def rotate(self):
+        """
+            Moves the current file to the older segment and starts a new one.
+        """
+        self.file.close()
+        os.replace(self.path, self.path + ".1")
+        self.rotations += 1
+        self.open()
+
+    def close(self):
+        """
+            Flushes and closes the capture file.
+        """
+        self.file.close()
+
+
+# End of class =================================================================
+
+
+@functools.lru_cache(maxsize=4096)
+def pack_address(host):
+    """
+        Returns a host address as 16 bytes, IPv4 addresses in their IPv4-mapped form.
+        Results are cached, as most traffic comes from a few busy sources.
+    """
+    if ":" in host:
+        return socket.inet_pton(socket.AF_INET6, host)
+    return IPV4_MAPPED_PREFIX + socket.inet_aton(host)
+
+
+def unpack_address(packed):
+    """
+        Returns the host address held in 16 bytes written by pack_address.
+    """
+    if packed.startswith(IPV4_MAPPED_PREFIX):
+        return socket.inet_ntoa(packed[12:])
+    return socket.inet_ntop(socket.AF_INET6, packed)
+
+
+def read_segment(path):
+    """
+        Yields the CaptureRecords of a single capture file, in the order they
+        were recorded. A record cut short, e.g. by the server being killed
+        while writing it, ends the segment, and a file the server has not yet
+        written its header to holds no records.
+        Raises ValueError if the file is not a capture file.
+    """
+    with open(path, "rb") as capture_file:
+        data = capture_file.read()
+
+    if len(data) < FILE_HEADER.size:
+        return
+    if FILE_HEADER.unpack_from(data) != (FILE_MAGIC, FILE_VERSION):
+        raise ValueError(path)
+
+    offset = FILE_HEADER.size
+    while offset + RECORD_HEADER.size <= len(data):
+        timestamp, source, source_port, port, length = RECORD_HEADER.unpack_from(data, offset)
+        offset += RECORD_HEADER.size
+        if offset + length > len(data):
+            break
+
+        yield CaptureRecord(timestamp, (unpack_address(source), source_port), port,
+                            data[offset:offset + length])
+        offset += length
+
+
+def read_capture(path):
+    """
+        Yields every CaptureRecord kept for a capture, the older segment first.
+    """
+    if os.path.exists(path + ".1"):
+        yield from read_segment(path + ".1")
+    yield from read_segment(path)
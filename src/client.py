@@ -1,5 +1,12 @@
 # IMPORTS
 from utils import *
+import sys
+import time
+import select
+import protocol
+import languages
+import rtt
+import settings
 import constants.config as cfg
 import constants.responses as responses
 
@@ -11,54 +18,95 @@ class Client:
         methods, in addition to methods that send and receive packets to and from a server.
     """
 
-    def __init__(self, command, server_ip_address, server_port):
+    def __init__(self, command, server_ip_address, server_port, language_code=None,
+                 hedge=cfg.CONFIG_HEDGE, transport=cfg.CONFIG_TRANSPORT, cache=None,
+                 verbose=cfg.CONFIG_VERBOSE, zone=None):
         """
             Initialise a client object.
+            With a language code, requests use the extended form naming that
+            language, so any port of the server can answer in it.
+            With a zone identifier, date and time requests use the zoned form,
+            asking for the date or time in that zone.
+            With 'hedge' set, a duplicate of each request is sent once the 95th
+            percentile round trip time has passed without a response.
+            The transport is 'udp' (datagrams) or 'tcp' (a stream connection,
+            kept open and shared with later clients of the same server).
+            With a ClientCache, date and time responses received earlier in the
+            same minute are answered from it. Verbose clients also print the
+            cache's hit and miss counters.
         """
         self.command = command
+        self.language_code = language_code
+        self.zone = zone
+        self.hedge = hedge
+        self.transport = transport
+        self.cache = cache
+        self.verbose = verbose
         self.server_ip_address = server_ip_address
         self.server_port = server_port
         self.server_full_address = (server_ip_address, int(server_port))
         self.sc = None
         self.dt_req_packet = None
+        self.next_sequence = 0
+
+        # Round trip times are shared by every client of the same server
+        self.rtt = rtt.estimator_for(self.server_full_address)
 
     # Operational functions ----------------------------------------------------
 
     def send_packet(self, packet):
         """
             Given a packet, send it through the open socket.
+            Returns true if a valid response was received, false otherwise.
         """
         if self.sc is not None and packet == self.dt_req_packet:
+
+            # A response cached earlier in the same minute is still the answer
+            if self.answer_from_cache():
+                return True
+
             print(responses.STATUS_SENDING_PACKET.format(
                 packet, self.server_ip_address, self.server_port))
 
             try:
-                # Set the socket's timeout to a given time
-                self.sc.settimeout(cfg.CONFIG_RESPONSE_WAITTIME)
+                # Send the created packet, retransmitting datagrams until the server responds
+                response = self.round_trip(packet)
 
-                # Send the created packet to the server over the open socket
-                self.sc.sendto(packet, self.server_full_address)
+                if response is None:
+                    print(responses.ERROR_BOUNCE_BACK_TIMEOUT.format(
+                        cfg.CONFIG_RESPONSE_WAITTIME))
+                    return False
 
-                # Wait for and capture the server's response
-                data, bounce_back_address = self.sc.recvfrom(4096)
+                data, bounce_back_address = response
+
+                if self.rtt.retransmits or self.rtt.hedges:
+                    print(responses.STATUS_RETRANSMITS.format(
+                        self.rtt.retransmits, self.rtt.hedges))
 
                 if len(data) is not None:
                     print(responses.SUCCESS_RECEIVED_BOUNCE_BACK.format(
                         bounce_back_address[0], bounce_back_address[1]))
 
+                    # A stats request is answered with a metrics snapshot
+                    if self.command == "stats":
+                        return self.print_stats(data, bounce_back_address)
+
+                    # A batch request is answered with one record per item
+                    elif self.command == "batch":
+                        return self.print_batch(data, bounce_back_address)
+
                     # If the response packet is valid
-                    if self.validate_bounce_back(data, bounce_back_address):
+                    elif self.validate_bounce_back(data, bounce_back_address):
                         self.print_bounce_back(data)
+                        if self.cache is not None and self.command in ("date", "time"):
+                            self.cache.put(self.cache_key(), data)
+                        return True
 
                 else:
                     print(responses.ERROR_MALFORMED_BOUNCE_BACK.format(
                         bounce_back_address[0], bounce_back_address[1], data))
 
-            except socket.timeout:
-                print(responses.ERROR_BOUNCE_BACK_TIMEOUT.format(
-                    responses.CONFIG_RESPONSE_WAITTIME))
-
-            except ConnectionResetError:
+            except ConnectionError:
                 print(responses.ERROR_CONNECTION_REFUSED.format(
                     self.server_ip_address, self.server_port))
 
@@ -70,84 +118,607 @@ class Client:
         elif self.sc is None:
             print(responses.ERROR_NO_SOCKET)
 
-    def validate_bounce_back(self, data, bounce_back_address):
+        return False
+
+    def cache_key(self):
         """
-            Runs the given packet through various validity checks.
-            Returns true if every check is passed, false otherwise.
+            Returns the key of the client's request in the response cache.
+        """
+        return (self.server_ip_address, int(self.server_port), self.command,
+                self.language_code, self.zone)
+
+    def answer_from_cache(self):
+        """
+            Prints the cached response to the client's date or time request, if
+            there is one for the current minute.
+            Returns true if the request was answered from the cache.
+        """
+        if self.cache is None or self.command not in ("date", "time"):
+            return False
+
+        data = self.cache.get(self.cache_key())
+
+        if self.verbose:
+            print(responses.STATUS_CACHE_COUNTERS.format(self.cache.hits, self.cache.misses))
+
+        if data is None:
+            return False
+
+        print(responses.SUCCESS_CACHED_RESPONSE)
+        self.print_bounce_back(data)
+        return True
+
+    def round_trip(self, packet, accept=None):
+        """
+            Sends the packet over the client's transport and waits for the response.
+            Returns a (data, address) tuple, or None if no response arrived.
+        """
+        if self.transport == "tcp":
+            return self.exchange_stream(packet, accept)
+        return self.exchange(packet, accept)
+
+    def exchange_stream(self, packet, accept=None):
+        """
+            Sends the packet over the shared stream connection to the server and
+            waits for the response. A connection found closed, e.g. by the server's
+            idle timeout, is reopened once. A timed out connection is closed, as
+            its late response would otherwise be read as the next one.
+            With 'accept' given, packets it returns false for are skipped.
+            Returns a (data, address) tuple, or None if no response arrived.
+        """
+        import stream
+
+        for attempt in range(2):
+            try:
+                connection = stream.connection_for(
+                    self.server_full_address, cfg.CONFIG_RESPONSE_WAITTIME)
+                connection.send(packet)
+
+                while True:
+                    data = connection.receive()
+                    if accept is None or accept(data):
+                        return data, self.server_full_address
+
+            except socket.timeout:
+                stream.discard(self.server_full_address)
+                return None
+
+            except ConnectionError:
+                stream.discard(self.server_full_address)
+                if attempt:
+                    raise
+
+    def exchange(self, packet, accept=None):
+        """
+            Sends the packet and waits for the server's response, retransmitting
+            the packet each time the current timeout passes. In hedged mode a
+            single duplicate is also sent once the 95th percentile round trip
+            time has passed, as long as hedges stay within the hedge budget.
+            Gives up after CONFIG_MAX_RETRANSMITS retransmits or once the
+            response wait time has passed. Retransmits beyond the retransmit
+            budget are not sent.
+            With 'accept' given, datagrams it returns false for are ignored.
+            Returns a (data, address) tuple, or None if no response arrived.
+        """
+        self.rtt.requests += 1
+        first_sent = time.perf_counter()
+        give_up_at = first_sent + cfg.CONFIG_RESPONSE_WAITTIME
+        retransmit_at = first_sent + self.rtt.timeout(0)
+        attempt = 0
+        hedged = False
+
+        hedge_at = None
+        hedge_delay = self.rtt.hedge_delay() if self.hedge else None
+        if hedge_delay is not None:
+            hedge_at = first_sent + hedge_delay
+
+        self.sc.sendto(packet, self.server_full_address)
+
+        while True:
+            now = time.perf_counter()
+            if now >= give_up_at:
+                return None
+
+            if hedge_at is not None and now >= hedge_at:
+                if self.rtt.may_hedge():
+                    self.sc.sendto(packet, self.server_full_address)
+                    self.rtt.hedges += 1
+                    hedged = True
+                hedge_at = None
+
+            if now >= retransmit_at:
+                if attempt >= cfg.CONFIG_MAX_RETRANSMITS:
+                    return None
+
+                # Over the retransmit budget, the request waits out the response wait time
+                if not self.rtt.may_retransmit():
+                    retransmit_at = give_up_at
+                    continue
+
+                attempt += 1
+                self.sc.sendto(packet, self.server_full_address)
+                self.rtt.retransmits += 1
+                retransmit_at = now + self.rtt.timeout(attempt)
+
+            wake_at = min(give_up_at, retransmit_at)
+            if hedge_at is not None:
+                wake_at = min(wake_at, hedge_at)
+
+            incoming, outgoing, exceptions = select.select(
+                [self.sc], [], [], max(0, wake_at - now))
+            if not incoming:
+                continue
+
+            data, bounce_back_address = self.sc.recvfrom(cfg.CONFIG_RECV_BUFFER_SIZE)
+            if accept is not None and not accept(data):
+                continue
+
+            # Karn's rule: a response to a request sent more than once could
+            # answer any of the copies, so its round trip time is not sampled
+            if attempt == 0 and not hedged:
+                self.rtt.sample(time.perf_counter() - first_sent)
+
+            return data, bounce_back_address
+
+    def watch(self, updates=None):
         """
-        error_codes = []
+            Subscribes to the server with the client's subscribe packet and prints
+            every update it pushes, renewing the subscription halfway through each
+            lease so that it survives lost packets and server restarts.
+            The server answers every renewal with the current packet, so a packet
+            for the minute already printed is skipped rather than printed again.
+            Runs until 'updates' updates have been printed, or until interrupted,
+            then cancels the subscription.
+        """
+        if self.sc is None:
+            print(responses.ERROR_NO_SOCKET)
+            return
+
+        received = 0
+        renew_at = 0
+        last_minute = None
+
+        try:
+            while updates is None or received < updates:
+                now = time.monotonic()
+                if now >= renew_at:
+                    print(responses.STATUS_SUBSCRIBING.format(
+                        self.server_ip_address, self.server_port, cfg.CONFIG_WATCH_LEASE))
+                    self.sc.sendto(self.dt_req_packet, self.server_full_address)
+                    renew_at = now + cfg.CONFIG_WATCH_LEASE / 2
+
+                incoming, outgoing, exceptions = select.select(
+                    [self.sc], [], [], renew_at - now)
+                if not incoming:
+                    continue
+
+                data, bounce_back_address = self.sc.recvfrom(cfg.CONFIG_RECV_BUFFER_SIZE)
+                if protocol.validate_response(data) != 0:
+                    self.validate_bounce_back(data, bounce_back_address)
+                    continue
+
+                # Year, Month, Day, Hour and Minute of the update
+                minute = protocol.unpack_response_header(data)[3:8]
+                if minute == last_minute:
+                    continue
+
+                if self.validate_bounce_back(data, bounce_back_address):
+                    self.print_bounce_back(data)
+                    last_minute = minute
+                    received += 1
+
+        except KeyboardInterrupt:
+            pass
+
+        except ConnectionResetError:
+            print(responses.ERROR_CONNECTION_REFUSED.format(
+                self.server_ip_address, self.server_port))
+
+        print(responses.STATUS_UNSUBSCRIBING)
+        request_type, language_code, lease = protocol.unpack_subscribe_request(self.dt_req_packet)
+        self.sc.sendto(protocol.pack_subscribe_request(request_type, language_code, 0),
+                       self.server_full_address)
+
+    def listen(self, updates=None):
+        """
+            Joins the multicast group given as the client's server address and
+            port, then validates and prints every response published to it, or
+            only those in the client's language when it has one.
+            Runs until 'updates' responses have been printed, or until interrupted.
+        """
+        if self.sc is None:
+            import multicast
+            print(responses.STATUS_JOINING_GROUP.format(self.server_ip_address, self.server_port))
+            self.sc = multicast.open_listener_socket(self.server_ip_address, self.server_port)
+
+        received = 0
+
+        try:
+            while updates is None or received < updates:
+                data, bounce_back_address = self.sc.recvfrom(cfg.CONFIG_RECV_BUFFER_SIZE)
 
-        # Check the size of the response
-        if len(data) < 13:
-            error_codes.append(1)
+                # Responses in other languages are skipped before any output
+                if self.language_code is not None and (
+                        len(data) < protocol.RESPONSE_HEADER.size
+                        or protocol.unpack_response_header(data)[2] != self.language_code):
+                    continue
 
-        # Check that the MagicNo field contains 0x497E
-        elif ((data[0] << 8) | data[1]) != 0x497E:
-            error_codes.append(2)
+                if self.validate_bounce_back(data, bounce_back_address):
+                    self.print_bounce_back(data)
+                    received += 1
 
-        # Check that the PacketType field contains 0x0002
-        elif ((data[2] << 8) | data[3]) != 0x0002:
-            error_codes.append(3)
+        except KeyboardInterrupt:
+            pass
 
-        # Check that the LanguageCode field contains a code from the supported languages
-        elif ((data[4] << 8) | data[5]) not in cfg.CONFIG_LANGUAGE_CODES:
-            error_codes.append(4)
+    def send_batch(self, items):
+        """
+            Asks for several dates and times in a single round trip. 'items' is a
+            list of (command, language code) pairs, where the command is 'date' or
+            'time' and a language code of None means the port's language.
+            Returns the valid response packets in item order, or None if no valid
+            batch response arrived.
+        """
+        if self.transport == "udp" and self.sc is None:
+            print(responses.ERROR_NO_SOCKET)
+            return None
 
-        # Check that the Year field is lower than 2100
-        elif ((data[6] << 8) | data[7]) >= 2100:
-            error_codes.append(5)
+        sequence = self.take_sequence()
+        packet = protocol.pack_batch_request(
+            [(request_type(command), language_code) for command, language_code in items],
+            sequence)
 
-        # Check that the Month field is a number between 1 and 12
-        elif not (1 <= data[8] <= 12):
-            error_codes.append(6)
+        try:
+            response = self.round_trip(
+                packet, lambda data: protocol.batch_response_sequence(data) == sequence)
 
-        # Check that the Day field is a number between 1 and 31
-        elif not (1 <= data[9] <= 31):
-            error_codes.append(7)
+        except ConnectionError:
+            print(responses.ERROR_CONNECTION_REFUSED.format(
+                self.server_ip_address, self.server_port))
+            return None
 
-        # Check that the Hour field is a number between 0 and 23
-        elif not (0 <= data[10] <= 23):
-            error_codes.append(8)
+        if response is None:
+            print(responses.ERROR_BOUNCE_BACK_TIMEOUT.format(cfg.CONFIG_RESPONSE_WAITTIME))
+            return None
+
+        data, bounce_back_address = response
+        batch = protocol.unpack_batch_response(data)
+
+        if (batch is None or len(batch[1]) != len(items)
+                or any(protocol.validate_response(record) != 0 for record in batch[1])):
+            print(responses.ERROR_MALFORMED_BOUNCE_BACK.format(
+                bounce_back_address[0], bounce_back_address[1], data, None))
+            return None
 
-        # Check that the Minute field is a number between 0 and 59
-        elif not (0 <= data[11] <= 59):
-            error_codes.append(9)
+        return batch[1]
 
-        # Check that the Length field is a valid representation of the packet
-        elif len(data) != (data[12] + 13):
-            print("len(data):", len(data))
-            print("(data[12] + 13)", (data[12] + 13))
-            error_codes.append(10)
+    def send_pipelined(self, count, window=cfg.CONFIG_PIPELINE_WINDOW):
+        """
+            Sends 'count' requests through the open socket, keeping up to 'window'
+            of them outstanding at once. Every copy of a request carries its own
+            sequence number, so each response is matched to the request, and the
+            copy, it answers. Requests are retransmitted and hedged as in exchange,
+            with timeouts that allow for the window of requests queued at the server.
+            Returns a {request number: latency} dictionary, with latencies in
+            seconds from the first send and None for requests that were not
+            validly answered.
+        """
+        if self.transport == "tcp":
+            return self.send_pipelined_stream(count, window)
+
+        if self.sc is None:
+            print(responses.ERROR_NO_SOCKET)
+            return None
+
+        import heapq
+
+        latencies = {}
+        counters = self.rtt.counters()
+        pending = {}    # Request number -> state of the request
+        requests_by_sequence = {}    # Sequence of every copy in flight -> request number
+        timers = []    # Heap of (due time, request number, attempt, is hedge)
+        started = 0
+        hedge_delay = self.rtt.hedge_delay() if self.hedge else None
+
+        # The server works through the whole window as one backlog, so even the
+        # first requests of a burst are answered only after most of the others
+        queued = min(window, count) - 1
+
+        try:
+            while started < count or pending:
+
+                # Top the window up with new requests
+                while started < count and len(pending) < window:
+                    now = time.perf_counter()
+                    pending[started] = {"first_sent": now, "attempt": 0,
+                                        "hedge_sequence": None, "sequences": []}
+                    self.send_copy(started, pending[started], requests_by_sequence)
+                    heapq.heappush(timers, (now + self.rtt.timeout(0, queued), started, 0, False))
+                    if hedge_delay is not None:
+                        heapq.heappush(timers, (now + hedge_delay, started, 0, True))
+                    self.rtt.requests += 1
+                    started += 1
+
+                # Discard timers of requests answered or retransmitted since
+                due, request, attempt, is_hedge = timers[0]
+                state = pending.get(request)
+                if state is None or state["attempt"] != attempt:
+                    heapq.heappop(timers)
+                    continue
+
+                now = time.perf_counter()
+                if due <= now:
+                    heapq.heappop(timers)
+
+                    if is_hedge:
+                        if self.rtt.may_hedge():
+                            state["hedge_sequence"] = self.send_copy(
+                                request, state, requests_by_sequence)
+                            self.rtt.hedges += 1
+
+                    elif (attempt >= cfg.CONFIG_MAX_RETRANSMITS
+                          or now - state["first_sent"] >= cfg.CONFIG_RESPONSE_WAITTIME):
+                        latencies[request] = None
+                        self.forget(pending.pop(request), requests_by_sequence)
+
+                    # Over the retransmit budget, the request waits out the response wait time
+                    elif not self.rtt.may_retransmit():
+                        heapq.heappush(timers, (
+                            state["first_sent"] + cfg.CONFIG_RESPONSE_WAITTIME, request,
+                            attempt, False))
+
+                    else:
+                        state["attempt"] += 1
+                        self.send_copy(request, state, requests_by_sequence)
+                        self.rtt.retransmits += 1
+                        heapq.heappush(timers, (
+                            now + self.rtt.timeout(state["attempt"], queued), request,
+                            state["attempt"], False))
+                    continue
+
+                incoming, outgoing, exceptions = select.select([self.sc], [], [], due - now)
+                if not incoming:
+                    continue
+
+                data, bounce_back_address = self.sc.recvfrom(4096)
+                received = time.perf_counter()
+                if protocol.validate_response(data) != 0:
+                    continue
+
+                sequence = protocol.response_sequence(data)
+                request = requests_by_sequence.get(sequence)
+                if request is None:
+                    continue
+
+                state = pending.pop(request)
+                latencies[request] = received - state["first_sent"]
+                self.forget(state, requests_by_sequence)
+                self.rtt.sample_gap(received, len(pending))
+
+                if sequence == state["hedge_sequence"]:
+                    self.rtt.hedge_wins += 1
+                elif state["attempt"] == 0 and state["hedge_sequence"] is None:
+                    self.rtt.sample(received - state["first_sent"])
+
+        except ConnectionResetError:
+            print(responses.ERROR_CONNECTION_REFUSED.format(
+                self.server_ip_address, self.server_port))
+
+        self.print_pipeline_summary(latencies, count, self.rtt.counters(since=counters))
+        return latencies
+
+    def send_pipelined_stream(self, count, window=cfg.CONFIG_PIPELINE_WINDOW):
+        """
+            The stream transport's send_pipelined. Each write tops the window up
+            with sequenced requests, and responses are matched by sequence number
+            as they are read. Nothing is retransmitted, as the stream is reliable,
+            but requests the server drops are given up on after the wait time.
+        """
+        import stream
+
+        latencies = {}
+        counters = self.rtt.counters()
+        outstanding = {}    # Sequence -> (request number, send time)
+        started = 0
+
+        try:
+            connection = stream.connection_for(
+                self.server_full_address, cfg.CONFIG_RESPONSE_WAITTIME)
+
+            while started < count or outstanding:
+
+                # Top the window up with new requests, sent in a single write
+                packets = []
+                while started < count and len(outstanding) < window:
+                    sequence = self.take_sequence()
+                    packets.append(build_dt_request_packet(
+                        self.command, self.language_code, sequence, self.zone))
+                    outstanding[sequence] = (started, time.perf_counter())
+                    started += 1
+                if packets:
+                    connection.send(*packets)
+
+                data = connection.receive()
+                received = time.perf_counter()
+                if protocol.validate_response(data) != 0:
+                    continue
+
+                request = outstanding.pop(protocol.response_sequence(data), None)
+                if request is not None:
+                    latencies[request[0]] = received - request[1]
+
+        except socket.timeout:
+            stream.discard(self.server_full_address)
+
+        except ConnectionError:
+            stream.discard(self.server_full_address)
+            print(responses.ERROR_CONNECTION_REFUSED.format(
+                self.server_ip_address, self.server_port))
+
+        for request in range(count):
+            latencies.setdefault(request, None)
+
+        self.print_pipeline_summary(latencies, count, self.rtt.counters(since=counters))
+        return latencies
+
+    def send_copy(self, request, state, requests_by_sequence):
+        """
+            Sends one copy of a pipelined request under a new sequence number.
+            Returns the sequence number used.
+        """
+        sequence = self.take_sequence()
+        packet = build_dt_request_packet(self.command, self.language_code, sequence, self.zone)
+        self.sc.sendto(packet, self.server_full_address)
+
+        state["sequences"].append(sequence)
+        requests_by_sequence[sequence] = request
+        return sequence
+
+    def take_sequence(self):
+        """
+            Returns the next sequence number to send, wrapping at MAX_SEQUENCE.
+        """
+        sequence = self.next_sequence
+        self.next_sequence = (self.next_sequence + 1) & protocol.MAX_SEQUENCE
+        return sequence
+
+    def forget(self, state, requests_by_sequence):
+        """
+            Stops matching responses to any copy of a finished pipelined request.
+        """
+        for sequence in state["sequences"]:
+            requests_by_sequence.pop(sequence, None)
+
+    def validate_bounce_back(self, data, bounce_back_address):
+        """
+            Runs the given packet through the protocol's validity checks.
+            Returns true if every check is passed, false otherwise.
+        """
+        error_code = protocol.validate_response(data)
 
-        if len(error_codes) == 0:
+        if error_code == 0:
             print(responses.SUCCESS_VALID_BOUNCE_BACK.format(
                 bounce_back_address[0], bounce_back_address[1], data))
             return True
 
         else:
             print(responses.ERROR_MALFORMED_BOUNCE_BACK.format(
-                bounce_back_address[0], bounce_back_address[1], data, error_codes))
+                bounce_back_address[0], bounce_back_address[1], data, error_code))
             return False
 
     def print_bounce_back(self, data):
         """
             Given a packet, print the contents of the packet in a readable way.
         """
+        (magic_no, packet_type, language_code, year, month,
+         day, hour, minute, length) = protocol.unpack_response_header(data)
+
         print("\n--------------------------------------------------")
-        print("- MagicNo:        {}".format(hex((data[0] << 8) | data[1])))
-        print("- PacketType:     {}".format((data[2] << 8) | data[3]))
-        print("- LanguageCode:   {}".format((data[4] << 8) | data[5]))
-        print("- Year:           {}".format((data[6] << 8) | data[7]))
-        print("- Month:          {:0>2}".format(data[8]))
-        print("- Day:            {:0>2}".format(data[9]))
-        print("- Hour:           {:0>2}".format(data[10]))
-        print("- Minute:         {:0>2}".format(data[11]))
-        print("- Length:         {}".format(data[12]))
+        print("- MagicNo:        {}".format(hex(magic_no)))
+        print("- PacketType:     {}".format(packet_type))
+        print("- LanguageCode:   {}".format(language_code))
+        print("- Year:           {}".format(year))
+        print("- Month:          {:0>2}".format(month))
+        print("- Day:            {:0>2}".format(day))
+        print("- Hour:           {:0>2}".format(hour))
+        print("- Minute:         {:0>2}".format(minute))
+        print("- Length:         {}".format(length))
+        if self.zone is not None:
+            print("- Zone:           {}".format(self.zone))
+        print("-" * 50)
+        if length > 0:
+            print("- Text:           {}".format(protocol.response_text(data)))
         print("-" * 50)
-        if data[12] > 0:
-            print("- Text:           {}".format(data[13:].decode()))
+
+    def print_batch(self, data, bounce_back_address):
+        """
+            Given a batch response packet, validate and print each of its records.
+            Returns true if every record is valid, false otherwise.
+        """
+        batch = protocol.unpack_batch_response(data)
+
+        if batch is None:
+            print(responses.ERROR_MALFORMED_BOUNCE_BACK.format(
+                bounce_back_address[0], bounce_back_address[1], data, None))
+            return False
+
+        valid = True
+        for record in batch[1]:
+            if self.validate_bounce_back(record, bounce_back_address):
+                self.print_bounce_back(record)
+            else:
+                valid = False
+
+        return valid
+
+    def print_pipeline_summary(self, latencies, count, counters):
+        """
+            Print how many pipelined requests were answered, their latency
+            percentiles and the retransmit and hedge counters of the run.
+        """
+        answered = sorted(latency for latency in latencies.values() if latency is not None)
+
+        print("\n--------------------------------------------------")
+        print("- Requests:       {}".format(count))
+        print("- Answered:       {}".format(len(answered)))
+        print("- Lost:           {}".format(count - len(answered)))
+        print("- Retransmits:    {} ({:.2%})".format(
+            counters["retransmits"], counters["retransmit_rate"]))
+        print("- Hedges:         {} ({:.2%}, {} won)".format(
+            counters["hedges"], counters["hedge_rate"], counters["hedge_wins"]))
+        if answered:
+            for percentile in (50, 90, 99):
+                index = min(len(answered) - 1, len(answered) * percentile // 100)
+                print("- p{:<14} {:.3f} ms".format(
+                    str(percentile) + ":", answered[index] * 1000))
         print("-" * 50)
 
+    def print_stats(self, data, bounce_back_address):
+        """
+            Given a stats response packet, print the server's metrics snapshot.
+            Returns true if the packet held a snapshot, false otherwise.
+        """
+        import json
+
+        body = protocol.unpack_stats_response(data)
+
+        if body is None:
+            print(responses.ERROR_MALFORMED_BOUNCE_BACK.format(
+                bounce_back_address[0], bounce_back_address[1], data, None))
+            return False
+
+        stats = json.loads(body)
+
+        print("\n--------------------------------------------------")
+        print("- Uptime:         {} s".format(stats["uptime_s"]))
+        print("-" * 50)
+        for port, counters in stats["ports"].items():
+            print("- Port {} ({})".format(port, counters["language"]))
+            print("-   Received:     {}".format(counters["received"]))
+            print("-   Dropped:      {}".format(counters["dropped"]))
+            print("-   Rate limited: {}".format(counters["rate_limited"]))
+            print("-   Valid:        {}".format(counters["valid"]))
+            print("-   Malformed:    {}".format(counters["malformed"]))
+            print("-   Sent:         {}".format(counters["sent"]))
+            print("-   Send errors:  {}".format(counters["send_errors"]))
+            print("-   Queued:       {}".format(counters["queued"]))
+            print("-   Send dropped: {}".format(counters["send_dropped"]))
+            print("-   Kernel drops: {}".format(counters["kernel_drops"]))
+        print("-" * 50)
+        subscriptions = stats["subscriptions"]
+        print("- Subscribers:    {} ({} refused, {} updates pushed)".format(
+            subscriptions["subscribers"], subscriptions["refused"], subscriptions["pushed"]))
+        print("- Multicast:      {} packets published".format(stats["multicast"]["published"]))
+        print("- Streams:        {} open ({} refused, {} closed when idle)".format(
+            stats["streams"]["connections"], stats["streams"]["refused"],
+            stats["streams"]["idle_closed"]))
+        print("-" * 50)
+        for stage, histogram in stats["latency"].items():
+            print("- {:<15} count {}, mean {} ns, p50 < {} ns, p99 < {} ns".format(
+                stage.capitalize() + ":", histogram["count"], histogram["mean_ns"],
+                histogram["p50_ns"], histogram["p99_ns"]))
+        print("-" * 50)
+        return True
+
     # Creation functions -------------------------------------------------------
 
     def create_udp_socket(self):
@@ -168,30 +739,11 @@ class Client:
         """
             Creates a date/time request packet.
             Returns a valid packet that is ready to be sent to a server.
-            Groups of bytes are accessible via: (byte_a << 8) | byte_b.
         """
         if self.dt_req_packet is None:
             print(responses.STATUS_CREATING_DT_PACKET)
-
-            # Magic number (2 bytes)
-            byte_1 = 0x49
-            byte_2 = 0x7E
-
-            # Packet type (2 bytes)
-            byte_3 = 0x00
-            byte_4 = 0x01
-
-            # Request type (2 bytes)
-            byte_5 = 0x00
-            byte_6 = 0x01  # default to date
-
-            if self.command == "date":
-                byte_6 = 0x01
-            elif self.command == "time":
-                byte_6 = 0x02
-
-            self.dt_req_packet = bytearray(
-                [byte_1, byte_2, byte_3, byte_4, byte_5, byte_6])
+            self.dt_req_packet = build_dt_request_packet(
+                self.command, self.language_code, zone=self.zone)
             return self.dt_req_packet
         else:
             print(responses.ERROR_DT_REQUEST_ALREADY_EXISTS)
@@ -226,24 +778,81 @@ class Client:
 # End of class =================================================================
 
 
+def build_dt_request_packet(command, language_code=None, sequence=None, zone=None):
+    """
+        Builds the request packet for the given command ('date', 'time', 'batch',
+        'watch' or 'stats'), shared by the Client and the load generator. Date/time
+        requests for a zone use the zoned form, those with a sequence number the
+        12 byte sequenced form, those with only a language code the 8 byte
+        extended form, otherwise 6 bytes. Other commands ignore the zone.
+        A batch asks for the date and time in the given language, or in every language.
+        A watch subscribes to the time, which changes at the start of every minute.
+    """
+    if command == "stats":
+        return protocol.pack_stats_request()
+
+    if command == "watch":
+        return protocol.pack_subscribe_request(
+            request_type("time"), language_code, cfg.CONFIG_WATCH_LEASE)
+
+    if command == "batch":
+        return protocol.pack_batch_request(batch_items(language_code), sequence or 0)
+
+    return protocol.pack_request(request_type(command), language_code, sequence, zone)
+
+
+def request_type(command):
+    """
+        Returns the RequestType for a 'date' or 'time' command.
+    """
+    if command == "time":
+        return 0x0002
+
+    return 0x0001  # default to date
+
+
+def batch_items(language_code=None):
+    """
+        Returns the (RequestType, LanguageCode) items asking for both the date and
+        the time in the given language, or in every registered language.
+    """
+    language_codes = [language_code] if language_code is not None else cfg.CONFIG_LANGUAGE_CODES
+    return [(request_type(command), code)
+            for code in language_codes for command in ("date", "time")]
+
+
 def read_from_terminal():
     """
         Reads input from the terminal. Returns an array of the format:
-            [0] -> command
-            [1] -> ip address
-            [2] -> port
+            [0]     -> command
+            [1]     -> ip address
+            [2]     -> port
+            [3]     -> language code, tag or name (optional)
+            [-1]    -> transport (optional, 'udp' or 'tcp')
     """
     raw_input = input("> ")
     input_array = raw_input.strip().split()
     return input_array
 
 
+def split_input(input_array):
+    """
+        Splits the terminal input into the request and the optional transport.
+        Returns a (request, transport) tuple, with the default transport if none was given.
+    """
+    if len(input_array) > 3 and input_array[-1] in cfg.CONFIG_TRANSPORTS:
+        return input_array[:-1], input_array[-1]
+    return input_array, cfg.CONFIG_TRANSPORT
+
+
 def check_input(input_array):
     """
         This is the parent function that calls specific checking functions.
         Returns true if all tests are passed, false otherwise.
     """
-    if len(input_array) != 3:
+    input_array, transport = split_input(input_array)
+
+    if len(input_array) not in (3, 4):
         print(responses.ERROR_INVALID_INPUT)
         return False
 
@@ -260,18 +869,42 @@ def check_input(input_array):
         print(responses.ERROR_INVALID_PORT_NUMBER.format(input_array[2]))
         return False
 
+    if len(input_array) == 4 and not valid_language(input_array):
+        print(responses.ERROR_INVALID_LANGUAGE.format(input_array[3]))
+        return False
+
     return True
 
 
-def start_client(input_array):
+def start_client(input_array, cache=None):
     """
         Instantiates a client object and instructs it to create a socket,
         create a date/time request packet and send it to a server.
+        Watching and listening always use datagrams, whatever the transport.
+        Returns true if the request was validly answered, false otherwise.
     """
     print(responses.STATUS_STARTING_CLIENT)
+    input_array, transport = split_input(input_array)
+
+    # Requests name their language only when one was given
+    language_code = None
+    if len(input_array) == 4:
+        language_code = languages.find(input_array[3])["code"]
+
+    # Responses are only cached when asked for, in the cache file if one is set
+    if cache is None and cfg.CONFIG_CACHE:
+        from client_cache import ClientCache
+        cache = ClientCache(cfg.CONFIG_CACHE_FILE)
 
     # Instantiate a new client object with the provided command and server information
-    client = Client(input_array[0], input_array[1], input_array[2])
+    client = Client(input_array[0], input_array[1], input_array[2], language_code,
+                    hedge=cfg.CONFIG_HEDGE, transport=transport, cache=cache,
+                    verbose=cfg.CONFIG_VERBOSE, zone=cfg.CONFIG_TIMEZONE)
+
+    # Multicast listeners join the group rather than sending any request
+    if client.command == "listen":
+        client.listen()
+        return True
 
     # Create a new UDP socket
     client.create_udp_socket()
@@ -279,13 +912,114 @@ def start_client(input_array):
     # Create a date/time request packet
     dt_req_packet = client.create_dt_request_packet()
 
-    # Send the packet to the server provided
-    client.send_packet(dt_req_packet)
+    # Send the packet to the server provided, or keep printing its updates
+    try:
+        if client.command == "watch":
+            client.watch()
+            return True
+        return client.send_packet(dt_req_packet)
+
+    finally:
+        client.sc.close()
+
+
+def run_requests(lines):
+    """
+        Sends every request in the given lines, one request per line in the
+        same format as at the prompt. Blank lines and lines starting with '#'
+        are skipped. Every request shares the response cache, if enabled.
+        Returns the number of requests that were invalid or not validly answered.
+    """
+    cache = None
+    if cfg.CONFIG_CACHE:
+        from client_cache import ClientCache
+        cache = ClientCache(cfg.CONFIG_CACHE_FILE)
+
+    failed = 0
+    for line in lines:
+        input_array = line.strip().split()
+        if not input_array or input_array[0].startswith("#"):
+            continue
+
+        if not check_input(input_array) or not start_client(input_array, cache):
+            failed += 1
+
+    return failed
+
+
+def parse_arguments(argv):
+    """
+        Parses the client's command line arguments. Each option overrides the
+        config value named in its help, as does each value in a config file.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Date/time client. Sends the request given on the command line, "
+                    "the requests in a file, or asks for a request at a prompt.")
+    parser.add_argument("request", nargs="*",
+                        help="a request in the same format as at the prompt, "
+                             "e.g. 'date localhost 3333 de tcp'")
+    parser.add_argument("--file",
+                        help="send every request in this file, one per line, '-' for stdin")
+    parser.add_argument("--config", help="JSON file of config values to override")
+    parser.add_argument("--transport", choices=cfg.CONFIG_TRANSPORTS, help="CONFIG_TRANSPORT")
+    parser.add_argument("--timeout", type=float, help="CONFIG_RESPONSE_WAITTIME")
+    parser.add_argument("--zone", help="ask for the date or time in this zone, "
+                                       "e.g. 'Europe/Berlin' (CONFIG_TIMEZONE)")
+    parser.add_argument("--hedge", action="store_const", const=True, help="CONFIG_HEDGE")
+    parser.add_argument("--cache", action="store_const", const=True, help="CONFIG_CACHE")
+    parser.add_argument("--cache-file", help="CONFIG_CACHE_FILE")
+    parser.add_argument("--verbose", action="store_const", const=True, help="CONFIG_VERBOSE")
+    return parser.parse_args(argv)
+
+
+def configure(args):
+    """
+        Applies the config file, then the command line options, over the
+        values of constants/config.py.
+        Returns true if they were applied, false if the config file or the zone was invalid.
+    """
+    try:
+        if args.config is not None:
+            settings.apply_config_file(args.config)
+
+    except (OSError, ValueError):
+        print(responses.ERROR_CONFIG_FILE.format(args.config))
+        return False
+
+    settings.apply(settings.flag_overrides(args, {
+        "transport": "CONFIG_TRANSPORT", "timeout": "CONFIG_RESPONSE_WAITTIME",
+        "hedge": "CONFIG_HEDGE", "cache": "CONFIG_CACHE", "cache_file": "CONFIG_CACHE_FILE",
+        "verbose": "CONFIG_VERBOSE", "zone": "CONFIG_TIMEZONE"}))
+
+    if cfg.CONFIG_TIMEZONE is not None and not protocol.valid_zone(cfg.CONFIG_TIMEZONE):
+        print(responses.ERROR_INVALID_ZONE.format(cfg.CONFIG_TIMEZONE))
+        return False
+
+    return True
 
 
 # RUNTIME
 if __name__ == '__main__':
 
+    args = parse_arguments(sys.argv[1:])
+    if not configure(args):
+        sys.exit(2)
+
+    # Requests from a file or stdin exit with status 1 if any of them failed
+    if args.file is not None:
+        if args.file == "-":
+            sys.exit(1 if run_requests(sys.stdin) else 0)
+        with open(args.file) as request_file:
+            sys.exit(1 if run_requests(request_file) else 0)
+
+    # A request on the command line exits with status 1 if it failed
+    if args.request:
+        if not check_input(args.request):
+            sys.exit(2)
+        sys.exit(0 if start_client(args.request) else 1)
+
     valid_input = False
     while not valid_input:
         print(responses.INFO_CLIENT_SETUP)
@@ -0,0 +1,133 @@
+# IMPORTS
+import os
+import json
+import time
+import calendar
+import protocol
+
+
+# UTC offsets of time zones are whole multiples of a quarter hour
+OFFSET_STEP = 900
+
+
+# Start of class ---------------------------------------------------------------
+class ClientCache:
+    """
+        Date/time responses kept by clients until the minute they hold is over,
+        since the server cannot answer differently before then.
+        Entries are keyed by (server address, port, command, language code).
+        With a file path the entries and counters are also kept in that file,
+        so that short-lived client processes share them.
+    """
+
+    def __init__(self, path=None, source=time.time):
+        """
+            Initialise a cache, loading any live entries from the file at 'path'.
+            'source' returns the current wall clock timestamp.
+        """
+        self.path = path
+        self.source = source
+        self.entries = {}    # Key -> (expiry timestamp, response packet)
+        self.hits = 0
+        self.misses = 0
+        self.load()
+
+    def get(self, key):
+        """
+            Returns the cached response packet for the key, or None if there is
+            none for the current minute. Counts the lookup as a hit or a miss.
+        """
+        entry = self.entries.get(key)
+
+        if entry is not None and self.source() < entry[0]:
+            self.hits += 1
+            self.save()
+            return entry[1]
+
+        self.misses += 1
+        self.save()
+        return None
+
+    def put(self, key, packet):
+        """
+            Caches a response packet until the end of the minute held in its
+            Year, Month, Day, Hour and Minute fields. A response whose minute
+            is already over by the local clock is not cached.
+        """
+        now = self.source()
+        expiry = response_expiry(packet, now)
+        if expiry > now:
+            self.entries[key] = (expiry, packet)
+        self.prune(now)
+        self.save()
+
+    def prune(self, now):
+        """
+            Drops every entry from an earlier minute.
+        """
+        for key in [key for key, (expiry, packet) in self.entries.items() if expiry <= now]:
+            del self.entries[key]
+
+    def load(self):
+        """
+            Reads the live entries and the counters from the cache file, if there is one.
+            A missing or unreadable file leaves the cache empty.
+        """
+        if self.path is None:
+            return
+
+        try:
+            with open(self.path) as cache_file:
+                stored = json.load(cache_file)
+
+            self.hits = stored["hits"]
+            self.misses = stored["misses"]
+            for key, (expiry, packet) in stored["entries"].items():
+                self.entries[tuple(json.loads(key))] = (expiry, bytes.fromhex(packet))
+
+        except (OSError, ValueError, KeyError, TypeError):
+            return
+
+        self.prune(self.source())
+
+    def save(self):
+        """
+            Writes the entries and counters to the cache file, if there is one.
+            The file is replaced in one step, so readers never see it half written.
+        """
+        if self.path is None:
+            return
+
+        stored = {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": {json.dumps(list(key)): [expiry, packet.hex()]
+                        for key, (expiry, packet) in self.entries.items()}
+        }
+
+        try:
+            temporary_path = "{}.{}".format(self.path, os.getpid())
+            with open(temporary_path, "w") as cache_file:
+                json.dump(stored, cache_file)
+            os.replace(temporary_path, self.path)
+
+        except OSError:
+            pass
+
+
+# End of class =================================================================
+
+
+def response_expiry(packet, now):
+    """
+        Returns the local timestamp at which the minute held by a response packet
+        ends. Its fields are in the server's or the requested zone's local time,
+        whose UTC offset is taken to be the multiple of a quarter hour closest
+        to their difference from the local clock 'now'. Any clock skew is left
+        in the result, so a client clock running ahead of the server's expires
+        the entry early rather than serving a stale time.
+    """
+    year, month, day, hour, minute = protocol.unpack_response_header(packet)[3:8]
+    start = calendar.timegm((year, month, day, hour, minute, 0))
+    offset = round((start - now) / OFFSET_STEP) * OFFSET_STEP
+    return start - offset + 60
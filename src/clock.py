@@ -0,0 +1,99 @@
+# IMPORTS
+import time
+import datetime
+
+
+# Start of class ---------------------------------------------------------------
+class CoarseClock:
+    """
+        The current local time to minute resolution, kept as precomputed year,
+        month, day, hour and minute fields. It has the same fields as a datetime,
+        so it can be passed anywhere a response is built from 'now'.
+        The fields are refreshed by check(), which only compares the monotonic
+        clock against the start of the next minute until that minute begins.
+        'minute_index' identifies the current minute, for callers that cache by minute.
+    """
+
+    def __init__(self, source=time.time, monotonic=time.monotonic):
+        """
+            Initialise a clock reading wall clock timestamps from 'source'.
+            Both clocks can be replaced, e.g. by a benchmark or test.
+        """
+        self.source = source
+        self.monotonic = monotonic
+        self.refresh()
+
+    def refresh(self):
+        """
+            Reads the wall clock and recomputes every field.
+        """
+        timestamp = self.source()
+        now = datetime.datetime.fromtimestamp(timestamp)
+
+        self.year = now.year
+        self.month = now.month
+        self.day = now.day
+        self.hour = now.hour
+        self.minute = now.minute
+        self.minute_index = int(timestamp // 60)
+        self.expires = self.monotonic() + 60 - timestamp % 60
+
+    def check(self):
+        """
+            Refreshes the fields once a new minute may have begun.
+            Returns true if the minute has changed since the last refresh.
+        """
+        if self.monotonic() < self.expires:
+            return False
+
+        previous = self.minute_index
+        self.refresh()
+        return self.minute_index != previous
+
+    def seconds_to_next_minute(self):
+        """
+            Returns the time until the next minute begins, for scheduling a timer.
+        """
+        return max(0.0, self.expires - self.monotonic())
+
+
+class FixedClock(CoarseClock):
+    """
+        A clock that stays at the given time until it is set to another,
+        so that benchmarks and tests build the same responses on every run.
+    """
+
+    def __init__(self, when):
+        """
+            Initialise a clock stopped at the given datetime.
+        """
+        self.set(when)
+
+    def set(self, when):
+        """
+            Moves the clock to the given datetime.
+        """
+        self.year = when.year
+        self.month = when.month
+        self.day = when.day
+        self.hour = when.hour
+        self.minute = when.minute
+        self.minute_index = int(when.timestamp() // 60)
+        self.changed = True
+
+    def check(self):
+        """
+            Returns true once after each time the clock is set.
+        """
+        changed = self.changed
+        self.changed = False
+        return changed
+
+    def seconds_to_next_minute(self):
+        """
+            A fixed clock never reaches the next minute.
+        """
+        return None
+
+
+# End of class =================================================================
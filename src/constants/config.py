@@ -1,10 +1,68 @@
+# IMPORTS
+from constants.languages import LANGUAGES
+
+
 # SERVER CONFIGURATION VARIABLES
 COMMAND_TYPES = [0x0001, 0x0002]    # 1:date, 2:time
-MONTHS_MAORI = ["Kohitatea", "Hui-tanguru", "Poutu-te-rangi", "Paenga-whawha", "Haratua", "Pipiri", "Hongongoi", "Here-turi-koka", "Mahuru", "Whiringa-a-nuku", "Whiringa-a-rangi", "Hakihea"]
-MONTHS_GERMAN = ["Januar", "Februar", "Marz", "April", "Mai", "Juni", "Juli", "August", "September", "Oktober", "November", "Dezember"]
+SERVER_PORTS = None    # Ports to serve, the Nth serving the Nth language, or None to ask at startup
+SERVER_LANGUAGES = None    # Languages served by SERVER_PORTS, in order, or None for registry order
+SERVER_TIMEZONES = None    # Zone identifiers requests may ask for, e.g. ["UTC", "Europe/Berlin"], or None for every zone
+SERVER_ENGINES = ["select", "asyncio"]
+SERVER_ENGINE = "select"    # Default engine when none is given at startup
+SERVER_RECV_BATCH_SIZE = 64    # Datagrams drained per socket per wakeup, 1 disables batching
+SERVER_RECV_BUFFER_SIZE = 4096    # Bytes
+SERVER_SO_RCVBUF = 4194304    # Bytes of kernel receive buffer per socket, None for the system default
+SERVER_SO_SNDBUF = 1048576    # Bytes of kernel send buffer per socket, None for the system default
+SERVER_SEND_QUEUE_BYTES = 262144    # Responses queued per socket while its send buffer is full, further ones are dropped
+SERVER_WORKERS = 1    # Server processes sharing the ports through SO_REUSEPORT
+SERVER_WORKER_RESTART_DELAY = 1    # Seconds to wait before restarting a crashed worker
+SERVER_WORKER_SHUTDOWN_WAITTIME = 5    # Seconds to wait for workers to exit before killing them
+SERVER_MAX_SUBSCRIBERS = 10000    # Subscriptions held at once, further subscribers are refused
+SERVER_MAX_LEASE = 600    # Seconds, longer subscription leases are shortened to this
+SERVER_MULTICAST_GROUP = None    # e.g. "239.255.73.126" to publish every response to this group
+SERVER_MULTICAST_PORT = 5007
+SERVER_MULTICAST_INTERVAL = None    # Seconds between publishes, None for the start of every minute
+SERVER_MULTICAST_INTERFACE = "127.0.0.1"    # Address of the interface to publish through
+SERVER_MULTICAST_TTL = 1    # Router hops, 1 keeps packets on the local network
+SERVER_STREAM_TRANSPORT = True    # The asyncio engine also accepts TCP connections on the language ports
+SERVER_STREAM_MAX_CONNECTIONS = 1024    # Open stream connections, further connections are refused
+SERVER_STREAM_IDLE_TIMEOUT = 60    # Seconds before an idle stream connection is closed
+SERVER_STATS_ALLOWED = ["127.0.0.1", "::1"]    # Source addresses answered with stats, None for any, as replies are far larger than requests
+SERVER_RATE_LIMIT = None    # Requests per second allowed from each source address, None for no limit
+SERVER_RATE_LIMIT_BURST = 200    # Requests a source may send at once before being limited
+SERVER_RATE_LIMIT_SOURCES = 65536    # Source addresses tracked, the least recently seen are evicted
+SERVER_CAPTURE_FILE = None    # Path to record every incoming datagram to, for replay.py, or None
+SERVER_CAPTURE_MAX_BYTES = 67108864    # Bytes per capture file, the two most recent files are kept
+SERVER_HANDOFF_SOCKET = None    # Unix socket path on which a successor takes over the bound sockets, or None
+SERVER_HANDOFF_TIMEOUT = 5    # Seconds to wait for the other server during a handoff
+LOG_LEVEL = "INFO"    # "DEBUG" also logs every packet
+LOG_BACKGROUND = True    # Write log messages from a background thread
 
 
 # CLIENT CONFIGURATION VARIABLES
-CONFIG_RESPONSE_WAITTIME = 1    # Seconds
-CONFIG_LANGUAGE_CODES = [0x0001, 0x0002, 0x0003]    # 1:English, 2:Te reo Maori, 3:German
-CONFIG_VALID_REQUESTS = ["date", "time"]
+CONFIG_RESPONSE_WAITTIME = 1    # Seconds before a request is given up on, across every retransmit
+CONFIG_PIPELINE_WINDOW = 256    # Outstanding requests per socket when pipelining
+CONFIG_POOL_SIZE = 4    # Sockets shared by every request of the asyncio client library
+CONFIG_POOL_SO_RCVBUF = 4194304    # Bytes of kernel receive buffer per pool socket, as responses can arrive in bursts
+CONFIG_RECV_BUFFER_SIZE = 65535    # Bytes, large enough for any batch response
+CONFIG_RTO_INITIAL = 0.25    # Seconds to wait before the first retransmit, until RTTs are measured
+CONFIG_RTO_MIN = 0.005    # Seconds, lower bound of the retransmission timeout
+CONFIG_RTO_MAX = 1    # Seconds, upper bound of the retransmission timeout after backoff
+CONFIG_RTO_JITTER = 0.2    # Timeouts are spread randomly by up to this fraction either way
+CONFIG_MAX_RETRANSMITS = 3    # Retransmits of a request before it is given up on
+CONFIG_RETRANSMIT_BUDGET = 0.1    # Largest fraction of requests that may be retransmitted
+CONFIG_RETRANSMIT_BUDGET_MIN = 10    # Retransmits allowed regardless of the budget, e.g. for the first requests
+CONFIG_RTT_SAMPLES = 256    # Recent round trip times kept for the hedging percentile
+CONFIG_HEDGE = False    # Send a duplicate request once the p95 round trip time has passed
+CONFIG_HEDGE_MIN_SAMPLES = 20    # Round trip times needed before requests are hedged
+CONFIG_HEDGE_BUDGET = 0.05    # Largest fraction of requests that may be hedged
+CONFIG_WATCH_LEASE = 120    # Seconds, watch mode renews its subscription halfway through
+CONFIG_MULTICAST_INTERFACE = "127.0.0.1"    # Address of the interface to join multicast groups on
+CONFIG_CACHE = False    # Answer repeated date/time requests from responses received in the same minute
+CONFIG_CACHE_FILE = None    # e.g. "/tmp/datetime_client_cache.json" to share cached responses between runs
+CONFIG_VERBOSE = False    # Also print counters, such as the response cache's hits and misses
+CONFIG_TRANSPORTS = ["udp", "tcp"]
+CONFIG_TRANSPORT = "udp"    # Default transport when none is given
+CONFIG_TIMEZONE = None    # Zone identifier date/time requests ask for, e.g. "Europe/Berlin", or None for the server's time
+CONFIG_LANGUAGE_CODES = [entry["code"] for entry in LANGUAGES]    # 1:English, 2:Te reo Maori, 3:German, ...
+CONFIG_VALID_REQUESTS = ["date", "time", "batch", "watch", "listen", "stats"]
@@ -0,0 +1,138 @@
+# LANGUAGE REGISTRY
+# Languages are served in this order, so the Nth port given to the server
+# serves the Nth language. Templates are filled in with str.format using the
+# fields: year, month (the month's name), day, hour and minute.
+LANGUAGES = [
+    {
+        "code": 0x0001, "name": "English", "tag": "en",
+        "date": "Today’s date is {month} {day:0>2}, {year:0>4}",
+        "time": "The current time is {hour:0>2}:{minute:0>2}",
+        "months": ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"]
+    },
+    {
+        "code": 0x0002, "name": "Te reo Maori", "tag": "mi",
+        "date": "Ko te ra o tenei ra ko {month} {day:0>2}, {year:0>4}",
+        "time": "Ko te wa o tenei wa {hour:0>2}:{minute:0>2}",
+        "months": ["Kohitatea", "Hui-tanguru", "Poutu-te-rangi", "Paenga-whawha", "Haratua", "Pipiri", "Hongongoi", "Here-turi-koka", "Mahuru", "Whiringa-a-nuku", "Whiringa-a-rangi", "Hakihea"]
+    },
+    {
+        "code": 0x0003, "name": "German", "tag": "de",
+        "date": "Heute ist der {day:0>2}. {month} {year:0>4}",
+        "time": "Die Uhrzeit ist {hour:0>2}:{minute:0>2}",
+        "months": ["Januar", "Februar", "Marz", "April", "Mai", "Juni", "Juli", "August", "September", "Oktober", "November", "Dezember"]
+    },
+    {
+        "code": 0x0004, "name": "French", "tag": "fr",
+        "date": "Nous sommes le {day:0>2} {month} {year:0>4}",
+        "time": "Il est {hour:0>2}:{minute:0>2}",
+        "months": ["janvier", "février", "mars", "avril", "mai", "juin", "juillet", "août", "septembre", "octobre", "novembre", "décembre"]
+    },
+    {
+        "code": 0x0005, "name": "Spanish", "tag": "es",
+        "date": "Hoy es {day:0>2} de {month} de {year:0>4}",
+        "time": "La hora actual es {hour:0>2}:{minute:0>2}",
+        "months": ["enero", "febrero", "marzo", "abril", "mayo", "junio", "julio", "agosto", "septiembre", "octubre", "noviembre", "diciembre"]
+    },
+    {
+        "code": 0x0006, "name": "Italian", "tag": "it",
+        "date": "Oggi è il {day:0>2} {month} {year:0>4}",
+        "time": "Sono le {hour:0>2}:{minute:0>2}",
+        "months": ["gennaio", "febbraio", "marzo", "aprile", "maggio", "giugno", "luglio", "agosto", "settembre", "ottobre", "novembre", "dicembre"]
+    },
+    {
+        "code": 0x0007, "name": "Portuguese", "tag": "pt",
+        "date": "Hoje é {day:0>2} de {month} de {year:0>4}",
+        "time": "A hora atual é {hour:0>2}:{minute:0>2}",
+        "months": ["janeiro", "fevereiro", "março", "abril", "maio", "junho", "julho", "agosto", "setembro", "outubro", "novembro", "dezembro"]
+    },
+    {
+        "code": 0x0008, "name": "Dutch", "tag": "nl",
+        "date": "Vandaag is het {day:0>2} {month} {year:0>4}",
+        "time": "Het is nu {hour:0>2}:{minute:0>2}",
+        "months": ["januari", "februari", "maart", "april", "mei", "juni", "juli", "augustus", "september", "oktober", "november", "december"]
+    },
+    {
+        "code": 0x0009, "name": "Swedish", "tag": "sv",
+        "date": "Idag är det den {day:0>2} {month} {year:0>4}",
+        "time": "Klockan är {hour:0>2}:{minute:0>2}",
+        "months": ["januari", "februari", "mars", "april", "maj", "juni", "juli", "augusti", "september", "oktober", "november", "december"]
+    },
+    {
+        "code": 0x000A, "name": "Danish", "tag": "da",
+        "date": "I dag er det den {day:0>2}. {month} {year:0>4}",
+        "time": "Klokken er {hour:0>2}:{minute:0>2}",
+        "months": ["januar", "februar", "marts", "april", "maj", "juni", "juli", "august", "september", "oktober", "november", "december"]
+    },
+    {
+        "code": 0x000B, "name": "Norwegian", "tag": "nb",
+        "date": "I dag er det {day:0>2}. {month} {year:0>4}",
+        "time": "Klokken er {hour:0>2}:{minute:0>2}",
+        "months": ["januar", "februar", "mars", "april", "mai", "juni", "juli", "august", "september", "oktober", "november", "desember"]
+    },
+    {
+        "code": 0x000C, "name": "Finnish", "tag": "fi",
+        "date": "Tänään on {day:0>2}. {month} {year:0>4}",
+        "time": "Kello on {hour:0>2}:{minute:0>2}",
+        "months": ["tammikuuta", "helmikuuta", "maaliskuuta", "huhtikuuta", "toukokuuta", "kesäkuuta", "heinäkuuta", "elokuuta", "syyskuuta", "lokakuuta", "marraskuuta", "joulukuuta"]
+    },
+    {
+        "code": 0x000D, "name": "Polish", "tag": "pl",
+        "date": "Dzisiaj jest {day:0>2} {month} {year:0>4}",
+        "time": "Jest godzina {hour:0>2}:{minute:0>2}",
+        "months": ["stycznia", "lutego", "marca", "kwietnia", "maja", "czerwca", "lipca", "sierpnia", "września", "października", "listopada", "grudnia"]
+    },
+    {
+        "code": 0x000E, "name": "Czech", "tag": "cs",
+        "date": "Dnes je {day:0>2}. {month} {year:0>4}",
+        "time": "Právě je {hour:0>2}:{minute:0>2}",
+        "months": ["ledna", "února", "března", "dubna", "května", "června", "července", "srpna", "září", "října", "listopadu", "prosince"]
+    },
+    {
+        "code": 0x000F, "name": "Indonesian", "tag": "id",
+        "date": "Hari ini tanggal {day:0>2} {month} {year:0>4}",
+        "time": "Sekarang pukul {hour:0>2}:{minute:0>2}",
+        "months": ["Januari", "Februari", "Maret", "April", "Mei", "Juni", "Juli", "Agustus", "September", "Oktober", "November", "Desember"]
+    },
+    {
+        "code": 0x0010, "name": "Malay", "tag": "ms",
+        "date": "Hari ini {day:0>2} {month} {year:0>4}",
+        "time": "Sekarang pukul {hour:0>2}:{minute:0>2}",
+        "months": ["Januari", "Februari", "Mac", "April", "Mei", "Jun", "Julai", "Ogos", "September", "Oktober", "November", "Disember"]
+    },
+    {
+        "code": 0x0011, "name": "Turkish", "tag": "tr",
+        "date": "Bugün {day:0>2} {month} {year:0>4}",
+        "time": "Saat {hour:0>2}:{minute:0>2}",
+        "months": ["Ocak", "Şubat", "Mart", "Nisan", "Mayıs", "Haziran", "Temmuz", "Ağustos", "Eylül", "Ekim", "Kasım", "Aralık"]
+    },
+    {
+        "code": 0x0012, "name": "Romanian", "tag": "ro",
+        "date": "Astăzi este {day:0>2} {month} {year:0>4}",
+        "time": "Ora curentă este {hour:0>2}:{minute:0>2}",
+        "months": ["ianuarie", "februarie", "martie", "aprilie", "mai", "iunie", "iulie", "august", "septembrie", "octombrie", "noiembrie", "decembrie"]
+    },
+    {
+        "code": 0x0013, "name": "Hungarian", "tag": "hu",
+        "date": "Ma {year:0>4}. {month} {day:0>2}.",
+        "time": "A pontos idő {hour:0>2}:{minute:0>2}",
+        "months": ["január", "február", "március", "április", "május", "június", "július", "augusztus", "szeptember", "október", "november", "december"]
+    },
+    {
+        "code": 0x0014, "name": "Croatian", "tag": "hr",
+        "date": "Danas je {day:0>2}. {month} {year:0>4}.",
+        "time": "Sada je {hour:0>2}:{minute:0>2}",
+        "months": ["siječnja", "veljače", "ožujka", "travnja", "svibnja", "lipnja", "srpnja", "kolovoza", "rujna", "listopada", "studenoga", "prosinca"]
+    },
+    {
+        "code": 0x0015, "name": "Estonian", "tag": "et",
+        "date": "Täna on {day:0>2}. {month} {year:0>4}",
+        "time": "Kell on {hour:0>2}:{minute:0>2}",
+        "months": ["jaanuar", "veebruar", "märts", "aprill", "mai", "juuni", "juuli", "august", "september", "oktoober", "november", "detsember"]
+    },
+    {
+        "code": 0x0016, "name": "Welsh", "tag": "cy",
+        "date": "Heddiw yw {day:0>2} {month} {year:0>4}",
+        "time": "Yr amser yw {hour:0>2}:{minute:0>2}",
+        "months": ["Ionawr", "Chwefror", "Mawrth", "Ebrill", "Mai", "Mehefin", "Gorffennaf", "Awst", "Medi", "Hydref", "Tachwedd", "Rhagfyr"]
+    }
+]
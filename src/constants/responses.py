@@ -2,9 +2,10 @@
 ERROR_INVALID_PORT_NUMBER = "ERROR: The given port number ({}) is not an integer within the range 1,024 to 64,000."
 ERROR_INVALID_CONNECTION = "ERROR: Could not establish a connection to '{}'. Please verify the connection information."
 ERROR_INVALID_INPUT = "ERROR: Input is invalid, please check your input and try again."
+ERROR_CONFIG_FILE = "ERROR: Could not read the config file {}, it must be a JSON object of config names and valid values."
 SUCCESS_VALID_INPUT = "SUCCESS: Input is valid."
-INFO_PORT_NUMBERS = "Enter 3 port numbers to listen to:\n (English) (Maori) (German)"
-INFO_CLIENT_SETUP = "Enter your request in the format:\n ('date' or 'time') (host) (port)"
+INFO_PORT_NUMBERS = "Enter up to {} port numbers to listen to, one per language, optionally followed by an engine:\n {} ('select' or 'asyncio')"
+INFO_CLIENT_SETUP = "Enter your request in the format:\n ('date', 'time', 'batch', 'watch', 'listen' or 'stats') (host or multicast group) (port) (language, optional) ('udp' or 'tcp', optional)"
 
 # CLIENT ERROR MESSAGES
 ERROR_SOCKET_ALREADY_EXISTS = "ERROR: UDP socket already exists. Please call 'client.delete_udp_socket()' before trying to re-create the socket."
@@ -14,8 +15,11 @@ ERROR_NO_SOCKET = "ERROR: No UDP socket currently exists."
 ERROR_NO_REQ_PACKET = "ERROR: No date/time request packet currently exists."
 ERROR_MALFORMED_BOUNCE_BACK = "ERROR: The server ({}:{}) has provided a malformed bounce back of: \n{}.\nError codes: {}"
 ERROR_BOUNCE_BACK_TIMEOUT = "ERROR: Exceeded response wait time of {} second(s)."
+ERROR_RESPONSE_TIMEOUT = "ERROR: No response from {}:{} within {} second(s)."
 ERROR_CONNECTION_REFUSED = "ERROR: The server ({}:{}) has refused the connection attempt."
 ERROR_INVALID_COMMAND = "ERROR: '{}' is not a valid command. Please provide one of the following: {}."
+ERROR_INVALID_LANGUAGE = "ERROR: '{}' is not a supported language code, tag or name."
+ERROR_INVALID_ZONE = "ERROR: '{}' is not a valid time zone identifier, such as 'Europe/Berlin'."
 ERROR_CLIENT_INVALID_INPUT = "ERROR: Input is invalid, please check your input and try again."
 
 
@@ -25,38 +29,78 @@ STATUS_CREATING_DT_PACKET = "STATUS: Date/time request packet is being created..
 STATUS_SENDING_PACKET = "STATUS: Sending packet: {} to {}:{}..."
 STATUS_CLOSING_UDP_SOCKET = "STATUS: UDP socket is now closing..."
 STATUS_STARTING_CLIENT = "STATUS: Starting client..."
+STATUS_JOINING_GROUP = "STATUS: Joining the multicast group {}:{}..."
+STATUS_SUBSCRIBING = "STATUS: Subscribing to updates from {}:{} for {} seconds..."
+STATUS_UNSUBSCRIBING = "STATUS: Cancelling the subscription..."
+STATUS_CACHE_COUNTERS = "STATUS: Response cache has had {} hits and {} misses."
+STATUS_RETRANSMITS = "STATUS: {} retransmit(s) and {} hedged request(s) have been sent to this server."
 
 
 # CLIENT SERVER SUCCESS MESSAGES
 SUCCESS_RECEIVED_BOUNCE_BACK = "SUCCESS: Received a packet from the server ({}:{})."
+SUCCESS_CACHED_RESPONSE = "SUCCESS: Answered from a response received earlier this minute."
 SUCCESS_VALID_BOUNCE_BACK = "SUCCESS: The server ({}:{}) has provided a valid bounce back."
 SUCCESS_DELETING_UDP_SOCKET = "SUCCESS: UDP socket has been deleted."
 SUCCESS_DELETING_DT_REQ_PACKET = "SUCCESS: Date/time request packet has been deleted."
 
 # SERVER ERROR MESSAGES
-ERROR_SERVER_INVALID_PORT_NUMBER = "ERROR: All three port numbers ({}, {}, {}) must be integers between 1,024 and 64,000."
-ERROR_DUPLICATE_PORT_NUMBER = "ERROR: All three port numbers ({}, {}, {}) must be unique."
-ERROR_SERVER_INVALID_INPUT = "ERROR: Input is invalid, please provide exactly three port numbers (1: English, 2: Maori, 3: German)."
+ERROR_SERVER_INVALID_PORT_NUMBER = "ERROR: All port numbers ({}) must be integers between 1,024 and 64,000."
+ERROR_DUPLICATE_PORT_NUMBER = "ERROR: All port numbers ({}) must be unique."
+ERROR_SERVER_INVALID_INPUT = "ERROR: Input is invalid, please provide between 1 and {} port numbers, one per language."
 ERROR_PORT_FORBIDDEN = "ERROR: At least one of the given port numbers are occupied by another process."
 ERROR_SOCKET_BIND_CREATION = "ERROR: Could not create sockets or bind ports."
 ERROR_FOREIGN_PORT = "ERROR: The incoming packet was from an unrecognised port number."
 ERROR_PROCESS_INCOMING = "ERROR: Failed to process the incoming packet."
-ERROR_MALFORMED_REQUEST = "ERROR: The client ({}:{}) has provided a malformed request of: {}."
+ERROR_MALFORMED_REQUEST = "ERROR: The client ({}:{}) has provided a malformed request of: {}.\nError code: {}"
+ERROR_SERVER_INVALID_LANGUAGES = "ERROR: The languages given ({}) must be registered languages, each given once, one for each of the {} port(s)."
+ERROR_UNKNOWN_ZONES = "ERROR: The time zone database does not know the zones {}, requests for them are refused."
+ERROR_INVALID_ENGINE = "ERROR: '{}' is not a valid server engine. Please provide one of the following: {}."
+ERROR_SEND_FAILED = "ERROR: Failed to send the response packet to {}:{}."
+ERROR_STREAM_LISTEN = "ERROR: Could not listen for stream connections on port {}, it is served over UDP only."
+ERROR_STREAM_REFUSED = "ERROR: Refused a stream connection from {}:{}, the connection limit has been reached."
+ERROR_SEND_QUEUE_FULL = "ERROR: Dropped the response to {}:{}, the send queue is full."
+ERROR_CAPTURE_FILE = "ERROR: Could not open the capture file {}."
+ERROR_HANDOFF_LISTEN = "ERROR: Could not listen for a successor on the handoff socket {}."
+ERROR_HANDOFF_FAILED = "ERROR: The handoff to a successor failed, serving on."
+ERROR_TAKEOVER_FAILED = "ERROR: Could not take over the sockets of a server at {}, binding them afresh."
+ERROR_TAKEOVER_SOCKET = "ERROR: Taking over needs a handoff socket, given by --handoff-socket or SERVER_HANDOFF_SOCKET."
+ERROR_HANDOFF_WORKERS = "ERROR: Handoffs need a single server process, the handoff socket is ignored with {} workers."
+ERROR_MULTICAST_SOCKET = "ERROR: Could not create a socket to publish to the multicast group {}:{}."
+ERROR_MULTICAST_PUBLISH = "ERROR: Failed to publish {} packets to the multicast group {}:{}."
+ERROR_SUBSCRIPTION_REFUSED = "ERROR: Refused a subscription from {}:{}, the subscriber table is full."
 ERROR_TEXT_PAYLOAD_OVERFLOW = "ERROR: The textual representation payload has exceeded the maximum length of 255."
 
 
 # SERVER STATUS MESSAGES
 STATUS_SERVER_STARTING = "STATUS: Starting server..."
-STATUS_CREATING_SOCKETS = "STATUS: Creating three language sockets..."
-STATUS_BINDING_PORTS = "STATUS: Binding language ports, English: {}, Maori: {}, German: {}..."
+STATUS_SERVER_ENGINE = "STATUS: Using the '{}' server engine..."
+STATUS_CREATING_SOCKETS = "STATUS: Creating {} language sockets..."
+STATUS_BINDING_PORTS = "STATUS: Binding language ports, {}..."
+STATUS_SOCKET_BUFFERS = "STATUS: Sockets have {} byte receive and {} byte send buffers."
 STATUS_STARTING_TO_LISTEN = "STATUS: Listening to open ports..."
+STATUS_STARTING_WORKERS = "STATUS: Starting {} server workers..."
+STATUS_WORKER_STARTED = "STATUS: Worker {} started with pid {}."
+STATUS_WORKER_EXITED = "STATUS: Worker {} (pid {}) exited with code {}, restarting..."
+STATUS_STOPPING_WORKERS = "STATUS: Stopping server workers..."
 STATUS_SERVER_SHUTDOWN = "STATUS: Shutting down server..."
 STATUS_CLOSING_SOCKETS = "STATUS: Closing active sockets..."
+STATUS_PUSHED_UPDATES = "STATUS: Pushed the new minute to {} subscribers."
+STATUS_STREAM_LISTENING = "STATUS: Accepting stream connections on {} ports..."
+STATUS_CAPTURING = "STATUS: Recording incoming datagrams to {}..."
+STATUS_CAPTURE_CLOSED = "STATUS: Recorded {} datagrams to {}."
+STATUS_HANDOFF_LISTENING = "STATUS: Listening for a successor on the handoff socket {}..."
+STATUS_HANDING_OFF = "STATUS: Handing {} sockets and {} subscriptions over to a successor..."
+STATUS_TAKING_OVER = "STATUS: Taking over the sockets of the server at {}..."
+STATUS_DRAINING = "STATUS: Sending the {} queued responses, then exiting..."
+STATUS_MULTICAST_PUBLISHING = "STATUS: Publishing to the multicast group {}:{} {}..."
+STATUS_MULTICAST_PUBLISHED = "STATUS: Published {} packets to the multicast group {}:{}."
 
 
 # SERVER SUCCESS MESSAGES
-SUCCESS_SOCKETS_CREATED = "SUCCESS: Three sockets have been created."
-SUCCESS_PORTS_BOUND = "SUCCESS: Three language ports are now bound."
+SUCCESS_SOCKETS_CREATED = "SUCCESS: {} sockets have been created."
+SUCCESS_PORTS_BOUND = "SUCCESS: {} language ports are now bound."
+SUCCESS_HANDED_OFF = "SUCCESS: The successor is now serving."
+SUCCESS_TAKEN_OVER = "SUCCESS: Took over {} sockets and {} subscriptions."
 SUCCESS_RECEIVED_INCOMING = "SUCCESS: Received packet: {} from the port: {}"
 SUCCESS_RESPONSE_PACKET_CREATED = "SUCCESS: Response packet created."
 SUCCESS_RESPONSE_PACKET_SENT = "SUCCESS: Response packet sent to {}:{}."
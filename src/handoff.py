@@ -0,0 +1,133 @@
+# IMPORTS
+from utils import *
+import os
+import json
+import struct
+
+
+# HANDOFF FORMAT
+# The descriptors travel with the length of the JSON state that follows them
+STATE_HEADER = struct.Struct("!I")
+MAX_DESCRIPTORS = 64
+
+# Sent by the successor once it is serving from the sockets it was given
+READY = b"R"
+
+
+# Start of class ---------------------------------------------------------------
+class HandoffListener:
+    """
+        A Unix socket on which a running server waits for its successor.
+        A successor connecting to it is passed the server's bound sockets,
+        along with state such as the live subscriptions, so that it can take
+        over serving without ever unbinding the ports.
+    """
+
+    def __init__(self, path):
+        """
+            Initialise a listener at 'path', replacing any socket left there
+            by a server that has already handed off or exited.
+        """
+        self.path = path
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+        self.sc = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sc.bind(path)
+        self.sc.listen(1)
+
+    def fileno(self):
+        """
+            Returns the listening socket's descriptor, so the listener can be selected on.
+        """
+        return self.sc.fileno()
+
+    def accept(self, timeout):
+        """
+            Accepts a waiting successor's connection, which then times out after 'timeout' seconds.
+        """
+        connection, address = self.sc.accept()
+        connection.settimeout(timeout)
+        return connection
+
+    def close(self, unlink=True):
+        """
+            Stops listening. The path is left alone after a handoff, as it then
+            belongs to the successor's listener.
+        """
+        self.sc.close()
+        if unlink:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+
+# End of class =================================================================
+
+
+def send_sockets(connection, descriptors, state):
+    """
+        Passes the descriptors and a JSON serialisable state to the successor
+        on the other end of the connection.
+    """
+    body = json.dumps(state).encode()
+    socket.send_fds(connection, [STATE_HEADER.pack(len(body))], descriptors)
+    connection.sendall(body)
+
+
+def wait_until_ready(connection):
+    """
+        Returns true once the successor reports that it is serving, or false
+        if it closed the connection first. Raises OSError if it timed out.
+    """
+    return connection.recv(len(READY)) == READY
+
+
+def receive_exactly(connection, size):
+    """
+        Returns exactly 'size' bytes read from a stream connection.
+        Raises ConnectionError if it is closed before they arrive.
+    """
+    data = bytearray()
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError()
+        data += chunk
+    return bytes(data)
+
+
+def request_sockets(path, timeout):
+    """
+        Connects to the handoff listener of a running server at 'path' and
+        returns the connection, the sockets passed over it and the state sent
+        with them. The connection is kept open to send READY on once the
+        sockets are being served from.
+        Raises OSError if no server is listening or the handoff is cut short,
+        or ValueError if the state is not valid JSON.
+    """
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    connection.settimeout(timeout)
+    sockets = []
+
+    try:
+        connection.connect(path)
+        header, descriptors, flags, address = socket.recv_fds(
+            connection, STATE_HEADER.size, MAX_DESCRIPTORS)
+        sockets = [socket.socket(fileno=descriptor) for descriptor in descriptors]
+
+        if not header:
+            raise ConnectionError()
+        header += receive_exactly(connection, STATE_HEADER.size - len(header))
+        state = json.loads(receive_exactly(connection, STATE_HEADER.unpack(header)[0]))
+
+    except:
+        for sc in sockets:
+            sc.close()
+        connection.close()
+        raise
+
+    return connection, sockets, state
@@ -0,0 +1,72 @@
+# IMPORTS
+from constants.languages import LANGUAGES
+
+
+# Start of class ---------------------------------------------------------------
+class Language:
+    """
+        A single entry of the language registry: its code, name, tag, the port
+        it is served on and the templates used to build its responses.
+    """
+    __slots__ = ("code", "name", "tag", "port", "date_template", "time_template", "months")
+
+    def __init__(self, entry, port=None):
+        """
+            Initialise a language from a registry entry and the port serving it.
+        """
+        self.code = entry["code"]
+        self.name = entry["name"]
+        self.tag = entry["tag"]
+        self.port = port
+        self.date_template = entry["date"]
+        self.time_template = entry["time"]
+        self.months = entry["months"]
+
+    def text(self, request_type, now):
+        """
+            Returns the textual representation of 'now' for a request type
+            (1: date, 2: time), or an empty string for any other request type.
+        """
+        if request_type == 0x0001:
+            template = self.date_template
+        elif request_type == 0x0002:
+            template = self.time_template
+        else:
+            return ""
+
+        return template.format(
+            year=now.year, month=self.months[now.month-1], day=now.day,
+            hour=now.hour, minute=now.minute)
+
+
+# End of class =================================================================
+
+
+def build_registry(ports, served_languages=None):
+    """
+        Returns every registered language, in registry order. The Nth port
+        serves the Nth language, or the Nth of 'served_languages' (codes, tags
+        or names) when those are given. Languages without a port can still be
+        asked for with an extended request.
+    """
+    ports = [int(port) for port in ports]
+    if served_languages is None:
+        return [Language(entry, ports[index] if index < len(ports) else None)
+                for index, entry in enumerate(LANGUAGES)]
+
+    ports_by_code = {find(language)["code"]: port
+                     for language, port in zip(served_languages, ports)}
+    return [Language(entry, ports_by_code.get(entry["code"])) for entry in LANGUAGES]
+
+
+def find(identifier):
+    """
+        Returns the registry entry matching a language code, tag or name
+        (case insensitive), or None if there is no such language.
+    """
+    identifier = str(identifier).strip().lower()
+    for entry in LANGUAGES:
+        if identifier in (str(entry["code"]), entry["tag"], entry["name"].lower()):
+            return entry
+    return None
+
@@ -0,0 +1,367 @@
+"""
+    Load generator for the date/time server.
+
+    Drives a running server with sequenced date/time requests from a number of
+    concurrent sockets, each with a window of outstanding requests, either flat
+    out or at a target total rate, and reports the achieved request rate, loss
+    rate and latency percentiles.
+
+    A flood of valid or garbage packets can be sent alongside, from another
+    source address, to check that legitimate clients keep their throughput.
+
+    Run from the 'src' directory, e.g.:
+        python3 loadgen.py localhost 3333 4444 5555 --duration 10 --concurrency 8
+        python3 loadgen.py localhost 3333 --rate 5000 --mix date:3,time:1 --json
+        python3 loadgen.py localhost 3333 --flood 50000 --flood-kind garbage
+"""
+# IMPORTS
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import multiprocessing
+import languages
+from client import build_dt_request_packet
+from aioclient import EndpointProtocol
+
+
+PERCENTILES = [50, 90, 99, 99.9]
+
+# Commands whose responses can be matched to sequenced requests
+MIX_COMMANDS = ["date", "time"]
+
+
+# Start of class ---------------------------------------------------------------
+class LoadStats:
+    """
+        Counters and latency samples collected over a load run.
+    """
+
+    def __init__(self):
+        """
+            Initialise empty load statistics.
+        """
+        self.sent = 0
+        self.received = 0
+        self.lost = 0
+        self.errors = 0
+        self.flood_sent = 0
+        self.latencies = []
+        self.elapsed = 0.0
+
+    def report(self):
+        """
+            Returns a dictionary summary of the run, with latencies in milliseconds.
+        """
+        latencies = sorted(self.latencies)
+        summary = {
+            "sent": self.sent,
+            "received": self.received,
+            "lost": self.lost,
+            "errors": self.errors,
+            "flood_sent": self.flood_sent,
+            "elapsed_s": round(self.elapsed, 3),
+            "achieved_rps": round(self.received / self.elapsed, 1) if self.elapsed else 0.0,
+            "loss_rate": round(self.lost / self.sent, 6) if self.sent else 0.0,
+            "latency_ms": {}
+        }
+
+        if latencies:
+            summary["latency_ms"]["min"] = round(latencies[0] * 1000, 4)
+            summary["latency_ms"]["mean"] = round(
+                sum(latencies) / len(latencies) * 1000, 4)
+            for percentile in PERCENTILES:
+                summary["latency_ms"]["p{:g}".format(percentile)] = round(
+                    nearest_rank(latencies, percentile) * 1000, 4)
+            summary["latency_ms"]["max"] = round(latencies[-1] * 1000, 4)
+
+        return summary
+
+
+# End of class =================================================================
+
+
+def nearest_rank(sorted_values, percentile):
+    """
+        Returns the given percentile of an already sorted list using the nearest-rank method.
+    """
+    rank = max(1, -(-len(sorted_values) * percentile // 100))
+    return sorted_values[min(int(rank), len(sorted_values)) - 1]
+
+
+def parse_mix(mix):
+    """
+        Parses a weighted command mix such as 'date:3,time:1'.
+        Returns a (commands, weights) tuple, or raises argparse.ArgumentTypeError
+        for a command other than those in MIX_COMMANDS or an invalid weight.
+    """
+    commands = []
+    weights = []
+    for item in mix.split(","):
+        command, _, weight = item.partition(":")
+        if command not in MIX_COMMANDS:
+            raise argparse.ArgumentTypeError("unknown command: '{}'".format(command))
+        try:
+            weights.append(float(weight) if weight else 1.0)
+        except ValueError:
+            raise argparse.ArgumentTypeError("invalid weight: '{}'".format(item)) from None
+        commands.append(command)
+    return commands, weights
+
+
+def parse_languages(names):
+    """
+        Parses comma separated language codes, tags or names such as 'en,de,fr'.
+        Returns their language codes, or raises argparse.ArgumentTypeError
+        naming a language that is not in the registry.
+    """
+    language_codes = []
+    for name in names.split(","):
+        entry = languages.find(name)
+        if entry is None:
+            raise argparse.ArgumentTypeError("unknown language: '{}'".format(name))
+        language_codes.append(entry["code"])
+    return language_codes
+
+
+def build_requests(host, ports, mix, language_codes=None):
+    """
+        Builds the (command, language code, address) requests that make up the
+        request mix, along with their weights. Each port serves a different language,
+        unless language codes are given, in which case every request names its language.
+    """
+    # Resolve once so that sending does not repeat the lookup per packet
+    host = socket.gethostbyname(host)
+    commands, weights = parse_mix(mix)
+    requests = []
+    request_weights = []
+    for port in ports:
+        for language_code in language_codes or [None]:
+            for command, weight in zip(commands, weights):
+                requests.append((command, language_code, (host, port)))
+                request_weights.append(weight)
+    return requests, request_weights
+
+
+async def run_lane(stats, protocol, requests, weights, deadline, interval, timeout):
+    """
+        Sends requests stop-and-wait through a shared socket until the deadline.
+        With an interval, requests are paced to one per interval.
+    """
+    loop = asyncio.get_running_loop()
+    rng = random.Random()
+    next_send = time.perf_counter()
+
+    while True:
+        now = time.perf_counter()
+        if interval:
+            if next_send > now:
+                await asyncio.sleep(next_send - now)
+            next_send += interval
+        if time.perf_counter() >= deadline:
+            break
+
+        command, language_code, address = rng.choices(requests, weights)[0]
+        sequence = protocol.sequence()
+        packet = build_dt_request_packet(command, language_code, sequence)
+        waiter = protocol.waiters[sequence] = loop.create_future()
+        start = time.perf_counter()
+        protocol.transport.sendto(packet, address)
+        stats.sent += 1
+
+        try:
+            await asyncio.wait_for(waiter, timeout)
+            stats.latencies.append(time.perf_counter() - start)
+            stats.received += 1
+
+        except asyncio.TimeoutError:
+            stats.lost += 1
+
+        except OSError:
+            stats.errors += 1
+
+        finally:
+            del protocol.waiters[sequence]
+
+
+def run_flood(host, ports, rate, kind, source, duration, flood_sent):
+    """
+        Flood process entry point. Sends 'rate' packets per second for 'duration'
+        seconds, without waiting for any response, from a socket bound to the
+        given source address, and stores the number sent in 'flood_sent'.
+        'valid' floods send date requests, 'garbage' floods random bytes.
+    """
+    host = socket.gethostbyname(host)
+    sc = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sc.bind((source, 0))
+    sc.setblocking(False)
+
+    if kind == "garbage":
+        packets = [random.randbytes(random.randint(1, 64)) for _ in range(256)]
+    else:
+        packets = [build_dt_request_packet("date")]
+    addresses = [(host, port) for port in ports]
+
+    sent = 0
+    start = time.perf_counter()
+    deadline = start + duration
+    while True:
+        now = time.perf_counter()
+        if now >= deadline:
+            break
+
+        # Catch up to the target count, then sleep briefly
+        due = int((now - start) * rate)
+        while sent < due:
+            try:
+                sc.sendto(packets[sent % len(packets)], addresses[sent % len(addresses)])
+            except (BlockingIOError, ConnectionRefusedError):
+                pass
+            sent += 1
+        time.sleep(0.001)
+
+    sc.close()
+    flood_sent.value = sent
+
+
+async def run_worker(stats, requests, weights, deadline, interval, timeout, window):
+    """
+        Runs 'window' request lanes over a single socket, so up to that many
+        requests are outstanding on it at once.
+    """
+    loop = asyncio.get_running_loop()
+    transport, protocol = await loop.create_datagram_endpoint(
+        EndpointProtocol, family=socket.AF_INET)
+
+    try:
+        await asyncio.gather(*[
+            run_lane(stats, protocol, requests, weights, deadline, interval, timeout)
+            for _ in range(window)
+        ])
+
+    finally:
+        transport.close()
+
+
+async def run_load(host, ports, mix="date,time", concurrency=1, rate=0,
+                   duration=5.0, timeout=1.0, language_codes=None, window=1,
+                   flood=0, flood_kind="valid", flood_source="127.0.0.2"):
+    """
+        Runs a load test against a server and returns the collected LoadStats.
+        A rate of 0 sends flat out, otherwise the total rate is split evenly
+        across the concurrent sockets and their request windows.
+        A non-zero flood rate adds a flood of that many packets per second.
+    """
+    requests, weights = build_requests(host, ports, mix, language_codes)
+    stats = LoadStats()
+    interval = concurrency * window / rate if rate else 0
+
+    start = time.perf_counter()
+    deadline = start + duration
+
+    # The flood comes from a separate process, as it would from another host
+    if flood:
+        flood_sent = multiprocessing.Value("q", 0)
+        flooder = multiprocessing.Process(
+            target=run_flood, args=(host, ports, flood, flood_kind, flood_source,
+                                    duration, flood_sent), daemon=True)
+        flooder.start()
+
+    await asyncio.gather(*[
+        run_worker(stats, requests, weights, deadline, interval, timeout, window)
+        for _ in range(concurrency)
+    ])
+
+    if flood:
+        flooder.join()
+        stats.flood_sent = flood_sent.value
+    stats.elapsed = time.perf_counter() - start
+    return stats
+
+
+def print_report(summary):
+    """
+        Prints a load test summary in a human readable form.
+    """
+    print("-" * 50)
+    print("- Sent:           {}".format(summary["sent"]))
+    print("- Received:       {}".format(summary["received"]))
+    print("- Lost:           {} ({:.4%})".format(summary["lost"], summary["loss_rate"]))
+    print("- Errors:         {}".format(summary["errors"]))
+    if summary["flood_sent"]:
+        print("- Flood sent:     {}".format(summary["flood_sent"]))
+    print("- Elapsed:        {:.3f} s".format(summary["elapsed_s"]))
+    print("- Achieved:       {:.1f} req/s".format(summary["achieved_rps"]))
+    print("-" * 50)
+    for name, value in summary["latency_ms"].items():
+        print("- {:<15} {:.4f} ms".format(name + ":", value))
+    print("-" * 50)
+
+
+def parse_arguments(argv):
+    """
+        Parses the load generator's command line arguments.
+    """
+    parser = argparse.ArgumentParser(description="Date/time server load generator.")
+    parser.add_argument("host", help="server host name or address")
+    parser.add_argument("ports", type=int, nargs="+",
+                        help="language ports to spread requests across")
+    parser.add_argument("--mix", default="date,time",
+                        help="weighted command mix, e.g. 'date:3,time:1'")
+    parser.add_argument("--languages", type=parse_languages,
+                        help="comma separated languages to name in extended requests, e.g. 'en,de,fr'")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="number of concurrent sockets")
+    parser.add_argument("--window", type=int, default=1,
+                        help="outstanding requests per socket")
+    parser.add_argument("--rate", type=float, default=0,
+                        help="target total requests per second, 0 for flat out")
+    parser.add_argument("--duration", type=float, default=5.0,
+                        help="length of the run in seconds")
+    parser.add_argument("--timeout", type=float, default=1.0,
+                        help="seconds before a request is counted as lost")
+    parser.add_argument("--flood", type=float, default=0,
+                        help="also flood the server with this many packets per second")
+    parser.add_argument("--flood-kind", choices=["valid", "garbage"], default="valid",
+                        help="flood with valid date requests or with garbage")
+    parser.add_argument("--flood-source", default="127.0.0.2",
+                        help="local address to flood from, so the flood is a separate source")
+    parser.add_argument("--json", action="store_true",
+                        help="print the summary as JSON")
+    parser.add_argument("--output", help="also write the JSON summary to this file")
+    args = parser.parse_args(argv)
+
+    # The mix stays a string for run_load, so it is only checked here
+    try:
+        parse_mix(args.mix)
+    except argparse.ArgumentTypeError as error:
+        parser.error("argument --mix: {}".format(error))
+
+    return args
+
+
+def main(argv=None):
+    args = parse_arguments(sys.argv[1:] if argv is None else argv)
+
+    stats = asyncio.run(run_load(
+        args.host, args.ports, args.mix, args.concurrency, args.rate,
+        args.duration, args.timeout, args.languages, args.window,
+        args.flood, args.flood_kind, args.flood_source))
+    summary = stats.report()
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(summary, output, indent=2)
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_report(summary)
+
+
+# RUNTIME
+if __name__ == '__main__':
+    main()
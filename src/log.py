@@ -0,0 +1,146 @@
+# IMPORTS
+import sys
+import queue
+import atexit
+import logging
+import logging.handlers
+import constants.config as cfg
+
+
+DEBUG = logging.DEBUG
+INFO = logging.INFO
+WARNING = logging.WARNING
+ERROR = logging.ERROR
+
+_logger = logging.getLogger("datetime_server")
+_logger.addHandler(logging.NullHandler())
+_logger.propagate = False
+_listener = None
+
+
+# Start of class ---------------------------------------------------------------
+class LazyMessage:
+    """
+        A message template and its arguments. The template is only formatted,
+        with str.format, if and when a handler writes the message out.
+    """
+    __slots__ = ("template", "args")
+
+    def __init__(self, template, args):
+        self.template = template
+        self.args = args
+
+    def __str__(self):
+        if self.args:
+            return self.template.format(*self.args)
+        return self.template
+
+
+class BackgroundQueueHandler(logging.handlers.QueueHandler):
+    """
+        A queue handler that leaves formatting to the background writer thread,
+        so the calling thread only pays for putting the record on the queue.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+# End of class =================================================================
+
+
+def configure(level=None, background=None, stream=None):
+    """
+        Sets the log level and where messages are written (stdout by default).
+        The level and background setting default to LOG_LEVEL and LOG_BACKGROUND.
+        With 'background' set, records are queued and written by a separate
+        thread, so logging never blocks on terminal or pipe I/O.
+        May be called again, e.g. in a forked worker, to replace the previous setup.
+    """
+    global _listener
+
+    if level is None:
+        level = cfg.LOG_LEVEL
+    if background is None:
+        background = cfg.LOG_BACKGROUND
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+    for handler in list(_logger.handlers):
+        _logger.removeHandler(handler)
+
+    handler = logging.StreamHandler(stream if stream is not None else sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+
+    if background:
+        records = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(records, handler)
+        _listener.start()
+        _logger.addHandler(BackgroundQueueHandler(records))
+
+    else:
+        _logger.addHandler(handler)
+
+    _logger.setLevel(level)
+
+
+def shutdown():
+    """
+        Writes out any queued messages and stops the background writer.
+    """
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def enabled(level):
+    """
+        Returns true if messages of the given level are currently written.
+    """
+    return _logger.isEnabledFor(level)
+
+
+def log(level, template, *args):
+    """
+        Logs a message template at the given level. Nothing is formatted when the
+        level is disabled. Memoryview arguments are copied, as the buffer they
+        view may be reused before a background writer formats the message.
+    """
+    if _logger.isEnabledFor(level):
+        args = tuple(bytes(arg) if isinstance(arg, memoryview) else arg for arg in args)
+        _logger.log(level, LazyMessage(template, args))
+
+
+def debug(template, *args):
+    """
+        Logs a per-packet message, which is disabled by default.
+    """
+    log(DEBUG, template, *args)
+
+
+def info(template, *args):
+    """
+        Logs a status message.
+    """
+    log(INFO, template, *args)
+
+
+def warning(template, *args):
+    """
+        Logs a warning message.
+    """
+    log(WARNING, template, *args)
+
+
+def error(template, *args):
+    """
+        Logs an error message.
+    """
+    log(ERROR, template, *args)
+
+
+atexit.register(shutdown)
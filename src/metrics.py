@@ -0,0 +1,189 @@
+# IMPORTS
+import time
+
+
+# Start of class ---------------------------------------------------------------
+class LatencyHistogram:
+    """
+        A latency histogram with power-of-two nanosecond buckets. Bucket i
+        counts samples of less than 2^i nanoseconds, so recording a sample is
+        one bit_length call and one list increment.
+    """
+    __slots__ = ("counts", "count", "total")
+
+    def __init__(self):
+        """
+            Initialise an empty histogram.
+        """
+        self.counts = [0] * 64
+        self.count = 0
+        self.total = 0
+
+    def record(self, nanoseconds):
+        """
+            Adds a single latency sample, in nanoseconds.
+        """
+        self.counts[nanoseconds.bit_length()] += 1
+        self.count += 1
+        self.total += nanoseconds
+
+    def percentile(self, percentile):
+        """
+            Returns the upper bound, in nanoseconds, of the bucket holding the given percentile.
+        """
+        if self.count == 0:
+            return 0
+
+        target = self.count * percentile / 100
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return 1 << index
+        return 1 << 63
+
+    def snapshot(self):
+        """
+            Returns a JSON friendly summary of the histogram.
+        """
+        return {
+            "count": self.count,
+            "mean_ns": self.total // self.count if self.count else 0,
+            "p50_ns": self.percentile(50),
+            "p99_ns": self.percentile(99),
+            "buckets": [[1 << index, count]
+                        for index, count in enumerate(self.counts) if count]
+        }
+
+
+class PortMetrics:
+    """
+        Counters for a single language port. Responses the kernel had no room
+        for are counted as queued, and as send_dropped if the queue was full too.
+        kernel_drops is the kernel's count of datagrams it dropped on receive,
+        None until read or where it cannot be read.
+    """
+    __slots__ = ("language", "received", "dropped", "rate_limited", "valid", "malformed",
+                 "sent", "send_errors", "queued", "send_dropped", "kernel_drops")
+
+    def __init__(self, language):
+        """
+            Initialise zeroed counters for the port serving the given language.
+        """
+        self.language = language
+        self.received = 0
+        self.dropped = 0
+        self.rate_limited = 0
+        self.valid = 0
+        self.malformed = {}
+        self.sent = 0
+        self.send_errors = 0
+        self.queued = 0
+        self.send_dropped = 0
+        self.kernel_drops = None
+
+    def snapshot(self):
+        """
+            Returns a JSON friendly copy of the counters.
+        """
+        return {
+            "language": self.language,
+            "received": self.received,
+            "dropped": self.dropped,
+            "rate_limited": self.rate_limited,
+            "valid": self.valid,
+            "malformed": {str(code): count for code, count in sorted(self.malformed.items())},
+            "sent": self.sent,
+            "send_errors": self.send_errors,
+            "queued": self.queued,
+            "send_dropped": self.send_dropped,
+            "kernel_drops": self.kernel_drops
+        }
+
+
+class ServerMetrics:
+    """
+        Every counter and stage latency histogram for a server process.
+        The stages are receive, validate, build and send. An engine that cannot
+        time a stage removes it from 'stages', so it is left out of snapshots.
+        Subscription counters cover subscribers and the updates pushed to them,
+        the multicast counter the packets published to a group and the
+        stream counters the connections of the stream transport.
+    """
+
+    STAGES = ("receive", "validate", "build", "send")
+
+    def __init__(self, ports):
+        """
+            Initialise metrics for the given {language: port} mapping.
+        """
+        self.started = time.time()
+        self.ports = {port: PortMetrics(language) for language, port in ports.items()}
+        self.receive = LatencyHistogram()
+        self.validate = LatencyHistogram()
+        self.build = LatencyHistogram()
+        self.send = LatencyHistogram()
+        self.stages = self.STAGES
+        self.subscribers = 0
+        self.subscriptions_refused = 0
+        self.pushed = 0
+        self.multicast_published = 0
+        self.stream_connections = 0
+        self.stream_refused = 0
+        self.stream_idle_closed = 0
+
+    def port(self, port):
+        """
+            Returns the counters for the given language port.
+        """
+        return self.ports[port]
+
+    def snapshot(self):
+        """
+            Returns a JSON friendly snapshot of every counter and histogram.
+        """
+        return {
+            "uptime_s": round(time.time() - self.started, 3),
+            "ports": {str(port): metrics.snapshot() for port, metrics in self.ports.items()},
+            "subscriptions": {
+                "subscribers": self.subscribers,
+                "refused": self.subscriptions_refused,
+                "pushed": self.pushed
+            },
+            "multicast": {
+                "published": self.multicast_published
+            },
+            "streams": {
+                "connections": self.stream_connections,
+                "refused": self.stream_refused,
+                "idle_closed": self.stream_idle_closed
+            },
+            "latency": {stage: getattr(self, stage).snapshot() for stage in self.stages}
+        }
+
+
+# End of class =================================================================
+
+
+def udp_socket_drops(inodes, paths=("/proc/net/udp", "/proc/net/udp6")):
+    """
+        Returns the kernel's count of datagrams dropped on receive for each of the
+        given UDP socket inodes, read from the 'drops' column of /proc/net/udp.
+        Inodes that are not found, and every inode on systems without that file,
+        are left out.
+    """
+    drops = {}
+
+    for path in paths:
+        try:
+            with open(path) as table:
+                lines = table.readlines()[1:]
+        except OSError:
+            continue
+
+        for line in lines:
+            fields = line.split()
+            if len(fields) > 12 and int(fields[9]) in inodes:
+                drops[int(fields[9])] = int(fields[12])
+
+    return drops
@@ -0,0 +1,95 @@
+# IMPORTS
+from utils import *
+import time
+import constants.config as cfg
+
+
+# Start of class ---------------------------------------------------------------
+class MulticastPublisher:
+    """
+        Publishes response packets to an IP multicast group, so that any number
+        of listening hosts are served by a single send per packet.
+        Publishing happens at the start of every minute, or every 'interval'
+        seconds when an interval is given.
+    """
+
+    def __init__(self, group, port, interval=None, interface=cfg.SERVER_MULTICAST_INTERFACE,
+                 ttl=cfg.SERVER_MULTICAST_TTL, monotonic=time.monotonic):
+        """
+            Initialise a publisher for the given group and port, sending through
+            the interface with the given address.
+        """
+        self.address = (group, int(port))
+        self.interval = interval
+        self.monotonic = monotonic
+        self.next_due = monotonic() + (interval or 0)
+        self.published = 0
+
+        self.sc = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sc.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, ttl)
+        self.sc.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+        self.sc.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(interface))
+
+    def due(self, new_minute):
+        """
+            Returns true if the packets should be published now, given whether a
+            new minute has just begun.
+        """
+        if self.interval is None:
+            return new_minute
+
+        now = self.monotonic()
+        if now < self.next_due:
+            return False
+
+        # Skip any missed intervals rather than publishing several times at once
+        self.next_due = max(self.next_due + self.interval, now)
+        return True
+
+    def seconds_to_next(self):
+        """
+            Returns the time until the next interval publish, or None when
+            publishing once a minute.
+        """
+        if self.interval is None:
+            return None
+        return max(0.0, self.next_due - self.monotonic())
+
+    def publish(self, packets):
+        """
+            Sends each of the given packets to the group.
+            Returns the number of packets that could not be sent.
+        """
+        sendto = self.sc.sendto
+        failed = 0
+        for packet in packets:
+            try:
+                sendto(packet, self.address)
+            except OSError:
+                failed += 1
+
+        self.published += len(packets) - failed
+        return failed
+
+    def close(self):
+        """
+            Closes the publishing socket.
+        """
+        self.sc.close()
+
+
+# End of class =================================================================
+
+
+def open_listener_socket(group, port, interface=cfg.CONFIG_MULTICAST_INTERFACE):
+    """
+        Returns a UDP socket bound to the given port and joined to the multicast
+        group on the interface with the given address. Several listeners on
+        the same host may share the port.
+    """
+    sc = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sc.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sc.bind(("", int(port)))
+    sc.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP,
+                  socket.inet_aton(group) + socket.inet_aton(interface))
+    return sc
@@ -0,0 +1,546 @@
+# IMPORTS
+import struct
+import constants.config as cfg
+
+
+# PACKET FIELDS
+MAGIC_NO = 0x497E
+PACKET_TYPE_DT_REQUEST = 0x0001
+PACKET_TYPE_DT_RESPONSE = 0x0002
+PACKET_TYPE_STATS_REQUEST = 0x0003
+PACKET_TYPE_STATS_RESPONSE = 0x0004
+PACKET_TYPE_BATCH_REQUEST = 0x0005
+PACKET_TYPE_BATCH_RESPONSE = 0x0006
+PACKET_TYPE_SUBSCRIBE_REQUEST = 0x0007
+
+# MagicNo, PacketType, RequestType
+REQUEST = struct.Struct("!HHH")
+
+# MagicNo, PacketType, RequestType, LanguageCode
+EXTENDED_REQUEST = struct.Struct("!HHHH")
+
+# MagicNo, PacketType, RequestType, LanguageCode (0 for the port's language), Sequence
+SEQUENCED_REQUEST = struct.Struct("!HHHHI")
+
+# MagicNo, PacketType, RequestType, LanguageCode (0 for the port's language), Sequence,
+# ZoneLength (of the zone identifier that follows, e.g. b"Europe/Berlin")
+ZONED_REQUEST = struct.Struct("!HHHHIB")
+
+# Sequence number, echoed after the text of responses to sequenced requests
+SEQUENCE = struct.Struct("!I")
+MAX_SEQUENCE = 0xFFFFFFFF
+
+# MagicNo, PacketType, LanguageCode, Year, Month, Day, Hour, Minute, Length
+RESPONSE_HEADER = struct.Struct("!HHHHBBBBB")
+
+# MagicNo, PacketType, RequestType, LanguageCode (0 for the port's language), Lease (seconds, 0 to unsubscribe)
+SUBSCRIBE_REQUEST = struct.Struct("!HHHHH")
+
+# Length of the packet that follows, framing packets sent over a stream connection
+FRAME_HEADER = struct.Struct("!H")
+
+# MagicNo, PacketType, Length (of the JSON body that follows)
+STATS_RESPONSE_HEADER = struct.Struct("!HHH")
+
+# MagicNo, PacketType, Sequence, Count (of the batch items or response records that follow)
+BATCH_HEADER = struct.Struct("!HHIH")
+
+# RequestType, LanguageCode (0 for the port's language)
+BATCH_ITEM = struct.Struct("!HH")
+
+MAX_TEXT_LENGTH = 0xFF
+MAX_BATCH_ITEMS = 64    # Keeps the largest batch response well inside a single datagram
+MAX_ZONE_LENGTH = 64    # Longer than any IANA zone identifier
+
+# Characters of IANA zone identifiers, such as "America/Port-au-Prince" or "Etc/GMT+5"
+ZONE_CHARACTERS = frozenset(
+    b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789/_+-")
+
+# Sizes of the smallest and largest packets a client can send
+MIN_REQUEST_SIZE = REQUEST.size
+MAX_REQUEST_SIZE = max(BATCH_HEADER.size + BATCH_ITEM.size * MAX_BATCH_ITEMS,
+                       ZONED_REQUEST.size + MAX_ZONE_LENGTH)
+
+MAGIC_NO_HIGH = MAGIC_NO >> 8
+MAGIC_NO_LOW = MAGIC_NO & 0xFF
+
+# Frozen copies of the configured values for fast membership tests
+REQUEST_TYPES = frozenset(cfg.COMMAND_TYPES)
+LANGUAGE_CODES = frozenset(cfg.CONFIG_LANGUAGE_CODES)
+
+
+# Request packets --------------------------------------------------------------
+
+def plausible_request(data):
+    """
+        A cheap first check for any packet sent to the server, which only looks
+        at the size and the MagicNo. Returns false for packets that cannot be
+        valid requests of any type, so they can be dropped before any other work.
+    """
+    return (MIN_REQUEST_SIZE <= len(data) <= MAX_REQUEST_SIZE
+            and data[0] == MAGIC_NO_HIGH and data[1] == MAGIC_NO_LOW)
+
+
+def pack_request(request_type, language_code=None, sequence=None, zone=None):
+    """
+        Returns a new date/time request packet for the given request type.
+        With a language code the extended form is returned, which asks for that
+        language whichever port the request is sent to. With a sequence number
+        the sequenced form is returned, and the server echoes the number back.
+        With a zone identifier the zoned form is returned, which asks for the
+        date or time in that zone. It always carries a sequence number, 0 if none is given.
+    """
+    if zone is not None:
+        name = zone.encode()
+        return ZONED_REQUEST.pack(
+            MAGIC_NO, PACKET_TYPE_DT_REQUEST, request_type, language_code or 0,
+            sequence or 0, len(name)) + name
+    if sequence is not None:
+        return SEQUENCED_REQUEST.pack(
+            MAGIC_NO, PACKET_TYPE_DT_REQUEST, request_type, language_code or 0, sequence)
+    if language_code is None:
+        return REQUEST.pack(MAGIC_NO, PACKET_TYPE_DT_REQUEST, request_type)
+    return EXTENDED_REQUEST.pack(
+        MAGIC_NO, PACKET_TYPE_DT_REQUEST, request_type, language_code)
+
+
+def unpack_request(data):
+    """
+        Returns the (RequestType, LanguageCode, Sequence) fields of a valid request packet.
+        The LanguageCode is None when the request takes the port's language, and
+        the Sequence is None for requests without a sequence number.
+    """
+    size = len(data)
+    if size >= SEQUENCED_REQUEST.size:
+        request_type, language_code, sequence = SEQUENCED_REQUEST.unpack_from(data)[2:]
+        return request_type, language_code or None, sequence
+    if size == EXTENDED_REQUEST.size:
+        return EXTENDED_REQUEST.unpack_from(data)[2:] + (None,)
+    return REQUEST.unpack_from(data)[2], None, None
+
+
+def request_zone(data):
+    """
+        Returns the zone identifier of a valid zoned request packet, or None for
+        the other forms, which ask for the server's local time.
+    """
+    if len(data) > ZONED_REQUEST.size:
+        return bytes(data[ZONED_REQUEST.size:]).decode("ascii")
+    return None
+
+
+def valid_zone(zone):
+    """
+        Returns true if a zone identifier can be carried by a zoned request.
+        Whether the server knows the zone is only found out by asking it.
+    """
+    name = zone.encode("ascii", "replace")
+    return 0 < len(name) <= MAX_ZONE_LENGTH and ZONE_CHARACTERS.issuperset(name)
+
+
+def validate_request(data):
+    """
+        Runs a request packet through the validity checks.
+        Returns 0 if every check is passed, otherwise the code of the failed check:
+            1 -> wrong size, 2 -> wrong MagicNo, 3 -> wrong PacketType,
+            4 -> unknown RequestType, 5 -> unknown LanguageCode (extended forms only),
+            6 -> invalid zone identifier (zoned form only)
+    """
+    size = len(data)
+    zoned = (ZONED_REQUEST.size < size <= ZONED_REQUEST.size + MAX_ZONE_LENGTH
+             and size == ZONED_REQUEST.size + data[ZONED_REQUEST.size - 1])
+    if (size != REQUEST.size and size != EXTENDED_REQUEST.size
+            and size != SEQUENCED_REQUEST.size and not zoned):
+        return 1
+
+    magic_no, packet_type, request_type = REQUEST.unpack_from(data)
+
+    if magic_no != MAGIC_NO:
+        return 2
+
+    if packet_type != PACKET_TYPE_DT_REQUEST:
+        return 3
+
+    if request_type not in REQUEST_TYPES:
+        return 4
+
+    if size == EXTENDED_REQUEST.size and EXTENDED_REQUEST.unpack_from(data)[3] not in LANGUAGE_CODES:
+        return 5
+
+    # A sequenced or zoned request may leave the LanguageCode as 0 for the port's language
+    if size >= SEQUENCED_REQUEST.size:
+        language_code = SEQUENCED_REQUEST.unpack_from(data)[3]
+        if language_code != 0 and language_code not in LANGUAGE_CODES:
+            return 5
+
+    if zoned and not ZONE_CHARACTERS.issuperset(data[ZONED_REQUEST.size:]):
+        return 6
+
+    return 0
+
+
+# Response packets -------------------------------------------------------------
+
+def pack_response(language_code, now, text_in_bytes):
+    """
+        Returns a new date/time response packet as immutable bytes.
+        'now' supplies the year, month, day, hour and minute fields.
+        Returns None if the text is longer than the Length field allows.
+    """
+    length = len(text_in_bytes)
+    if length > MAX_TEXT_LENGTH:
+        return None
+
+    packet = bytearray(RESPONSE_HEADER.size + length)
+    RESPONSE_HEADER.pack_into(
+        packet, 0, MAGIC_NO, PACKET_TYPE_DT_RESPONSE, language_code,
+        now.year, now.month, now.day, now.hour, now.minute, length)
+    packet[RESPONSE_HEADER.size:] = text_in_bytes
+    return bytes(packet)
+
+
+def append_sequence(packet, sequence):
+    """
+        Returns a response packet with the given sequence number echoed after its text.
+    """
+    return packet + SEQUENCE.pack(sequence)
+
+
+def response_sequence(data):
+    """
+        Returns the sequence number echoed by a response packet,
+        or None if the response does not carry one.
+    """
+    end = RESPONSE_HEADER.size + data[RESPONSE_HEADER.size - 1]
+    if len(data) == end + SEQUENCE.size:
+        return SEQUENCE.unpack_from(data, end)[0]
+    return None
+
+
+def unpack_response_header(data):
+    """
+        Returns the header fields of a response packet as a tuple of:
+            (MagicNo, PacketType, LanguageCode, Year, Month, Day, Hour, Minute, Length)
+    """
+    return RESPONSE_HEADER.unpack_from(data)
+
+
+def response_text(data):
+    """
+        Returns the decoded text of a response packet.
+    """
+    end = RESPONSE_HEADER.size + data[RESPONSE_HEADER.size - 1]
+    return bytes(memoryview(data)[RESPONSE_HEADER.size:end]).decode()
+
+
+def validate_response(data):
+    """
+        Runs a response packet through the validity checks.
+        Returns 0 if every check is passed, otherwise the code of the failed check:
+            1 -> too short, 2 -> wrong MagicNo, 3 -> wrong PacketType,
+            4 -> unknown LanguageCode, 5 -> Year not below 2100, 6 -> Month out of range,
+            7 -> Day out of range, 8 -> Hour out of range, 9 -> Minute out of range,
+            10 -> Length does not match the packet (with or without a sequence number)
+    """
+    if len(data) < RESPONSE_HEADER.size:
+        return 1
+
+    (magic_no, packet_type, language_code, year, month,
+     day, hour, minute, length) = RESPONSE_HEADER.unpack_from(data)
+
+    if magic_no != MAGIC_NO:
+        return 2
+
+    if packet_type != PACKET_TYPE_DT_RESPONSE:
+        return 3
+
+    if language_code not in LANGUAGE_CODES:
+        return 4
+
+    if year >= 2100:
+        return 5
+
+    if not (1 <= month <= 12):
+        return 6
+
+    if not (1 <= day <= 31):
+        return 7
+
+    if not (0 <= hour <= 23):
+        return 8
+
+    if not (0 <= minute <= 59):
+        return 9
+
+    size = len(data)
+    if size != RESPONSE_HEADER.size + length and size != RESPONSE_HEADER.size + length + SEQUENCE.size:
+        return 10
+
+    return 0
+
+
+# Stats packets ----------------------------------------------------------------
+
+def pack_stats_request():
+    """
+        Returns a new stats request packet. It has the request layout with a RequestType of 0.
+    """
+    return REQUEST.pack(MAGIC_NO, PACKET_TYPE_STATS_REQUEST, 0)
+
+
+def is_stats_request(data):
+    """
+        Returns true if the given packet is a stats request.
+    """
+    return len(data) == REQUEST.size and REQUEST.unpack_from(data)[:2] == \
+        (MAGIC_NO, PACKET_TYPE_STATS_REQUEST)
+
+
+def pack_stats_response(body):
+    """
+        Returns a new stats response packet carrying the given encoded JSON body.
+    """
+    return STATS_RESPONSE_HEADER.pack(
+        MAGIC_NO, PACKET_TYPE_STATS_RESPONSE, len(body)) + body
+
+
+def unpack_stats_response(data):
+    """
+        Returns the encoded JSON body of a stats response packet,
+        or None if the packet is not a well formed stats response.
+    """
+    if len(data) < STATS_RESPONSE_HEADER.size:
+        return None
+
+    magic_no, packet_type, length = STATS_RESPONSE_HEADER.unpack_from(data)
+    if (magic_no != MAGIC_NO or packet_type != PACKET_TYPE_STATS_RESPONSE
+            or len(data) != STATS_RESPONSE_HEADER.size + length):
+        return None
+
+    return bytes(memoryview(data)[STATS_RESPONSE_HEADER.size:])
+
+
+# Batch packets ----------------------------------------------------------------
+
+def pack_batch_request(items, sequence=0):
+    """
+        Returns a new batch request packet for a list of (RequestType, LanguageCode)
+        items, a LanguageCode of None asking for the port's language.
+        The server echoes the sequence number in its batch response.
+    """
+    packet = bytearray(BATCH_HEADER.size + BATCH_ITEM.size * len(items))
+    BATCH_HEADER.pack_into(
+        packet, 0, MAGIC_NO, PACKET_TYPE_BATCH_REQUEST, sequence, len(items))
+
+    offset = BATCH_HEADER.size
+    for request_type, language_code in items:
+        BATCH_ITEM.pack_into(packet, offset, request_type, language_code or 0)
+        offset += BATCH_ITEM.size
+
+    return bytes(packet)
+
+
+def is_batch_request(data):
+    """
+        Returns true if the given packet is long enough to be, and claims to be, a batch request.
+    """
+    return len(data) >= BATCH_HEADER.size and data[3] == PACKET_TYPE_BATCH_REQUEST and data[2] == 0
+
+
+def unpack_batch_request(data):
+    """
+        Returns the (Sequence, items) of a valid batch request packet, where
+        items is a list of (RequestType, LanguageCode) tuples and the
+        LanguageCode is None for items that take the port's language.
+    """
+    sequence = BATCH_HEADER.unpack_from(data)[2]
+    items = [(request_type, language_code or None) for request_type, language_code
+             in BATCH_ITEM.iter_unpack(memoryview(data)[BATCH_HEADER.size:])]
+    return sequence, items
+
+
+def validate_batch_request(data):
+    """
+        Runs a batch request packet through the validity checks.
+        Returns 0 if every check is passed, otherwise the code of the failed check,
+        using the same codes as validate_request:
+            1 -> wrong size or item count, 2 -> wrong MagicNo, 3 -> wrong PacketType,
+            4 -> unknown RequestType, 5 -> unknown LanguageCode
+    """
+    if len(data) < BATCH_HEADER.size:
+        return 1
+
+    magic_no, packet_type, sequence, count = BATCH_HEADER.unpack_from(data)
+
+    if not (1 <= count <= MAX_BATCH_ITEMS) or len(data) != BATCH_HEADER.size + BATCH_ITEM.size * count:
+        return 1
+
+    if magic_no != MAGIC_NO:
+        return 2
+
+    if packet_type != PACKET_TYPE_BATCH_REQUEST:
+        return 3
+
+    for request_type, language_code in BATCH_ITEM.iter_unpack(memoryview(data)[BATCH_HEADER.size:]):
+        if request_type not in REQUEST_TYPES:
+            return 4
+        if language_code != 0 and language_code not in LANGUAGE_CODES:
+            return 5
+
+    return 0
+
+
+def pack_batch_response(sequence, records):
+    """
+        Returns a new batch response packet holding the given date/time response
+        packets, in the order of the items they answer.
+    """
+    return BATCH_HEADER.pack(
+        MAGIC_NO, PACKET_TYPE_BATCH_RESPONSE, sequence, len(records)) + b"".join(records)
+
+
+def batch_response_sequence(data):
+    """
+        Returns the sequence number of a batch response packet,
+        or None if the packet is not a batch response.
+    """
+    if len(data) < BATCH_HEADER.size:
+        return None
+
+    magic_no, packet_type, sequence, count = BATCH_HEADER.unpack_from(data)
+    if magic_no != MAGIC_NO or packet_type != PACKET_TYPE_BATCH_RESPONSE:
+        return None
+
+    return sequence
+
+
+def unpack_batch_response(data):
+    """
+        Splits a batch response packet into its date/time response packets, each
+        of which can then be checked with validate_response.
+        Returns a (Sequence, records) tuple, or None if the packet is not a well
+        formed batch response.
+    """
+    sequence = batch_response_sequence(data)
+    if sequence is None:
+        return None
+
+    count = BATCH_HEADER.unpack_from(data)[3]
+    view = memoryview(data)
+    size = len(data)
+    offset = BATCH_HEADER.size
+    records = []
+
+    # Every record is a response packet, whose Length field gives its end
+    for _ in range(count):
+        if offset + RESPONSE_HEADER.size > size:
+            return None
+
+        end = offset + RESPONSE_HEADER.size + data[offset + RESPONSE_HEADER.size - 1]
+        if end > size:
+            return None
+
+        records.append(bytes(view[offset:end]))
+        offset = end
+
+    if offset != size:
+        return None
+
+    return sequence, records
+
+
+# Subscribe packets ------------------------------------------------------------
+
+def pack_subscribe_request(request_type, language_code=None, lease=0):
+    """
+        Returns a new subscribe request packet, asking to be sent the response for
+        the request type and language at the start of every minute for 'lease'
+        seconds. A lease of 0 cancels the subscription.
+    """
+    return SUBSCRIBE_REQUEST.pack(
+        MAGIC_NO, PACKET_TYPE_SUBSCRIBE_REQUEST, request_type, language_code or 0, lease)
+
+
+def is_subscribe_request(data):
+    """
+        Returns true if the given packet has the size and PacketType of a subscribe request.
+    """
+    return (len(data) == SUBSCRIBE_REQUEST.size and data[3] == PACKET_TYPE_SUBSCRIBE_REQUEST
+            and data[2] == 0)
+
+
+def unpack_subscribe_request(data):
+    """
+        Returns the (RequestType, LanguageCode, Lease) fields of a valid subscribe
+        request packet, the LanguageCode being None for the port's language.
+    """
+    request_type, language_code, lease = SUBSCRIBE_REQUEST.unpack_from(data)[2:]
+    return request_type, language_code or None, lease
+
+
+def validate_subscribe_request(data):
+    """
+        Runs a subscribe request packet through the validity checks.
+        Returns 0 if every check is passed, otherwise the code of the failed check,
+        using the same codes as validate_request:
+            1 -> wrong size, 2 -> wrong MagicNo, 3 -> wrong PacketType,
+            4 -> unknown RequestType, 5 -> unknown LanguageCode
+    """
+    if len(data) != SUBSCRIBE_REQUEST.size:
+        return 1
+
+    magic_no, packet_type, request_type, language_code, lease = SUBSCRIBE_REQUEST.unpack_from(data)
+
+    if magic_no != MAGIC_NO:
+        return 2
+
+    if packet_type != PACKET_TYPE_SUBSCRIBE_REQUEST:
+        return 3
+
+    if request_type not in REQUEST_TYPES:
+        return 4
+
+    if language_code != 0 and language_code not in LANGUAGE_CODES:
+        return 5
+
+    return 0
+
+
+# Stream framing ---------------------------------------------------------------
+
+def pack_frame(packet):
+    """
+        Returns the packet prefixed with its length, for sending over a stream connection.
+    """
+    return FRAME_HEADER.pack(len(packet)) + packet
+
+
+def unpack_frames(buffer):
+    """
+        Splits the complete frames off the front of a stream's receive buffer.
+        Returns a (packets, consumed) tuple, where 'consumed' is the number of
+        bytes the complete frames took up. Any trailing partial frame is left
+        for the next call.
+    """
+    packets = []
+    offset = 0
+    size = len(buffer)
+
+    while size - offset >= FRAME_HEADER.size:
+        end = offset + FRAME_HEADER.size + FRAME_HEADER.unpack_from(buffer, offset)[0]
+        if end > size:
+            break
+        packets.append(bytes(buffer[offset + FRAME_HEADER.size:end]))
+        offset = end
+
+    return packets, offset
+
+
+def frame_length(buffer, offset=0):
+    """
+        Returns the length of the packet in the frame starting at 'offset',
+        or None if the buffer does not hold the whole frame header yet.
+    """
+    if len(buffer) - offset < FRAME_HEADER.size:
+        return None
+    return FRAME_HEADER.unpack_from(buffer, offset)[0]
@@ -0,0 +1,56 @@
+# IMPORTS
+import time
+import collections
+import constants.config as cfg
+
+
+# Start of class ---------------------------------------------------------------
+class RateLimiter:
+    """
+        Per source address token buckets. Each source may send 'rate' requests
+        per second on average, in bursts of up to 'burst' requests.
+        The table of buckets holds at most 'capacity' sources, evicting the
+        least recently seen one to make room, so a flood from many addresses
+        cannot grow it without bound.
+    """
+
+    def __init__(self, rate=cfg.SERVER_RATE_LIMIT, burst=cfg.SERVER_RATE_LIMIT_BURST,
+                 capacity=cfg.SERVER_RATE_LIMIT_SOURCES, monotonic=time.monotonic):
+        """
+            Initialise a rate limiter with no known sources.
+        """
+        self.rate = rate
+        self.burst = burst
+        self.capacity = capacity
+        self.monotonic = monotonic
+        self.buckets = collections.OrderedDict()    # Source -> [tokens, time of last refill]
+        self.evicted = 0
+
+    def allow(self, source):
+        """
+            Takes a token from the source's bucket.
+            Returns true if the source is within its rate, false if the request should be dropped.
+        """
+        now = self.monotonic()
+        bucket = self.buckets.get(source)
+
+        if bucket is None:
+            if len(self.buckets) >= self.capacity:
+                self.buckets.popitem(last=False)
+                self.evicted += 1
+            self.buckets[source] = [self.burst - 1, now]
+            return True
+
+        self.buckets.move_to_end(source)
+        tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+
+        if tokens < 1:
+            bucket[0] = tokens
+            return False
+
+        bucket[0] = tokens - 1
+        return True
+
+
+# End of class =================================================================
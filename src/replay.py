@@ -0,0 +1,281 @@
+"""
+    Replays a traffic capture recorded by the server against a running server.
+
+    Sends every recorded datagram, malformed ones included, with the recorded
+    spacing scaled by a speed factor, or as fast as possible, and reports the
+    achieved throughput and the latency of the responses. Each recorded
+    source address gets its own socket. When the server is on a loopback
+    address every socket also sends from its own loopback address, so that
+    per-source behaviour such as rate limiting is reproduced, while against
+    other hosts all sockets share the local address and so a single rate
+    limit. Captures from several server workers are merged in timestamp order.
+
+    Run from the 'src' directory, e.g.:
+        python3 replay.py capture.bin localhost
+        python3 replay.py capture.bin localhost --speed 10
+        python3 replay.py capture.bin.* localhost --speed 0 --json --output after.json
+        python3 replay.py capture.bin localhost --port-map 3333:6333,4444:6444
+"""
+# IMPORTS
+import sys
+import json
+import time
+import heapq
+import socket
+import asyncio
+import argparse
+import ipaddress
+import collections
+import protocol
+from capture import read_capture
+from loadgen import LoadStats, print_report
+
+
+RECV_BUFFER_SIZE = 4194304    # Bytes asked for, the kernel may grant less
+
+# Sockets replaying to a loopback server send from consecutive addresses from here
+FIRST_LOOPBACK_SOURCE = ipaddress.IPv4Address("127.1.0.1")
+
+
+# Start of class ---------------------------------------------------------------
+class ReplayProtocol(asyncio.DatagramProtocol):
+    """
+        A datagram protocol for the socket standing in for one or more recorded
+        sources. A response echoing a sequence number completes the oldest
+        request sent with that number. Any other response completes the oldest
+        request without one, as the server answers each source in order; once
+        such a response goes missing, later latencies of the socket's requests
+        without a sequence number are measured from the wrong send.
+    """
+
+    def __init__(self, stats):
+        """
+            Initialise a replay protocol with no outstanding requests.
+        """
+        self.stats = stats
+        self.transport = None
+        self.outstanding = collections.deque()    # Send times of unsequenced requests expecting a response
+        self.sequenced = {}    # Sequence -> send times of sequenced requests expecting a response
+        self.waiting = 0
+
+    def connection_made(self, transport):
+        """
+            Keep hold of the transport so requests can be sent through it.
+        """
+        self.transport = transport
+
+    def expect(self, data):
+        """
+            Notes the send time of a request the server will answer.
+        """
+        sequence = request_sequence(data)
+        if sequence is None:
+            self.outstanding.append(time.perf_counter())
+        else:
+            self.sequenced.setdefault(sequence, collections.deque()).append(time.perf_counter())
+        self.waiting += 1
+
+    def datagram_received(self, data, address):
+        """
+            Completes the outstanding request the response answers.
+        """
+        sequence = response_sequence(data)
+        sent_times = self.outstanding if sequence is None else self.sequenced.get(sequence)
+
+        if sent_times:
+            self.stats.latencies.append(time.perf_counter() - sent_times.popleft())
+            self.stats.received += 1
+            self.waiting -= 1
+
+    def error_received(self, exc):
+        """
+            Counts errors reported for earlier sends, e.g. when the port is unreachable.
+        """
+        self.stats.errors += 1
+
+
+# End of class =================================================================
+
+
+def expects_response(data):
+    """
+        Returns true if the server answers the given request packet, i.e. it is
+        a stats request or passes the protocol's validity checks.
+    """
+    if not protocol.plausible_request(data):
+        return False
+    if protocol.is_stats_request(data):
+        return True
+    if protocol.is_batch_request(data):
+        return protocol.validate_batch_request(data) == 0
+    if protocol.is_subscribe_request(data):
+        return protocol.validate_subscribe_request(data) == 0
+    return protocol.validate_request(data) == 0
+
+
+def request_sequence(data):
+    """
+        Returns the sequence number carried by a request the server answers,
+        or None if the request carries none.
+    """
+    if protocol.is_batch_request(data):
+        return protocol.unpack_batch_request(data)[0]
+    if protocol.is_stats_request(data) or protocol.is_subscribe_request(data):
+        return None
+    return protocol.unpack_request(data)[2]
+
+
+def response_sequence(data):
+    """
+        Returns the sequence number echoed by a date/time or batch response,
+        or None if the response carries none.
+    """
+    if protocol.validate_response(data) == 0:
+        return protocol.response_sequence(data)
+    return protocol.batch_response_sequence(data)
+
+
+def load_records(paths):
+    """
+        Returns the records of the given captures merged into timestamp order.
+        The older segment of a capture is read along with it, so it is skipped
+        if given as well, e.g. by a shell glob.
+    """
+    paths = [path for path in paths if not (path.endswith(".1") and path[:-2] in paths)]
+    return list(heapq.merge(*[read_capture(path) for path in paths],
+                            key=lambda record: record.timestamp))
+
+
+def parse_port_map(port_map):
+    """
+        Parses a port mapping such as '3333:6333,4444:6444' into a dictionary.
+    """
+    mapping = {}
+    if port_map:
+        for item in port_map.split(","):
+            recorded, _, port = item.partition(":")
+            mapping[int(recorded)] = int(port)
+    return mapping
+
+
+async def open_endpoint(loop, stats, source=None):
+    """
+        Opens a replay socket, sending from the 'source' address if given, and
+        returns its protocol. The socket's receive buffer is enlarged, as
+        responses to a replay sent flat out arrive faster than the event loop
+        reads them.
+    """
+    sc = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sc.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECV_BUFFER_SIZE)
+    if source is not None:
+        sc.bind((source, 0))
+    transport, endpoint = await loop.create_datagram_endpoint(
+        lambda: ReplayProtocol(stats), sock=sc)
+    return endpoint
+
+
+async def run_replay(records, host, speed=1.0, port_map=None, max_sockets=256, timeout=1.0):
+    """
+        Sends the recorded datagrams to the server at 'host' and returns the
+        collected LoadStats. A speed of 1 keeps the recorded spacing, N replays
+        N times faster and 0 sends as fast as possible.
+        Recorded sources beyond 'max_sockets' share sockets. Against a loopback
+        server, each socket sends from its own loopback address.
+    """
+    loop = asyncio.get_running_loop()
+    host = socket.gethostbyname(host)
+    loopback = ipaddress.ip_address(host).is_loopback
+    port_map = port_map or {}
+    stats = LoadStats()
+    endpoints = {}
+
+    # Open the sockets first, so that opening them is not part of the replay,
+    # and share them out between any further sources in the order they appear
+    shared = []
+    for record in records:
+        if record.source not in endpoints:
+            if len(shared) < max_sockets:
+                source = str(FIRST_LOOPBACK_SOURCE + len(shared)) if loopback else None
+                shared.append(await open_endpoint(loop, stats, source))
+            endpoints[record.source] = shared[len(endpoints) % max_sockets]
+
+    start = time.perf_counter()
+    first_timestamp = records[0].timestamp if records else 0
+
+    for index, record in enumerate(records):
+        if speed:
+            delay = start + (record.timestamp - first_timestamp) / 1e9 / speed - time.perf_counter()
+            if delay > 0.001:
+                await asyncio.sleep(delay)
+
+        # Let responses in now and again when sending flat out
+        elif index % 64 == 63:
+            await asyncio.sleep(0)
+
+        endpoint = endpoints[record.source]
+        if expects_response(record.payload):
+            endpoint.expect(record.payload)
+        endpoint.transport.sendto(
+            record.payload, (host, port_map.get(record.port, record.port)))
+        stats.sent += 1
+
+    # Wait for the last responses before counting the rest as lost
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline and any(e.waiting for e in shared):
+        await asyncio.sleep(0.01)
+
+    stats.elapsed = time.perf_counter() - start
+    stats.lost = sum(endpoint.waiting for endpoint in shared)
+    for endpoint in shared:
+        endpoint.transport.close()
+
+    return stats
+
+
+def parse_arguments(argv):
+    """
+        Parses the replay tool's command line arguments.
+    """
+    parser = argparse.ArgumentParser(description="Date/time server traffic replay.")
+    parser.add_argument("captures", nargs="+",
+                        help="capture files recorded with SERVER_CAPTURE_FILE")
+    parser.add_argument("host", help="server host name or address")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="replay speed relative to the recording, 0 for as fast as possible")
+    parser.add_argument("--port-map",
+                        help="send to other ports than the recorded ones, e.g. '3333:6333,4444:6444'")
+    parser.add_argument("--sockets", type=int, default=256,
+                        help="most sockets to open, sources beyond this share sockets")
+    parser.add_argument("--timeout", type=float, default=1.0,
+                        help="seconds to wait for the last responses")
+    parser.add_argument("--json", action="store_true",
+                        help="print the summary as JSON")
+    parser.add_argument("--output", help="also write the JSON summary to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_arguments(sys.argv[1:] if argv is None else argv)
+
+    records = load_records(args.captures)
+    stats = asyncio.run(run_replay(
+        records, args.host, args.speed, parse_port_map(args.port_map),
+        args.sockets, args.timeout))
+    summary = stats.report()
+    summary["unanswered"] = sum(1 for record in records if not expects_response(record.payload))
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(summary, output, indent=2)
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_report(summary)
+        print("- Unanswered:     {} (no response expected)".format(summary["unanswered"]))
+        print("-" * 50)
+
+
+# RUNTIME
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# IMPORTS
+from clock import CoarseClock
+
+
+# Start of class ---------------------------------------------------------------
+class ResponseCache:
+    """
+        Holds the finished response packet for every (language, request type)
+        pair. The packets only change once a minute, so every entry is rebuilt
+        together the first time the cache is read in a new minute of its clock.
+        Packets for other zones than the clock's are kept by (zone, language,
+        request type), built when first asked for in a minute and rebuilt with
+        the others for as long as they are asked for.
+    """
+
+    def __init__(self, build, languages, request_types, clock=None):
+        """
+            Initialise a response cache.
+            'build' is called as build(language, request_type, now) and returns the packet bytes,
+            where 'now' is the clock, which has the fields of a datetime.
+        """
+        self.build = build
+        self.languages = languages
+        self.request_types = request_types
+        self.clock = clock if clock is not None else CoarseClock()
+        self.minute = None
+        self.packets = {}
+        self.zone_packets = {}
+        self.zones_used = set()
+
+    def get(self, language, request_type, zone=None):
+        """
+            Returns the cached packet for the given language and request type,
+            or None if no such packet exists. With a ZoneTable the packet gives
+            the time in that zone, otherwise the time of the clock.
+        """
+        self.clock.check()
+        if self.clock.minute_index != self.minute:
+            self.rebuild()
+
+        if zone is None:
+            return self.packets.get((language, request_type))
+
+        self.zones_used.add(zone)
+        packet = self.zone_packets.get((zone, language, request_type))
+        if packet is None and (language, request_type) in self.packets:
+            packet = self.zone_packets[(zone, language, request_type)] = self.build(
+                language, request_type, zone.local_time(self.clock))
+
+        return packet
+
+    def rebuild(self):
+        """
+            Rebuilds every cached packet for the clock's current minute. Zones
+            that were not asked for in the previous minute are dropped.
+        """
+        self.packets = {
+            (language, request_type): self.build(language, request_type, self.clock)
+            for language in self.languages
+            for request_type in self.request_types
+        }
+
+        zones = self.zones_used
+        self.zones_used = set()
+        self.zone_packets = {}
+        for zone in zones:
+            now = zone.local_time(self.clock)
+            for language, request_type in self.packets:
+                self.zone_packets[(zone, language, request_type)] = self.build(
+                    language, request_type, now)
+
+        self.minute = self.clock.minute_index
+
+    def refresh(self):
+        """
+            Brings the cache up to date ahead of the next request, e.g. from a
+            timer at the start of each minute.
+            Returns true if the packets were rebuilt.
+        """
+        self.clock.check()
+        if self.clock.minute_index == self.minute:
+            return False
+
+        self.rebuild()
+        return True
+
+
+# End of class =================================================================
@@ -0,0 +1,151 @@
+# IMPORTS
+import random
+import collections
+import constants.config as cfg
+
+
+# Start of class ---------------------------------------------------------------
+class RttEstimator:
+    """
+        Keeps a smoothed round trip time and its variation for one server, in
+        the style of TCP (RFC 6298), and derives retransmission timeouts and
+        the delay before a hedged duplicate request from them.
+        Also counts the requests, retransmits and hedges made against the server.
+    """
+
+    ALPHA = 1 / 8
+    BETA = 1 / 4
+
+    def __init__(self, initial_rto=cfg.CONFIG_RTO_INITIAL, min_rto=cfg.CONFIG_RTO_MIN,
+                 max_rto=cfg.CONFIG_RTO_MAX):
+        """
+            Initialise an estimator with no samples, timeouts in seconds.
+        """
+        self.min_rto = min_rto
+        self.max_rto = max_rto
+        self.srtt = None
+        self.rttvar = None
+        self.rto = initial_rto
+        self.samples = collections.deque(maxlen=cfg.CONFIG_RTT_SAMPLES)
+        self.gap = None    # Mean time between responses while requests are queued
+        self.busy_time = 0.0
+        self.busy_responses = 0
+        self.last_response = None
+        self.in_flight = 0    # Requests of the async client library awaiting a response
+
+        self.requests = 0
+        self.retransmits = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def sample(self, rtt):
+        """
+            Adds an unambiguous round trip time measurement, in seconds.
+            Only responses to requests that were sent exactly once should be sampled.
+        """
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - self.BETA) * self.rttvar + self.BETA * abs(self.srtt - rtt)
+            self.srtt = (1 - self.ALPHA) * self.srtt + self.ALPHA * rtt
+
+        self.rto = min(self.max_rto, max(self.min_rto, self.srtt + 4 * self.rttvar))
+        self.samples.append(rtt)
+
+    def sample_gap(self, now, outstanding):
+        """
+            Notes a response arriving at 'now', a time.perf_counter() time, with
+            'outstanding' further requests to the server still in flight. Only
+            the gaps between responses that follow one another with requests
+            still in flight are sampled, as those measure how long the server
+            takes per queued request rather than how long the client was idle.
+        """
+        if self.last_response is not None:
+            self.busy_time += now - self.last_response
+            self.busy_responses += 1
+
+            # Responses arrive in bursts, so the gap is their mean over recent responses
+            if self.busy_responses > cfg.CONFIG_RTT_SAMPLES:
+                self.busy_time /= 2
+                self.busy_responses /= 2
+            self.gap = self.busy_time / self.busy_responses
+        self.last_response = now if outstanding else None
+
+    def timeout(self, attempt, queued=0):
+        """
+            Returns the time to wait for a response to the given transmission
+            attempt (0 for the first), with 'queued' other requests in flight
+            to the server, doubling per attempt up to the maximum timeout and spread by
+            random jitter.
+        """
+        base = self.rto + queued * (self.gap or 0)
+        backoff = min(self.max_rto, base * (2 ** attempt))
+        jitter = random.uniform(1 - cfg.CONFIG_RTO_JITTER, 1 + cfg.CONFIG_RTO_JITTER)
+        return min(self.max_rto, backoff * jitter)
+
+    def hedge_delay(self):
+        """
+            Returns the 95th percentile of recent round trip times, after which
+            a hedged duplicate request is sent, or None with too few samples.
+        """
+        if len(self.samples) < cfg.CONFIG_HEDGE_MIN_SAMPLES:
+            return None
+
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, len(ordered) * 95 // 100)]
+
+    def may_hedge(self):
+        """
+            Returns true while hedged requests are within CONFIG_HEDGE_BUDGET, the
+            fraction of all requests that may be duplicated. Without the budget,
+            hedging an overloaded server adds load and so causes more hedging.
+        """
+        return self.hedges < self.requests * cfg.CONFIG_HEDGE_BUDGET
+
+    def may_retransmit(self):
+        """
+            Returns true while retransmits are within CONFIG_RETRANSMIT_BUDGET, the
+            fraction of all requests that may be retransmitted, beyond the first
+            CONFIG_RETRANSMIT_BUDGET_MIN. Without the budget, timeouts that are
+            too short for a burst of requests retransmit most of the burst.
+        """
+        return (self.retransmits < cfg.CONFIG_RETRANSMIT_BUDGET_MIN
+                + self.requests * cfg.CONFIG_RETRANSMIT_BUDGET)
+
+    def counters(self, since=None):
+        """
+            Returns the request, retransmit and hedge counters and their rates.
+            With 'since', counters returned earlier, only what was counted
+            after them is returned, e.g. for a single run of requests.
+        """
+        requests = self.requests - (since["requests"] if since else 0)
+        retransmits = self.retransmits - (since["retransmits"] if since else 0)
+        hedges = self.hedges - (since["hedges"] if since else 0)
+        return {
+            "requests": requests,
+            "retransmits": retransmits,
+            "retransmit_rate": retransmits / requests if requests else 0.0,
+            "hedges": hedges,
+            "hedge_rate": hedges / requests if requests else 0.0,
+            "hedge_wins": self.hedge_wins - (since["hedge_wins"] if since else 0),
+            "srtt_ms": self.srtt * 1000 if self.srtt is not None else None,
+            "rto_ms": self.rto * 1000
+        }
+
+
+# End of class =================================================================
+
+
+_estimators = {}
+
+
+def estimator_for(address):
+    """
+        Returns the estimator shared by every client talking to the given server address.
+    """
+    estimator = _estimators.get(address)
+    if estimator is None:
+        estimator = _estimators[address] = RttEstimator(
+            cfg.CONFIG_RTO_INITIAL, cfg.CONFIG_RTO_MIN, cfg.CONFIG_RTO_MAX)
+    return estimator
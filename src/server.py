@@ -1,7 +1,21 @@
 # IMPORTS
 from utils import *
+import os
+import sys
+import time
 import select
-import datetime
+import collections
+import log
+import protocol
+import settings
+import languages
+from clock import CoarseClock
+from metrics import ServerMetrics, udp_socket_drops
+from subscriptions import SubscriptionTable
+from languages import build_registry
+from constants.languages import LANGUAGES
+from response_cache import ResponseCache
+from zones import ZoneRegistry
 import constants.config as cfg
 import constants.responses as responses
 
@@ -13,21 +27,78 @@ class Server:
         methods, in addition to methods that send and receive packets to and from a client.
     """
 
-    def __init__(self, port1, port2, port3):
+    def __init__(self, *ports, recv_batch_size=cfg.SERVER_RECV_BATCH_SIZE, clock=None,
+                 served_languages=None):
         """
-            Initialise a server object
+            Initialise a server object.
+            The Nth port serves the Nth language of the language registry, or
+            the Nth of 'served_languages' when those are given.
+            Responses are built from the given clock, by default a CoarseClock
+            of the current local time.
         """
-        # Initialise ports
-        self.ports = {
-            "English": int(port1),
-            "Te reo Maori": int(port2),
-            "German": int(port3)
-        }
-
-        # Initialise sockets
-        self.english_sc = None
-        self.maori_sc = None
-        self.german_sc = None
+        # Initialise languages and ports, every registered language can be
+        # asked for by code but only those given a port have their own port
+        registry = build_registry(ports, served_languages)
+        self.languages = [language for language in registry if language.port is not None]
+        self.languages_by_port = {language.port: language for language in self.languages}
+        self.languages_by_code = {language.code: language for language in registry}
+        self.ports = {language.name: language.port for language in self.languages}
+
+        # Initialise sockets, incoming sockets are dispatched by file descriptor
+        self.reuse_port = False
+        self.sockets = []
+        self.sockets_by_port = {}
+        self.dispatch = {}
+
+        # Responses waiting for room in a socket's send buffer, with their total size
+        self.send_queues = {}
+        self.send_queue_bytes = {}
+
+        # Batched receive state, a single buffer is reused for every datagram
+        self.recv_batch_size = recv_batch_size
+        self.recv_buffer = bytearray(cfg.SERVER_RECV_BUFFER_SIZE)
+        self.recv_view = memoryview(self.recv_buffer)
+
+        # Finished response packets for every (language, request type) pair,
+        # rebuilt whenever the clock reaches a new minute
+        self.clock = clock if clock is not None else CoarseClock()
+        self.response_cache = ResponseCache(
+            self.build_dt_response_packet, list(self.languages_by_code), cfg.COMMAND_TYPES,
+            self.clock)
+
+        # Zones a request may ask for the time in, each with its precomputed UTC offset
+        self.zones = ZoneRegistry(cfg.SERVER_TIMEZONES)
+
+        # Counters and stage latencies, reported in reply to stats requests
+        self.metrics = ServerMetrics(self.ports)
+
+        # Subscribers are pushed the new responses once per minute
+        self.subscriptions = SubscriptionTable(cfg.SERVER_MAX_SUBSCRIBERS, cfg.SERVER_MAX_LEASE)
+        self.pushed_minute = self.clock.minute_index
+
+        # Optionally, every response is also published to a multicast group
+        self.publisher = None
+
+        # Stats replies are many times the size of a request, so only some sources get them
+        self.stats_allowed = None
+        if cfg.SERVER_STATS_ALLOWED is not None:
+            self.stats_allowed = frozenset(cfg.SERVER_STATS_ALLOWED)
+
+        # Optionally, each source address is limited to SERVER_RATE_LIMIT requests per second
+        self.rate_limiter = None
+        if cfg.SERVER_RATE_LIMIT is not None:
+            from rate_limit import RateLimiter
+            self.rate_limiter = RateLimiter()
+
+        # Optionally, every incoming datagram is recorded for later replay
+        self.capture = None
+
+        # Optionally, a successor takes the bound sockets over through a handoff socket
+        self.handoff_path = None
+        self.handoff_listener = None
+        self.predecessor = None    # Connection to the server whose sockets were taken over
+        self.stream_sockets = {}    # Port -> listening stream sockets, of the asyncio engine
+        self.handed_off = False
 
     # Operational functions ----------------------------------------------------
 
@@ -36,34 +107,46 @@ class Server:
             Begins listening to the open sockets and calls methods to process
             incoming packets when they are detected.
             Returns true when a packet comes in through a valid port, and false otherwise.
+            Also wakes at the start of each minute to run the server's tick, when
+            a socket with queued responses has room to send them, and when a
+            successor connects to the handoff socket.
         """
-        print(responses.STATUS_STARTING_TO_LISTEN)
-        sockets = [self.english_sc, self.maori_sc, self.german_sc]
+        log.debug(responses.STATUS_STARTING_TO_LISTEN)
 
         try:
-            incoming, outgoing, exceptions = select.select(sockets, [], [])
+            readable = self.sockets
+            if self.handoff_listener is not None:
+                readable = readable + [self.handoff_listener]
 
-            if incoming[0] == self.english_sc:
-                self.process_incoming(
-                    incoming[0], self.english_sc, self.ports['English'])
-                return True
+            waiting = [sc for sc, queue in self.send_queues.items() if queue]
+            incoming, outgoing, exceptions = select.select(
+                readable, waiting, [], self.seconds_to_next_tick())
+            self.tick()
 
-            elif incoming[0] == self.maori_sc:
-                self.process_incoming(
-                    incoming[0], self.maori_sc, self.ports['Te reo Maori'])
-                return True
+            for sc in outgoing:
+                self.flush_send_queue(sc, self.dispatch[sc.fileno()].port)
 
-            elif incoming[0] == self.german_sc:
-                self.process_incoming(
-                    incoming[0],  self.german_sc, self.ports['German'])
-                return True
+            for sc in incoming:
+                if sc is self.handoff_listener:
+                    self.hand_off()
+                    continue
 
-            else:
-                print(responses.ERROR_FOREIGN_PORT)
-                return False
+                language = self.dispatch.get(sc.fileno())
+
+                if language is None:
+                    log.error(responses.ERROR_FOREIGN_PORT)
+                    return False
+
+                # Drain every ready socket in batches, or read one datagram from each
+                if self.recv_batch_size > 1:
+                    self.process_incoming_batch(sc, language.port)
+                else:
+                    self.process_incoming(sc, sc, language.port)
+
+            return True
 
         except:
-            print(responses.ERROR_NO_SOCKET)
+            log.error(responses.ERROR_NO_SOCKET)
             return False
 
     def process_incoming(self, incoming, sc, port):
@@ -73,179 +156,620 @@ class Server:
             send to the client's address.
         """
         try:
-            data, bounce_back_address = sc.recvfrom(4096)
-            print(responses.SUCCESS_RECEIVED_INCOMING.format(data, port))
+            start = time.perf_counter_ns()
+            try:
+                data, bounce_back_address = sc.recvfrom(4096)
+            except BlockingIOError:
+                return
+            self.metrics.receive.record(time.perf_counter_ns() - start)
+            packet = self.handle_request(data, bounce_back_address, port)
+
+            if packet is not None:
+                # Send response packet to client
+                self.send_response(sc, packet, bounce_back_address, port)
 
-            if self.validate_request(data, bounce_back_address):
+        except:
+            log.error(responses.ERROR_PROCESS_INCOMING)
 
-                # Form a response packet
-                packet = self.create_dt_response_packet(data, port)
-                if packet is not None:
-                    print(responses.SUCCESS_RESPONSE_PACKET_CREATED)
+    def process_incoming_batch(self, sc, port):
+        """
+            Drains up to 'recv_batch_size' queued datagrams from a ready socket
+            without blocking, then sends the replies for the whole batch together.
+            Every datagram is received into the same preallocated buffer.
+        """
+        replies = []
 
-                    # Send response packet to client
-                    sc.sendto(packet, bounce_back_address)
-                    print(responses.SUCCESS_RESPONSE_PACKET_SENT.format(
-                        bounce_back_address[0], bounce_back_address[1]))
+        try:
+            for _ in range(self.recv_batch_size):
+                start = time.perf_counter_ns()
+                try:
+                    nbytes, bounce_back_address = sc.recvfrom_into(
+                        self.recv_buffer, 0, socket.MSG_DONTWAIT)
+                except BlockingIOError:
+                    break
+                self.metrics.receive.record(time.perf_counter_ns() - start)
+
+                # The response is built before the buffer is reused
+                packet = self.handle_request(
+                    self.recv_view[:nbytes], bounce_back_address, port)
+                if packet is not None:
+                    replies.append((packet, bounce_back_address))
 
-            else:
-                print(responses.ERROR_MALFORMED_REQUEST.format(
-                    bounce_back_address[0], bounce_back_address[1], data))
+            for packet, bounce_back_address in replies:
+                self.send_response(sc, packet, bounce_back_address, port)
 
         except:
-            print(responses.ERROR_PROCESS_INCOMING)
+            log.error(responses.ERROR_PROCESS_INCOMING)
 
-    def validate_request(self, data, bounce_back_address):
+    def tick(self):
         """
-            Runs the given packet through various validity checks.
-            Returns true if every check is passed, false otherwise.
+            Called by every engine when a new minute may have begun.
+            Rebuilds the cached responses, so the first request of the minute
+            does not have to wait for them, then pushes them to subscribers
+            and publishes them to the multicast group when one is due.
         """
-        error_codes = []
+        self.response_cache.refresh()
 
-        # Check the size of the request
-        if len(data) != 6:
-            error_codes.append(1)
+        # A request may already have rebuilt the cache, so pushes are tracked apart
+        new_minute = self.clock.minute_index != self.pushed_minute
+        if new_minute:
+            self.pushed_minute = self.clock.minute_index
+            self.push_updates()
 
-        # Check that the MagicNo field contains 0x497E
-        elif ((data[0] << 8) | data[1]) != 0x497E:
-            error_codes.append(2)
+        if self.publisher is not None and self.publisher.due(new_minute):
+            self.publish_updates()
 
-        # Check that the PacketType field contains 0x0001
-        elif ((data[2] << 8) | data[3]) != 0x0001:
-            error_codes.append(3)
+    def seconds_to_next_tick(self):
+        """
+            Returns the time until the next minute or multicast publish,
+            whichever comes first, or None if neither will come.
+        """
+        delay = self.clock.seconds_to_next_minute()
 
-        # Check that the RequestType field contains either 0x0001 or 0x0002
-        elif ((data[4] << 8) | data[5]) not in cfg.COMMAND_TYPES:
-            error_codes.append(4)
+        if self.publisher is not None:
+            publish_delay = self.publisher.seconds_to_next()
+            if publish_delay is not None and (delay is None or publish_delay < delay):
+                delay = publish_delay
 
-        if len(error_codes) == 0:
-            print(responses.SUCCESS_REQUEST_VALID.format(
-                bounce_back_address[0], bounce_back_address[1], data))
-            return True
+        return delay
+
+    def push_updates(self):
+        """
+            Sends every live subscriber the current response packet it subscribed to.
+            Each group of subscribers shares one prebuilt packet and one socket.
+        """
+        for (port, language_code, request_type), addresses in self.subscriptions.live():
+            packet = self.response_cache.get(language_code, request_type)
+            sc = self.sockets_by_port.get(port)
+            if packet is None or sc is None:
+                continue
+
+            sendto = sc.sendto
+            sent = 0
+            failed = 0
+            for address in addresses:
+                try:
+                    sendto(packet, address)
+                    sent += 1
+                except BlockingIOError:
+                    self.queue_response(sc, packet, address, port)
+                except OSError:
+                    failed += 1
+
+            port_metrics = self.metrics.port(port)
+            port_metrics.sent += sent
+            port_metrics.send_errors += failed
+            self.metrics.pushed += sent
+
+        self.metrics.subscribers = self.subscriptions.count
+        log.debug(responses.STATUS_PUSHED_UPDATES, self.subscriptions.count)
+
+    def publish_updates(self):
+        """
+            Publishes the current response packet of every language and request
+            type to the multicast group.
+        """
+        packets = [self.response_cache.get(language_code, request_type)
+                   for language_code in self.languages_by_code
+                   for request_type in cfg.COMMAND_TYPES]
+        packets = [packet for packet in packets if packet is not None]
+
+        failed = self.publisher.publish(packets)
+        self.metrics.multicast_published += len(packets) - failed
 
+        if failed:
+            log.error(responses.ERROR_MULTICAST_PUBLISH, failed, *self.publisher.address)
         else:
+            log.debug(responses.STATUS_MULTICAST_PUBLISHED, len(packets), *self.publisher.address)
+
+    def send_response(self, sc, packet, bounce_back_address, port):
+        """
+            Sends a response packet through the given socket, counting and timing the send.
+            A response the socket's send buffer has no room for is queued instead,
+            as is any response sent while earlier ones are still queued.
+        """
+        port_metrics = self.metrics.port(port)
+        start = time.perf_counter_ns()
+
+        if self.send_queues.get(sc):
+            self.queue_response(sc, packet, bounce_back_address, port)
+
+        else:
+            try:
+                sc.sendto(packet, bounce_back_address)
+                port_metrics.sent += 1
+                log.debug(responses.SUCCESS_RESPONSE_PACKET_SENT,
+                    bounce_back_address[0], bounce_back_address[1])
+
+            except BlockingIOError:
+                self.queue_response(sc, packet, bounce_back_address, port)
+
+            except OSError:
+                port_metrics.send_errors += 1
+                log.debug(responses.ERROR_SEND_FAILED,
+                    bounce_back_address[0], bounce_back_address[1])
+
+        self.metrics.send.record(time.perf_counter_ns() - start)
+
+    def queue_response(self, sc, packet, bounce_back_address, port):
+        """
+            Queues a response until its socket can send again, or drops it if the
+            socket already has SERVER_SEND_QUEUE_BYTES of responses queued.
+        """
+        port_metrics = self.metrics.port(port)
+        queued_bytes = self.send_queue_bytes.get(sc, 0)
+
+        if queued_bytes + len(packet) > cfg.SERVER_SEND_QUEUE_BYTES:
+            port_metrics.send_dropped += 1
+            log.debug(responses.ERROR_SEND_QUEUE_FULL,
+                bounce_back_address[0], bounce_back_address[1])
+            return
+
+        self.send_queues.setdefault(sc, collections.deque()).append((packet, bounce_back_address))
+        self.send_queue_bytes[sc] = queued_bytes + len(packet)
+        port_metrics.queued += 1
+
+    def flush_send_queue(self, sc, port):
+        """
+            Sends queued responses through a writable socket, oldest first, until
+            the queue is empty or the socket's send buffer is full again.
+        """
+        port_metrics = self.metrics.port(port)
+        queue = self.send_queues.get(sc)
+
+        while queue:
+            packet, bounce_back_address = queue[0]
+            try:
+                sc.sendto(packet, bounce_back_address)
+                port_metrics.sent += 1
+            except BlockingIOError:
+                return
+            except OSError:
+                port_metrics.send_errors += 1
+
+            queue.popleft()
+            self.send_queue_bytes[sc] -= len(packet)
+
+    def drain(self):
+        """
+            Sends the responses still queued once a successor has taken over,
+            giving up on any left after SERVER_HANDOFF_TIMEOUT seconds.
+        """
+        queued = sum(len(queue) for queue in self.send_queues.values())
+        if queued:
+            log.info(responses.STATUS_DRAINING, queued)
+
+        deadline = time.monotonic() + cfg.SERVER_HANDOFF_TIMEOUT
+        while time.monotonic() < deadline:
+            waiting = [sc for sc, queue in self.send_queues.items() if queue]
+            if not waiting:
+                break
+
+            incoming, outgoing, exceptions = select.select(
+                [], waiting, [], deadline - time.monotonic())
+            for sc in outgoing:
+                self.flush_send_queue(sc, self.dispatch[sc.fileno()].port)
+
+    def listen_for_handoff(self):
+        """
+            Called by the engine once it is serving. Tells the server whose
+            sockets were taken over, if any, that it may stop, then listens for
+            a successor on the handoff socket, if one is set.
+        """
+        if self.predecessor is None and self.handoff_path is None:
+            return
+
+        import handoff
+
+        if self.predecessor is not None:
+            try:
+                self.predecessor.sendall(handoff.READY)
+            except OSError:
+                pass
+            self.predecessor.close()
+            self.predecessor = None
+
+        if self.handoff_path is not None:
+            try:
+                self.handoff_listener = handoff.HandoffListener(self.handoff_path)
+                log.info(responses.STATUS_HANDOFF_LISTENING, self.handoff_path)
+
+            except OSError:
+                log.error(responses.ERROR_HANDOFF_LISTEN, self.handoff_path)
+
+    def hand_off(self):
+        """
+            Passes the bound sockets and the live subscriptions to a successor
+            connecting to the handoff socket, then waits until it serves from them.
+            Both servers read the same sockets until this one stops, so no
+            request is lost in between.
+            Returns true if the successor took over, false if this server must serve on.
+        """
+        import handoff
+
+        try:
+            connection = self.handoff_listener.accept(cfg.SERVER_HANDOFF_TIMEOUT)
+        except OSError:
             return False
 
+        ports = list(self.sockets_by_port)
+        streams = [port for port, scs in self.stream_sockets.items() for sc in scs]
+        descriptors = ([self.sockets_by_port[port].fileno() for port in ports] +
+                       [sc.fileno() for scs in self.stream_sockets.values() for sc in scs])
+        leases = self.subscriptions.leases()
+        log.info(responses.STATUS_HANDING_OFF, len(descriptors), len(leases))
+
+        try:
+            handoff.send_sockets(connection, descriptors,
+                {"ports": ports, "streams": streams, "subscriptions": leases})
+            ready = handoff.wait_until_ready(connection)
+
+        except OSError:
+            ready = False
+
+        finally:
+            connection.close()
+
+        if not ready:
+            log.error(responses.ERROR_HANDOFF_FAILED)
+            return False
+
+        log.info(responses.SUCCESS_HANDED_OFF)
+        self.handoff_listener.close(unlink=False)
+        self.handoff_listener = None
+        self.handed_off = True
+        return True
+
+    def close_handoff(self):
+        """
+            Stops listening for a successor.
+        """
+        if self.handoff_listener is not None:
+            self.handoff_listener.close()
+            self.handoff_listener = None
+
+    def handle_request(self, data, bounce_back_address, port):
+        """
+            Given a single received datagram, validate it and build the response.
+            Returns the response packet to send back, or None if nothing should be sent.
+            Shared by every server engine so they all behave identically.
+            Implausible packets, packets from sources over their rate limit and
+            stats requests from sources not in SERVER_STATS_ALLOWED are dropped
+            without a response, so the server cannot be used as a reflector.
+        """
+        log.debug(responses.SUCCESS_RECEIVED_INCOMING, data, port)
+        port_metrics = self.metrics.port(port)
+        port_metrics.received += 1
+
+        # Every datagram is recorded as it arrived, malformed ones included
+        if self.capture is not None:
+            self.capture.record(data, bounce_back_address, port)
+
+        # Drop packets that cannot be requests, and floods, before any other work
+        if not protocol.plausible_request(data):
+            port_metrics.dropped += 1
+            return None
+
+        if self.rate_limiter is not None and not self.rate_limiter.allow(bounce_back_address[0]):
+            port_metrics.rate_limited += 1
+            return None
+
+        if protocol.is_stats_request(data):
+            if self.stats_allowed is not None and bounce_back_address[0] not in self.stats_allowed:
+                port_metrics.dropped += 1
+                return None
+
+            port_metrics.valid += 1
+            return self.create_stats_response_packet()
+
+        start = time.perf_counter_ns()
+        error_code = self.validate_request(data, bounce_back_address)
+        validated = time.perf_counter_ns()
+        self.metrics.validate.record(validated - start)
+
+        if error_code != 0:
+            port_metrics.malformed[error_code] = port_metrics.malformed.get(error_code, 0) + 1
+            log.debug(responses.ERROR_MALFORMED_REQUEST,
+                bounce_back_address[0], bounce_back_address[1], data, error_code)
+            return None
+
+        port_metrics.valid += 1
+
+        # Form a response packet
+        if protocol.is_batch_request(data):
+            packet = self.create_batch_response_packet(data, port)
+        elif protocol.is_subscribe_request(data):
+            packet = self.create_subscribe_response_packet(data, bounce_back_address, port)
+        else:
+            packet = self.create_dt_response_packet(data, port)
+        self.metrics.build.record(time.perf_counter_ns() - validated)
+        if packet is not None:
+            log.debug(responses.SUCCESS_RESPONSE_PACKET_CREATED)
+
+        return packet
+
+    def validate_request(self, data, bounce_back_address):
+        """
+            Runs the given packet through the protocol's validity checks.
+            Returns 0 if every check is passed, otherwise the failed check's error code.
+        """
+        if protocol.is_batch_request(data):
+            error_code = protocol.validate_batch_request(data)
+        elif protocol.is_subscribe_request(data):
+            error_code = protocol.validate_subscribe_request(data)
+        else:
+            error_code = protocol.validate_request(data)
+
+            # A zoned request must name a zone the server knows
+            zone = protocol.request_zone(data) if error_code == 0 else None
+            if zone is not None and self.zones.find(zone) is None:
+                error_code = 6
+
+        if error_code == 0:
+            log.debug(responses.SUCCESS_REQUEST_VALID,
+                bounce_back_address[0], bounce_back_address[1], data)
+
+        return error_code
+
     # Creation functions -------------------------------------------------------
 
-    def create_udp_sockets(self):
+    def create_udp_sockets(self, reuse_port=False, inherited=None):
         """
-            Creates three udp sockets and binds them to the given port numbers.
+            Creates a udp socket for each language and binds it to the language's port.
+            With 'reuse_port' set, several processes may bind the same ports and
+            the kernel spreads incoming datagrams across them.
+            'inherited' maps ports to sockets already bound to them, which are
+            used in place of new ones.
+            Returns true if every socket was created and bound, false otherwise.
         """
+        inherited = dict(inherited or {})
+
         try:
-            print(responses.STATUS_CREATING_SOCKETS)
-            self.english_sc = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            self.maori_sc = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            self.german_sc = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            print(responses.SUCCESS_SOCKETS_CREATED)
-
-            print(responses.STATUS_BINDING_PORTS.format(
-                self.ports['English'], self.ports['Te reo Maori'], self.ports['German']))
-            self.english_sc.bind(('localhost', self.ports['English']))
-            self.maori_sc.bind(('localhost', self.ports['Te reo Maori']))
-            self.german_sc.bind(('localhost', self.ports['German']))
-            print(responses.SUCCESS_PORTS_BOUND)
+            log.info(responses.STATUS_CREATING_SOCKETS, len(self.languages))
+            self.sockets = [inherited.pop(language.port, None) or
+                            socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                            for language in self.languages]
+            log.info(responses.SUCCESS_SOCKETS_CREATED, len(self.sockets))
+
+            # Sockets inherited for ports that are no longer served are of no use
+            for sc in inherited.values():
+                sc.close()
+
+            self.reuse_port = reuse_port
+            for sc in self.sockets:
+                if reuse_port:
+                    sc.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+
+                # Larger kernel buffers absorb bursts, the kernel may cap the sizes asked for
+                if cfg.SERVER_SO_RCVBUF is not None:
+                    sc.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, cfg.SERVER_SO_RCVBUF)
+                if cfg.SERVER_SO_SNDBUF is not None:
+                    sc.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, cfg.SERVER_SO_SNDBUF)
+
+                # A full send buffer must never stall the loop, responses are queued instead
+                sc.setblocking(False)
+
+            log.info(responses.STATUS_SOCKET_BUFFERS,
+                self.sockets[0].getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF),
+                self.sockets[0].getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF))
+
+            log.info(responses.STATUS_BINDING_PORTS, ", ".join(
+                "{}: {}".format(language.name, language.port) for language in self.languages))
+            for sc, language in zip(self.sockets, self.languages):
+                if sc.getsockname()[1] != language.port:
+                    sc.bind(('localhost', language.port))
+                self.dispatch[sc.fileno()] = language
+                self.sockets_by_port[language.port] = sc
+            log.info(responses.SUCCESS_PORTS_BOUND, len(self.sockets))
+            return True
 
         except OSError:
-            print(responses.ERROR_PORT_FORBIDDEN)
+            log.error(responses.ERROR_PORT_FORBIDDEN)
 
         except:
-            print(responses.ERROR_SOCKET_BIND_CREATION)
+            log.error(responses.ERROR_SOCKET_BIND_CREATION)
 
-    def create_dt_response_packet(self, data, port):
+        return False
+
+    def take_over_sockets(self, path, streams=True):
         """
-            Create an appropriate date/time response packet.
-            Returns a valid response packet in the requested language.
+            Takes over the bound sockets of the server listening for a successor
+            on the handoff socket at 'path', along with its live subscriptions.
+            Ports it did not hand over are bound afresh, as are all of them if
+            no server is listening. Its stream listening sockets are only kept
+            with 'streams' set.
+            Returns true if every socket was taken over or bound, false otherwise.
         """
-        now = datetime.datetime.now()
-        textual_representation = ""
+        import handoff
 
-        # Magic number (2 bytes)
-        byte_1 = 0x49
-        byte_2 = 0x7E
+        log.info(responses.STATUS_TAKING_OVER, path)
+        try:
+            self.predecessor, sockets, state = handoff.request_sockets(
+                path, cfg.SERVER_HANDOFF_TIMEOUT)
 
-        # Packet type (2 bytes)
-        byte_3 = 0x00
-        byte_4 = 0x02
+        except (OSError, ValueError):
+            log.error(responses.ERROR_TAKEOVER_FAILED, path)
+            return self.create_udp_sockets()
 
-        # Language Code (2 bytes)
-        byte_5 = 0x00
-        byte_6 = 0x01  # Default to English.
+        inherited = dict(zip(state["ports"], sockets))
+        for port, sc in zip(state["streams"], sockets[len(state["ports"]):]):
+            if streams and port in self.languages_by_port:
+                self.stream_sockets.setdefault(port, []).append(sc)
+            else:
+                sc.close()
 
-        # English
-        if port == self.ports['English']:
+        for port, language_code, request_type, host, source_port, lease in state["subscriptions"]:
+            self.subscriptions.subscribe(
+                (port, language_code, request_type), (host, source_port), lease)
+        self.metrics.subscribers = self.subscriptions.count
 
-            # Date request
-            if ((data[4] << 8) | data[5]) == 0x0001:
-                textual_representation = "Today’s date is {} {:0>2}, {:0>4}".format(
-                    now.strftime("%B"), now.day, now.year)
+        log.info(responses.SUCCESS_TAKEN_OVER, len(sockets), self.subscriptions.count)
+        return self.create_udp_sockets(inherited=inherited)
 
-            # Time request
-            elif ((data[4] << 8) | data[5]) == 0x0002:
-                textual_representation = "The current time is {:0>2}:{:0>2}".format(
-                    now.hour, now.minute)
+    def create_multicast_publisher(self, group, port, interval=None):
+        """
+            Starts publishing every response packet to the given multicast group
+            and port, at the start of every minute or every 'interval' seconds,
+            and publishes the current packets straight away.
+            Returns true if the publishing socket was created, false otherwise.
+        """
+        from multicast import MulticastPublisher
 
-        # Te reo Maori
-        elif port == self.ports['Te reo Maori']:
-            byte_6 = 0x02
+        try:
+            self.publisher = MulticastPublisher(group, port, interval)
 
-            # Date request
-            if ((data[4] << 8) | data[5]) == 0x0001:
-                textual_representation = "Ko te ra o tenei ra ko {} {:0>2}, {:0>4}".format(
-                    cfg.MONTHS_MAORI[now.month-1], now.day, now.year)
+        except OSError:
+            log.error(responses.ERROR_MULTICAST_SOCKET, group, port)
+            return False
 
-            # Time request
-            elif ((data[4] << 8) | data[5]) == 0x0002:
-                textual_representation = "Ko te wa o tenei wa {:0>2}:{:0>2}".format(
-                    now.hour, now.minute)
+        log.info(responses.STATUS_MULTICAST_PUBLISHING, group, port,
+            "every {} seconds".format(interval) if interval else "every minute")
+        self.publish_updates()
+        return True
 
-        # German
-        elif port == self.ports['German']:
-            byte_6 = 0x03
+    def create_capture(self, path):
+        """
+            Starts recording every incoming datagram to a capture file at the given path.
+            Returns true if the file was opened, false otherwise.
+        """
+        from capture import CaptureWriter
 
-            # Date request
-            if ((data[4] << 8) | data[5]) == 0x0001:
-                textual_representation = "Heute ist der {:0>2}. {} {:0>4}".format(
-                    now.day, cfg.MONTHS_GERMAN[now.month-1], now.year)
+        try:
+            self.capture = CaptureWriter(path)
 
-            # Time request
-            elif ((data[4] << 8) | data[5]) == 0x0002:
-                textual_representation = "Die Uhrzeit ist {:0>2}:{:0>2}".format(
-                    now.hour, now.minute)
+        except OSError:
+            log.error(responses.ERROR_CAPTURE_FILE, path)
+            return False
 
-        # Year (2 bytes)
-        byte_7 = (now.year >> 8) & 0xFF
-        byte_8 = now.year & 0xFF
+        log.info(responses.STATUS_CAPTURING, path)
+        return True
 
-        # Month (1 byte)
-        byte_9 = now.month & 0xFF
+    def close_capture(self):
+        """
+            Stops recording, writing out any datagrams still buffered.
+        """
+        if self.capture is not None:
+            self.capture.close()
+            log.info(responses.STATUS_CAPTURE_CLOSED, self.capture.recorded, self.capture.path)
+            self.capture = None
 
-        # Day (1 byte)
-        byte_10 = now.day & 0xFF
+    def create_dt_response_packet(self, data, port):
+        """
+            Create an appropriate date/time response packet.
+            Returns a valid response packet in the requested language.
+            Packets come from the response cache, which only rebuilds them once a minute.
+            An extended request names its language, otherwise the port's language is used.
+            A zoned request is answered with the time in its zone, otherwise the server's.
+        """
+        request_type, language_code, sequence = protocol.unpack_request(data)
+
+        if language_code is None:
+            language_code = self.languages_by_port[port].code
+
+        zone = protocol.request_zone(data)
+        if zone is not None:
+            zone = self.zones.find(zone)
 
-        # Hour (1 byte)
-        byte_11 = now.hour & 0xFF
+        packet = self.response_cache.get(language_code, request_type, zone)
 
-        # Minute (1 byte)
-        byte_12 = now.minute & 0xFF
+        # Sequenced requests have their sequence number echoed back
+        if packet is not None and sequence is not None:
+            packet = protocol.append_sequence(packet, sequence)
 
-        # Length (1 byte)
-        text_in_bytes = textual_representation.encode()
-        byte_13 = len(text_in_bytes) & 0xFF
+        return packet
 
-        if len(text_in_bytes) > 0xFF:
-            print(responses.ERROR_TEXT_PAYLOAD_OVERFLOW)
+    def create_batch_response_packet(self, data, port):
+        """
+            Create a batch response packet answering every item of a batch request.
+            The records are the cached response packets, joined in item order.
+            Returns None if any item cannot be answered.
+        """
+        sequence, items = protocol.unpack_batch_request(data)
+        port_language_code = self.languages_by_port[port].code
+
+        records = []
+        for request_type, language_code in items:
+            packet = self.response_cache.get(language_code or port_language_code, request_type)
+            if packet is None:
+                return None
+            records.append(packet)
+
+        return protocol.pack_batch_response(sequence, records)
+
+    def create_subscribe_response_packet(self, data, bounce_back_address, port):
+        """
+            Adds, renews or cancels the sender's subscription.
+            A new or renewed subscriber is answered with the current response
+            packet straight away, and later ones at the start of every minute.
+            Returns None for a cancellation or a refused subscription.
+        """
+        request_type, language_code, lease = protocol.unpack_subscribe_request(data)
+
+        if language_code is None:
+            language_code = self.languages_by_port[port].code
+
+        key = (port, language_code, request_type)
+        if not self.subscriptions.subscribe(key, bounce_back_address, lease):
+            self.metrics.subscriptions_refused += 1
+            log.debug(responses.ERROR_SUBSCRIPTION_REFUSED,
+                bounce_back_address[0], bounce_back_address[1])
             return None
 
-        dt_res_packet = bytearray([byte_1, byte_2, byte_3, byte_4, byte_5,
-                                   byte_6, byte_7, byte_8, byte_9, byte_10,
-                                   byte_11, byte_12, byte_13])
+        self.metrics.subscribers = self.subscriptions.count
+        if lease == 0:
+            return None
 
-        # Text
-        for byte in text_in_bytes:
-            dt_res_packet.append(byte)
+        return self.response_cache.get(language_code, request_type)
 
-        return dt_res_packet
+    def create_stats_response_packet(self):
+        """
+            Create a stats response packet holding a JSON snapshot of the server's metrics.
+            The kernel's receive drop counts are read afresh for every snapshot.
+        """
+        import json
+
+        inodes = {os.fstat(sc.fileno()).st_ino: port for port, sc in self.sockets_by_port.items()}
+        for inode, drops in udp_socket_drops(inodes).items():
+            self.metrics.port(inodes[inode]).kernel_drops = drops
+
+        body = json.dumps(self.metrics.snapshot(), separators=(",", ":")).encode()
+        return protocol.pack_stats_response(body)
+
+    def build_dt_response_packet(self, language_code, request_type, now):
+        """
+            Build a date/time response packet for a language, request type and time.
+            Returns the packet as immutable bytes, or None if the text is too long.
+        """
+        language = self.languages_by_code[language_code]
+        textual_representation = language.text(request_type, now)
+
+        packet = protocol.pack_response(
+            language_code, now, textual_representation.encode())
+
+        if packet is None:
+            log.error(responses.ERROR_TEXT_PAYLOAD_OVERFLOW)
+
+        return packet
 
 
 # End of class =================================================================
@@ -254,15 +778,27 @@ class Server:
 def read_from_terminal():
     """
         Reads input from the terminal. Returns an array of the format:
-            [0] -> port number 1    (English)
-            [1] -> port number 2    (Te reo Maori)
-            [2] -> port number 3    (German)
+            [0]     -> port number 1    (English)
+            [1]     -> port number 2    (Te reo Maori)
+            [2]     -> port number 3    (German)
+            ...     -> one port number per further language, in registry order
+            [-1]    -> server engine    (optional, 'select' or 'asyncio')
     """
     raw_input = input("> ")
     input_array = raw_input.strip().split()
     return input_array
 
 
+def split_input(input_array):
+    """
+        Splits the terminal input into its port numbers and the optional engine.
+        Returns a (ports, engine) tuple, with the default engine if none was given.
+    """
+    if input_array and input_array[-1] in cfg.SERVER_ENGINES:
+        return input_array[:-1], input_array[-1]
+    return input_array, cfg.SERVER_ENGINE
+
+
 def valid_port(input_array):
     """
         Checks the command line arguments are:
@@ -271,6 +807,7 @@ def valid_port(input_array):
         Returns true if the test is passed, false otherwise.
     """
     port_array = []
+    given_ports = ", ".join(input_array)
 
     try:
         for port in input_array:
@@ -278,22 +815,18 @@ def valid_port(input_array):
                 port_array.append(int(port))
 
             elif not (1024 < int(port) < 64000):
-                print(responses.ERROR_SERVER_INVALID_PORT_NUMBER.format(
-                    input_array[0], input_array[1], input_array[2]))
+                print(responses.ERROR_SERVER_INVALID_PORT_NUMBER.format(given_ports))
                 return False
 
             elif int(port) in port_array:
-                print(responses.ERROR_DUPLICATE_PORT_NUMBER.format(
-                    input_array[0], input_array[1], input_array[2]))
+                print(responses.ERROR_DUPLICATE_PORT_NUMBER.format(given_ports))
                 return False
 
     except:
-        print(responses.ERROR_SERVER_INVALID_PORT_NUMBER.format(
-            input_array[0], input_array[1], input_array[2]))
+        print(responses.ERROR_SERVER_INVALID_PORT_NUMBER.format(given_ports))
         return False
 
-    if len(port_array) == 3:
-        return True
+    return len(port_array) == len(input_array)
 
 
 def check_input(input_array):
@@ -301,48 +834,225 @@ def check_input(input_array):
         This is the parent function that calls specific checking functions.
         Returns true if all tests are passed, false otherwise.
     """
-    if len(input_array) != 3:
-        print(responses.ERROR_INVALID_INPUT)
+    ports, engine = split_input(input_array)
+
+    # A trailing word that is not a port number is taken as a mistyped engine
+    if len(ports) > 1 and not ports[-1].isdigit():
+        print(responses.ERROR_INVALID_ENGINE.format(ports[-1], cfg.SERVER_ENGINES))
         return False
 
-    if not valid_port(input_array):
+    if not (1 <= len(ports) <= len(LANGUAGES)):
+        print(responses.ERROR_SERVER_INVALID_INPUT.format(len(LANGUAGES)))
+        return False
+
+    if not valid_port(ports):
         return False
 
     return True
 
 
-def start_server(input_array):
+def valid_languages(served_languages, ports):
+    """
+        Checks the languages to serve are registered languages, given once each
+        and one per port. Returns true if the test is passed, false otherwise.
+    """
+    found = [languages.find(language) for language in served_languages]
+    given_languages = ", ".join(str(language) for language in served_languages)
+
+    if (None in found or len({entry["code"] for entry in found}) != len(found)
+            or len(found) != len(ports)):
+        print(responses.ERROR_SERVER_INVALID_LANGUAGES.format(given_languages, len(ports)))
+        return False
+
+    return True
+
+
+def serve(server, engine=cfg.SERVER_ENGINE):
+    """
+        Serves requests on a server whose sockets are already bound, using the
+        given engine, until interrupted or until a successor has taken over.
+    """
+    if engine == "asyncio":
+        import async_engine
+        async_engine.run(server)
+
+    else:
+        server.listen_for_handoff()
+        while not server.handed_off:
+            server.begin_listening()
+        server.drain()
+
+
+def start_server(input_array, engine=cfg.SERVER_ENGINE,
+                 recv_batch_size=cfg.SERVER_RECV_BATCH_SIZE, workers=cfg.SERVER_WORKERS,
+                 takeover=False):
     """
         Instantiates a server object and instructs it to create and listen
-        to three sockets for incoming packets.
+        to one socket per given port, the Nth port serving the Nth registered language,
+        or the Nth of SERVER_LANGUAGES when it is set.
+        The engine is either 'select' (the blocking select loop) or 'asyncio'.
+        A receive batch size of 1 makes the select engine handle one datagram per wakeup.
+        With more than one worker, a supervisor forks that many server processes
+        which all bind the same ports using SO_REUSEPORT.
+        With SERVER_MULTICAST_GROUP set, every response is also published to that group.
+        With SERVER_CAPTURE_FILE set, every incoming datagram is recorded to that file.
+        With SERVER_TIMEZONES set, requests may only ask for the time in those zones.
+        With SERVER_HANDOFF_SOCKET set, a single-process server passes its bound
+        sockets to a successor started with 'takeover' set, then drains and exits.
+        Exits with status 1 if the ports cannot be bound.
     """
-    print(responses.STATUS_SERVER_STARTING)
+    log.configure()
+    log.info(responses.STATUS_SERVER_STARTING)
+    log.info(responses.STATUS_SERVER_ENGINE, engine)
 
-    # Instantiate a new server object which listens to the provided ports
-    server = Server(input_array[0], input_array[1], input_array[2])
+    if workers > 1:
+        if cfg.SERVER_HANDOFF_SOCKET is not None:
+            log.error(responses.ERROR_HANDOFF_WORKERS, workers)
+
+        import workers as worker_pool
+        worker_pool.supervise(input_array, engine, recv_batch_size, workers)
+        return
 
-    # Create 3 UDP sockets
-    server.create_udp_sockets()
+    # Instantiate a new server object which listens to the provided ports
+    server = Server(*input_array, recv_batch_size=recv_batch_size,
+                    served_languages=cfg.SERVER_LANGUAGES)
+
+    # Load the zones requests may ask for, or list every zone if none are configured
+    unknown_zones = server.zones.preload()
+    if unknown_zones:
+        log.error(responses.ERROR_UNKNOWN_ZONES, ", ".join(unknown_zones))
+
+    # Create a UDP socket per language, or take them over from a running server
+    if takeover:
+        bound = server.take_over_sockets(
+            cfg.SERVER_HANDOFF_SOCKET, streams=engine == "asyncio" and cfg.SERVER_STREAM_TRANSPORT)
+    else:
+        bound = server.create_udp_sockets()
+
+    # A server that could not bind its ports exits, so a supervisor sees the failure
+    if not bound:
+        for sc in server.sockets:
+            sc.close()
+        sys.exit(1)
+    server.handoff_path = cfg.SERVER_HANDOFF_SOCKET
+
+    # Publish every response to a multicast group, if one is configured
+    if cfg.SERVER_MULTICAST_GROUP is not None:
+        server.create_multicast_publisher(
+            cfg.SERVER_MULTICAST_GROUP, cfg.SERVER_MULTICAST_PORT, cfg.SERVER_MULTICAST_INTERVAL)
+
+    # Record incoming datagrams, if a capture file is configured. A server that
+    # took over from another records to its own file, as the other is still recording
+    if cfg.SERVER_CAPTURE_FILE is not None:
+        if server.predecessor is not None:
+            server.create_capture("{}.{}".format(cfg.SERVER_CAPTURE_FILE, os.getpid()))
+        else:
+            server.create_capture(cfg.SERVER_CAPTURE_FILE)
 
     # Begin listening for packets
-    while 1:
-        server.begin_listening()
+    try:
+        serve(server, engine)
+    finally:
+        server.close_handoff()
+        server.close_capture()
 
-    print(responses.STATUS_CLOSING_SOCKETS)
-    server.english_sc.close()
-    server.maori_sc.close()
-    server.german_sc.close()
-    print(responses.STATUS_SERVER_SHUTDOWN)
+    log.info(responses.STATUS_CLOSING_SOCKETS)
+    for sc in server.sockets:
+        sc.close()
+    log.info(responses.STATUS_SERVER_SHUTDOWN)
+
+
+def parse_arguments(argv):
+    """
+        Parses the server's command line arguments. Each option overrides the
+        config value named in its help, as does each value in a config file.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Date/time server.")
+    parser.add_argument("ports", type=int, nargs="*",
+                        help="one port per language, the Nth port serving the Nth language "
+                             "(SERVER_PORTS), asked for at a prompt if not given")
+    parser.add_argument("--config", help="JSON file of config values to override")
+    parser.add_argument("--languages",
+                        help="comma separated languages served by the ports, in order, "
+                             "e.g. 'en,de,fr' (SERVER_LANGUAGES)")
+    parser.add_argument("--timezones",
+                        help="comma separated zone identifiers requests may ask for, "
+                             "e.g. 'UTC,Europe/Berlin' (SERVER_TIMEZONES)")
+    parser.add_argument("--engine", choices=cfg.SERVER_ENGINES, help="SERVER_ENGINE")
+    parser.add_argument("--workers", type=int, help="SERVER_WORKERS")
+    parser.add_argument("--recv-batch-size", type=int, help="SERVER_RECV_BATCH_SIZE")
+    parser.add_argument("--rcvbuf", type=int, help="SERVER_SO_RCVBUF")
+    parser.add_argument("--sndbuf", type=int, help="SERVER_SO_SNDBUF")
+    parser.add_argument("--handoff-socket", help="SERVER_HANDOFF_SOCKET")
+    parser.add_argument("--takeover", action="store_true",
+                        help="take the bound sockets over from the server listening on the "
+                             "handoff socket, which then drains and exits")
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="LOG_LEVEL")
+    return parser.parse_args(argv)
+
+
+def configure(args):
+    """
+        Applies the config file, then the command line options, over the
+        values of constants/config.py.
+        Returns true if they were applied, false if either was invalid.
+    """
+    try:
+        if args.config is not None:
+            settings.apply_config_file(args.config)
+
+    except (OSError, ValueError):
+        print(responses.ERROR_CONFIG_FILE.format(args.config))
+        return False
+
+    settings.apply(settings.flag_overrides(args, {
+        "engine": "SERVER_ENGINE", "workers": "SERVER_WORKERS",
+        "recv_batch_size": "SERVER_RECV_BATCH_SIZE", "rcvbuf": "SERVER_SO_RCVBUF",
+        "sndbuf": "SERVER_SO_SNDBUF", "handoff_socket": "SERVER_HANDOFF_SOCKET",
+        "log_level": "LOG_LEVEL"}))
+    if args.ports:
+        cfg.SERVER_PORTS = args.ports
+    if args.languages is not None:
+        cfg.SERVER_LANGUAGES = args.languages.split(",")
+    if args.timezones is not None:
+        cfg.SERVER_TIMEZONES = args.timezones.split(",")
+
+    if args.takeover and cfg.SERVER_HANDOFF_SOCKET is None:
+        print(responses.ERROR_TAKEOVER_SOCKET)
+        return False
+
+    return True
 
 
 # RUNTIME
 if __name__ == '__main__':
 
-    valid_input = False
-    while not valid_input:
-        print(responses.INFO_PORT_NUMBERS)
-        input_array = read_from_terminal()
-        valid_input = check_input(input_array)
+    args = parse_arguments(sys.argv[1:])
+    if not configure(args):
+        sys.exit(2)
+
+    # Ports come from the command line or config file, or are asked for
+    engine = cfg.SERVER_ENGINE
+    if cfg.SERVER_PORTS is not None:
+        ports = [str(port) for port in cfg.SERVER_PORTS]
+        if not check_input(ports):
+            sys.exit(2)
+
+    else:
+        valid_input = False
+        while not valid_input:
+            print(responses.INFO_PORT_NUMBERS.format(
+                len(LANGUAGES), " ".join("({})".format(entry["name"]) for entry in LANGUAGES)))
+            input_array = read_from_terminal()
+            valid_input = check_input(input_array)
+
+        ports, engine = split_input(input_array)
+
+    if cfg.SERVER_LANGUAGES is not None and not valid_languages(cfg.SERVER_LANGUAGES, ports):
+        sys.exit(2)
 
     print(responses.SUCCESS_VALID_INPUT)
-    start_server(input_array)
+    start_server(ports, engine, cfg.SERVER_RECV_BATCH_SIZE, cfg.SERVER_WORKERS, args.takeover)
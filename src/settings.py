@@ -0,0 +1,101 @@
+# IMPORTS
+import constants.config as cfg
+
+
+# Types of the config values that may be None, as their defaults do not tell.
+# A (list, type) pair is a list of values of that type.
+OPTIONAL_TYPES = {
+    "SERVER_PORTS": (list, int), "SERVER_LANGUAGES": (list, str),
+    "SERVER_TIMEZONES": (list, str), "SERVER_STATS_ALLOWED": (list, str),
+    "SERVER_SO_RCVBUF": int, "SERVER_SO_SNDBUF": int,
+    "SERVER_MULTICAST_GROUP": str, "SERVER_MULTICAST_INTERVAL": float,
+    "SERVER_RATE_LIMIT": float, "SERVER_CAPTURE_FILE": str,
+    "SERVER_HANDOFF_SOCKET": str, "CONFIG_CACHE_FILE": str, "CONFIG_TIMEZONE": str,
+}
+
+# Durations in seconds, which may be fractional although their defaults are whole
+SECONDS = {"SERVER_WORKER_RESTART_DELAY", "SERVER_WORKER_SHUTDOWN_WAITTIME",
+           "SERVER_STREAM_IDLE_TIMEOUT", "SERVER_HANDOFF_TIMEOUT",
+           "CONFIG_RESPONSE_WAITTIME", "CONFIG_RTO_MAX"}
+
+LOG_LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR"]
+
+
+def choices(name):
+    """
+        Returns the values a config value is limited to, or None if it is not.
+    """
+    return {"SERVER_ENGINE": cfg.SERVER_ENGINES, "CONFIG_TRANSPORT": cfg.CONFIG_TRANSPORTS,
+            "LOG_LEVEL": LOG_LEVELS}.get(name)
+
+
+def is_type(value, expected):
+    """
+        Returns true if 'value' is of the expected type, where a float may be
+        given as an int and a bool is not taken for a number.
+    """
+    if isinstance(expected, tuple):
+        container, item = expected
+        return isinstance(value, container) and all(is_type(entry, item) for entry in value)
+    if expected in (int, float):
+        return isinstance(value, (int, float) if expected is float else int) and not isinstance(value, bool)
+    return isinstance(value, expected)
+
+
+def valid_value(name, value):
+    """
+        Returns true if 'value' may be given to the config value 'name': one of
+        its choices if it has any, or else of the type of its default.
+    """
+    allowed = choices(name)
+    if allowed is not None:
+        return value in allowed
+
+    if name in OPTIONAL_TYPES:
+        return value is None or is_type(value, OPTIONAL_TYPES[name])
+    return is_type(value, float if name in SECONDS else type(getattr(cfg, name)))
+
+
+def apply(overrides):
+    """
+        Overrides values of constants/config.py, given as a dictionary mapping
+        names such as "SERVER_ENGINE" to values. Overrides must be applied
+        before the server or client is started.
+        Raises ValueError for a name that is not a config value, or a value
+        that is not valid for it, in which case no value is overridden.
+    """
+    for name, value in overrides.items():
+        if not name.isupper() or not hasattr(cfg, name) or not valid_value(name, value):
+            raise ValueError(name)
+
+    for name, value in overrides.items():
+        setattr(cfg, name, value)
+
+
+def apply_config_file(path):
+    """
+        Overrides values of constants/config.py with those in a JSON config file,
+        an object mapping config names to values, e.g.:
+            {"SERVER_PORTS": [3333, 4444, 5555], "SERVER_ENGINE": "asyncio"}
+        Raises OSError if the file cannot be read, or ValueError if it is not
+        such an object or holds an unknown name or invalid value.
+    """
+    import json
+
+    with open(path) as config_file:
+        overrides = json.load(config_file)
+
+    if not isinstance(overrides, dict):
+        raise ValueError(path)
+
+    apply(overrides)
+
+
+def flag_overrides(args, names):
+    """
+        Returns the overrides given by parsed command line arguments, as a
+        dictionary. 'names' maps each argument's destination to the config
+        name it overrides, and arguments that were not given are left out.
+    """
+    return {name: getattr(args, dest) for dest, name in names.items()
+            if getattr(args, dest) is not None}
@@ -0,0 +1,80 @@
+# IMPORTS
+from utils import *
+import protocol
+
+
+# Start of class ---------------------------------------------------------------
+class StreamConnection:
+    """
+        A long-lived TCP connection to a server port, carrying the same packets
+        as the datagram transport as length-prefixed frames.
+        Responses come back in the order the requests were sent.
+    """
+
+    def __init__(self, address, timeout):
+        """
+            Connects to the given (host, port) address. Reads wait at most
+            'timeout' seconds for the server.
+        """
+        self.address = address
+        self.sc = socket.create_connection(address, timeout)
+        self.sc.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.buffer = bytearray()
+
+    def send(self, *packets):
+        """
+            Sends one or more packets in a single write.
+        """
+        self.sc.sendall(b"".join(protocol.pack_frame(packet) for packet in packets))
+
+    def receive(self):
+        """
+            Returns the next packet sent by the server.
+            Raises socket.timeout if none arrives in time, or ConnectionError if
+            the server has closed the connection.
+        """
+        while True:
+            length = protocol.frame_length(self.buffer)
+            if length is not None and len(self.buffer) >= protocol.FRAME_HEADER.size + length:
+                end = protocol.FRAME_HEADER.size + length
+                packet = bytes(self.buffer[protocol.FRAME_HEADER.size:end])
+                del self.buffer[:end]
+                return packet
+
+            data = self.sc.recv(65536)
+            if not data:
+                raise ConnectionResetError(self.address)
+            self.buffer += data
+
+    def close(self):
+        """
+            Closes the connection.
+        """
+        self.sc.close()
+
+
+# End of class =================================================================
+
+
+_connections = {}
+
+
+def connection_for(address, timeout):
+    """
+        Returns the open connection to the given address, shared by every client
+        in the process, connecting first if there is none.
+    """
+    connection = _connections.get(address)
+    if connection is None:
+        connection = _connections[address] = StreamConnection(address, timeout)
+    return connection
+
+
+def discard(address):
+    """
+        Closes and forgets the shared connection to the given address, e.g. after
+        a timeout has left a response unread on it.
+    """
+    connection = _connections.pop(address, None)
+    if connection is not None:
+        connection.close()
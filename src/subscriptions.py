@@ -0,0 +1,96 @@
+# IMPORTS
+import time
+import constants.config as cfg
+
+
+# Start of class ---------------------------------------------------------------
+class SubscriptionTable:
+    """
+        The live subscribers of a server. Subscribers are grouped by the
+        (port, language code, request type) they asked for, so that each
+        group is sent one prebuilt packet at the start of every minute.
+        Every subscription holds a lease that expires unless renewed, and the
+        number of subscriptions is capped.
+    """
+
+    def __init__(self, capacity=cfg.SERVER_MAX_SUBSCRIBERS, max_lease=cfg.SERVER_MAX_LEASE,
+                 monotonic=time.monotonic):
+        """
+            Initialise an empty table holding up to 'capacity' subscriptions,
+            with leases of at most 'max_lease' seconds.
+        """
+        self.capacity = capacity
+        self.max_lease = max_lease
+        self.monotonic = monotonic
+        self.groups = {}    # (port, language code, request type) -> {address: lease expiry}
+        self.count = 0
+
+    def subscribe(self, key, address, lease):
+        """
+            Adds or renews the subscription of an address to a group for 'lease'
+            seconds, or cancels it if the lease is 0.
+            Returns false if the subscription was refused because the table is full.
+        """
+        if lease == 0:
+            self.unsubscribe(key, address)
+            return True
+
+        group = self.groups.get(key)
+        if group is None or address not in group:
+
+            # Make room by dropping expired subscriptions before refusing a new one
+            if self.count >= self.capacity:
+                self.expire()
+                if self.count >= self.capacity:
+                    return False
+
+            if group is None:
+                group = self.groups[key] = {}
+            self.count += 1
+
+        group[address] = self.monotonic() + min(lease, self.max_lease)
+        return True
+
+    def unsubscribe(self, key, address):
+        """
+            Cancels the subscription of an address to a group, if it has one.
+        """
+        group = self.groups.get(key)
+        if group is not None and group.pop(address, None) is not None:
+            self.count -= 1
+            if not group:
+                del self.groups[key]
+
+    def expire(self):
+        """
+            Drops every subscription whose lease has run out.
+        """
+        now = self.monotonic()
+        for key in list(self.groups):
+            group = self.groups[key]
+            expired = [address for address, expiry in group.items() if expiry <= now]
+            for address in expired:
+                del group[address]
+            self.count -= len(expired)
+            if not group:
+                del self.groups[key]
+
+    def leases(self):
+        """
+            Returns every live subscription as a [port, language code, request type,
+            host, port, seconds left] list, e.g. for a successor to take over.
+        """
+        now = self.monotonic()
+        return [[*key, address[0], address[1], expiry - now]
+                for key, group in self.groups.items()
+                for address, expiry in group.items() if expiry > now]
+
+    def live(self):
+        """
+            Drops expired subscriptions, then returns the (key, addresses) of every group.
+        """
+        self.expire()
+        return list(self.groups.items())
+
+
+# End of class =================================================================
@@ -1,4 +1,5 @@
 import socket
+import languages
 import constants.config as cfg
 
 
@@ -20,4 +21,9 @@ def valid_port(input_array):
     try:
         return 1024 < int(input_array[2]) < 64000
     except:
-        return False
\ No newline at end of file
+        return False
+
+
+def valid_language(input_array):
+    """ """
+    return languages.find(input_array[3]) is not None
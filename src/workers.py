@@ -0,0 +1,114 @@
+# IMPORTS
+import os
+import time
+import signal
+import multiprocessing
+import multiprocessing.connection
+import constants.config as cfg
+import constants.responses as responses
+import log
+
+
+def run_worker(input_array, engine, recv_batch_size, publish=False):
+    """
+        Worker process entry point. Binds the language ports with SO_REUSEPORT
+        and serves requests until terminated by the supervisor.
+        Only the worker with 'publish' set publishes to the multicast group, if
+        one is configured, so that listeners receive each packet once.
+        Each worker records to its own capture file, named after its process ID.
+    """
+    # Interrupts are handled by the supervisor, which stops every worker
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    # The supervisor's background log writer thread does not survive the fork
+    log.configure()
+
+    import server as server_module
+    server = server_module.Server(*input_array, recv_batch_size=recv_batch_size,
+                                  served_languages=cfg.SERVER_LANGUAGES)
+
+    # Only the first worker reports zones that could not be loaded, as each loads the same ones
+    unknown_zones = server.zones.preload()
+    if unknown_zones and publish:
+        log.error(responses.ERROR_UNKNOWN_ZONES, ", ".join(unknown_zones))
+
+    if not server.create_udp_sockets(reuse_port=True):
+        os._exit(1)
+
+    if publish and cfg.SERVER_MULTICAST_GROUP is not None:
+        server.create_multicast_publisher(
+            cfg.SERVER_MULTICAST_GROUP, cfg.SERVER_MULTICAST_PORT, cfg.SERVER_MULTICAST_INTERVAL)
+
+    if cfg.SERVER_CAPTURE_FILE is not None:
+        server.create_capture("{}.{}".format(cfg.SERVER_CAPTURE_FILE, os.getpid()))
+
+    server_module.serve(server, engine)
+
+
+def start_worker(index, input_array, engine, recv_batch_size):
+    """
+        Starts a single worker process and returns it.
+    """
+    process = multiprocessing.Process(
+        target=run_worker, args=(input_array, engine, recv_batch_size, index == 0),
+        name="server-worker-{}".format(index), daemon=True)
+    process.start()
+    log.info(responses.STATUS_WORKER_STARTED, index, process.pid)
+    return process
+
+
+def stop_workers(processes):
+    """
+        Asks every worker to exit, then kills any that have not done so in time.
+    """
+    log.info(responses.STATUS_STOPPING_WORKERS)
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+
+    deadline = time.monotonic() + cfg.SERVER_WORKER_SHUTDOWN_WAITTIME
+    for process in processes:
+        process.join(max(0, deadline - time.monotonic()))
+        if process.is_alive():
+            process.kill()
+            process.join()
+
+
+def supervise(input_array, engine, recv_batch_size, worker_count):
+    """
+        Runs 'worker_count' server processes sharing the language ports and
+        restarts any that exit, until the supervisor is interrupted or terminated.
+    """
+    log.info(responses.STATUS_STARTING_WORKERS, worker_count)
+    stopping = []
+
+    def request_stop(signum, frame):
+        stopping.append(signum)
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    processes = [start_worker(index, input_array, engine, recv_batch_size)
+                 for index in range(worker_count)]
+
+    try:
+        while not stopping:
+            # Wake periodically so that a stop request is noticed promptly
+            exited = multiprocessing.connection.wait(
+                [process.sentinel for process in processes], timeout=0.5)
+            if stopping:
+                break
+
+            for index, process in enumerate(processes):
+                if process.sentinel in exited:
+                    process.join()
+                    log.info(responses.STATUS_WORKER_EXITED,
+                        index, process.pid, process.exitcode)
+                    time.sleep(cfg.SERVER_WORKER_RESTART_DELAY)
+                    processes[index] = start_worker(
+                        index, input_array, engine, recv_batch_size)
+
+    finally:
+        stop_workers(processes)
+        log.info(responses.STATUS_SERVER_SHUTDOWN)
@@ -0,0 +1,149 @@
+# IMPORTS
+import time
+import datetime
+
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+# Transitions are searched for a day at a time, up to a year ahead
+SEARCH_STEP = 86400
+SEARCH_STEPS = 366
+
+
+# Start of class ---------------------------------------------------------------
+class ZoneTable:
+    """
+        The UTC offset of a single zone, precomputed together with the time it
+        holds until, i.e. the zone's next DST or other offset transition.
+        The offset is only looked up again once that transition is crossed,
+        so requests for the zone never reach zoneinfo in between.
+    """
+
+    def __init__(self, name, zone):
+        """
+            Initialise a table for the named zoneinfo zone, holding its current offset.
+        """
+        self.name = name
+        self.zone = zone
+        self.offset = 0
+        self.valid_from = 0
+        self.valid_until = 0
+        self.minute_index = None
+        self.now = None
+        self.refresh(int(time.time()))
+
+    def offset_for(self, timestamp):
+        """
+            Looks up the zone's UTC offset, in seconds, at a timestamp.
+        """
+        return int(datetime.datetime.fromtimestamp(timestamp, self.zone).utcoffset().total_seconds())
+
+    def refresh(self, timestamp):
+        """
+            Looks up the offset at a timestamp and the time of the next transition.
+        """
+        self.offset = self.offset_for(timestamp)
+        self.valid_from = timestamp
+        self.valid_until = self.next_transition(timestamp)
+
+    def next_transition(self, timestamp):
+        """
+            Returns the first timestamp after the given one at which the offset
+            changes, to the second. A zone without a transition in the next year
+            is looked at again after that year. Two transitions within a single
+            day, which no zone has, would go unnoticed.
+        """
+        start = timestamp
+        for _ in range(SEARCH_STEPS):
+            end = start + SEARCH_STEP
+            if self.offset_for(end) != self.offset:
+
+                # The offset changes within the day, narrow it down to the second
+                while end - start > 1:
+                    middle = (start + end) // 2
+                    if self.offset_for(middle) == self.offset:
+                        start = middle
+                    else:
+                        end = middle
+                return end
+
+            start = end
+
+        return start
+
+    def offset_at(self, timestamp):
+        """
+            Returns the zone's UTC offset, in seconds, at a timestamp.
+        """
+        if not self.valid_from <= timestamp < self.valid_until:
+            self.refresh(timestamp)
+        return self.offset
+
+    def local_time(self, clock):
+        """
+            Returns the wall time in the zone at the current minute of a clock,
+            as a datetime, which is computed once per minute.
+        """
+        if clock.minute_index != self.minute_index:
+            timestamp = clock.minute_index * 60
+            self.now = EPOCH + datetime.timedelta(seconds=timestamp + self.offset_at(timestamp))
+            self.minute_index = clock.minute_index
+        return self.now
+
+
+class ZoneRegistry:
+    """
+        The zones requests may name, either the given zone identifiers or every
+        zone the system's time zone database holds. Each zone is loaded, and
+        given a ZoneTable, the first time it is asked for.
+    """
+
+    def __init__(self, names=None):
+        """
+            Initialise a registry of the given zone identifiers, or of every zone if None.
+        """
+        self.names = frozenset(names) if names is not None else None
+        self.tables = {}    # Zone identifier -> ZoneTable
+
+    def find(self, name):
+        """
+            Returns the ZoneTable of a zone identifier, or None for a zone that
+            is unknown or may not be asked for.
+        """
+        table = self.tables.get(name)
+        if table is not None:
+            return table
+
+        import zoneinfo
+
+        # Every zone is listed by preload, or else once one is asked for
+        if self.names is None:
+            self.names = frozenset(zoneinfo.available_timezones())
+        if name not in self.names:
+            return None
+
+        try:
+            zone = zoneinfo.ZoneInfo(name)
+        except (ValueError, zoneinfo.ZoneInfoNotFoundError):
+            return None
+
+        table = self.tables[name] = ZoneTable(name, zone)
+        return table
+
+    def preload(self):
+        """
+            Loads every given zone ahead of the first request for it, or lists
+            every zone of the database when none were given, so that no request
+            has to wait while it is read. Each of those is only loaded when
+            first asked for, as loading them all would take seconds.
+            Returns the identifiers of the given zones that could not be loaded.
+        """
+        if self.names is None:
+            import zoneinfo
+
+            self.names = frozenset(zoneinfo.available_timezones())
+            return []
+        return sorted(name for name in self.names if self.find(name) is None)
+
+
+# End of class =================================================================